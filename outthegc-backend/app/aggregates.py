@@ -0,0 +1,384 @@
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# Inclusive (start, end) day range
+DateRange = Tuple[date, date]
+
+ONE_DAY = timedelta(days=1)
+
+# Availability limits: a single range, all of one member's days, and one
+# heatmap response. Each of these is expanded day by day somewhere.
+MAX_RANGE_DAYS = 366
+MAX_AVAILABLE_DAYS = 731
+MAX_HEATMAP_DAYS = 366
+
+
+def parse_day(value: str) -> date:
+    """Parse a YYYY-MM-DD string. Raises ValueError on bad input."""
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def parse_available_dates(values: Iterable[str]) -> Set[date]:
+    """Parse ISO date strings into a set of dates, skipping invalid entries."""
+    dates = set()
+    for value in values:
+        try:
+            dates.add(datetime.fromisoformat(value).date())
+        except ValueError:
+            pass
+    return dates
+
+
+def merge_ranges(ranges: Iterable[DateRange]) -> List[DateRange]:
+    """Sort ranges and merge any that overlap or touch."""
+    merged: List[DateRange] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + ONE_DAY:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def dates_to_ranges(days: Iterable[date]) -> List[DateRange]:
+    """Collapse individual days into sorted, merged ranges."""
+    return merge_ranges((day, day) for day in days)
+
+
+def parse_availability(available_dates: Iterable[str], windows: Iterable[Any]) -> List[DateRange]:
+    """Merged ranges from individual ISO days and start/end windows.
+
+    Invalid days are skipped. Raises ValueError for an invalid window, a
+    window longer than MAX_RANGE_DAYS, or more than MAX_AVAILABLE_DAYS in total.
+    """
+    ranges = dates_to_ranges(parse_available_dates(available_dates))
+    for window in windows:
+        start, end = parse_day(window.start), parse_day(window.end)
+        if start > end:
+            raise ValueError(f"Invalid date range {window.start}..{window.end}")
+        if (end - start).days + 1 > MAX_RANGE_DAYS:
+            raise ValueError(f"Date range {window.start}..{window.end} is longer than {MAX_RANGE_DAYS} days")
+        ranges.append((start, end))
+    ranges = merge_ranges(ranges)
+    if sum((end - start).days + 1 for start, end in ranges) > MAX_AVAILABLE_DAYS:
+        raise ValueError(f"Availability covers more than {MAX_AVAILABLE_DAYS} days")
+    return ranges
+
+
+def expand_ranges(ranges: Iterable[DateRange]) -> Iterator[date]:
+    for start, end in ranges:
+        day = start
+        while day <= end:
+            yield day
+            day += ONE_DAY
+
+
+# ============================================================================
+# RUNNING AGGREGATES
+# ============================================================================
+# Maintained by storage on every write so responses can read summaries
+# without re-scanning the underlying votes.
+
+class DateRangeTally:
+    """Per-day vote counts over a dates poll's window.
+
+    Stored as a difference array: adding or removing a start..end vote is two
+    O(1) updates, and the per-day counts are one prefix sum over the window.
+    """
+    __slots__ = ("start", "end", "diff")
+
+    def __init__(self, start: date, end: date):
+        if (end - start).days + 1 > MAX_RANGE_DAYS:
+            raise ValueError(f"Date window {start}..{end} is longer than {MAX_RANGE_DAYS} days")
+        self.start = start
+        self.end = end
+        # One extra slot so the decrement after the last day has somewhere to go
+        self.diff = [0] * ((end - start).days + 2)
+
+    def contains(self, start: date, end: date) -> bool:
+        return self.start <= start and end <= self.end
+
+    def add(self, start: date, end: date, delta: int = 1) -> None:
+        """Add delta to every day in start..end (inclusive)."""
+        self.diff[(start - self.start).days] += delta
+        self.diff[(end - self.start).days + 1] -= delta
+
+    def counts(self) -> List[int]:
+        counts = []
+        running = 0
+        for step in self.diff[:-1]:
+            running += step
+            counts.append(running)
+        return counts
+
+    def heatmap(self, counts: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        counts = self.counts() if counts is None else counts
+        return [
+            {"date": (self.start + timedelta(days=i)).isoformat(), "count": count}
+            for i, count in enumerate(counts)
+        ]
+
+    def best_range(self, counts: Optional[List[int]] = None) -> Optional[Dict[str, Any]]:
+        """Longest run of consecutive days at the highest count (earliest on ties)."""
+        counts = self.counts() if counts is None else counts
+        top = max(counts, default=0)
+        if top == 0:
+            return None
+
+        best_start, best_len = 0, 0
+        run_start = None
+        for i, count in enumerate(counts + [None]):
+            if count == top:
+                if run_start is None:
+                    run_start = i
+            elif run_start is not None:
+                if i - run_start > best_len:
+                    best_start, best_len = run_start, i - run_start
+                run_start = None
+
+        return {
+            "start": (self.start + timedelta(days=best_start)).isoformat(),
+            "end": (self.start + timedelta(days=best_start + best_len - 1)).isoformat(),
+            "days": best_len,
+            "count": top
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        counts = self.counts()
+        return {"heatmap": self.heatmap(counts), "best_range": self.best_range(counts)}
+
+
+class SliderTally:
+    """Running statistics for a slider poll.
+
+    Counts per value live in a Fenwick tree over min..max, so adding or
+    replacing a vote is O(log range) and any order statistic (min, max,
+    median, percentiles) is a single O(log range) descent. A second array
+    keeps counts per `step`-wide bin for the histogram.
+    """
+    __slots__ = ("low", "high", "step", "count", "total", "tree", "bins", "top_bit")
+
+    PERCENTILES = (25, 50, 75, 90)
+
+    def __init__(self, low: int, high: int, step: int = 1):
+        self.low = low
+        self.high = high
+        self.step = max(step, 1)
+        self.count = 0
+        self.total = 0
+        size = high - low + 1
+        self.tree = [0] * (size + 1)
+        self.bins = [0] * ((size + self.step - 1) // self.step)
+        self.top_bit = 1 << (size.bit_length() - 1)
+
+    def add(self, value: int, delta: int = 1) -> None:
+        """Add (or with delta=-1 remove) one vote for value."""
+        self.count += delta
+        self.total += value * delta
+        offset = value - self.low
+        self.bins[offset // self.step] += delta
+        i = offset + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def kth(self, k: int) -> int:
+        """Value of the k-th smallest vote (1-based)."""
+        pos = 0
+        bit = self.top_bit
+        while bit:
+            nxt = pos + bit
+            if nxt < len(self.tree) and self.tree[nxt] < k:
+                pos = nxt
+                k -= self.tree[nxt]
+            bit >>= 1
+        return self.low + pos
+
+    def percentile(self, p: int) -> int:
+        """Nearest-rank percentile."""
+        rank = max(1, -(-p * self.count // 100))
+        return self.kth(rank)
+
+    def summary(self) -> Dict[str, Any]:
+        histogram = [
+            {
+                "start": self.low + i * self.step,
+                "end": min(self.low + (i + 1) * self.step - 1, self.high),
+                "count": count
+            }
+            for i, count in enumerate(self.bins)
+        ]
+        if self.count == 0:
+            return {
+                "count": 0, "sum": 0, "mean": None, "min": None, "max": None,
+                "median": None, "percentiles": {}, "histogram": histogram
+            }
+
+        n = self.count
+        if n % 2:
+            median = float(self.kth(n // 2 + 1))
+        else:
+            median = (self.kth(n // 2) + self.kth(n // 2 + 1)) / 2
+        return {
+            "count": n,
+            "sum": self.total,
+            "mean": self.total / n,
+            "min": self.kth(1),
+            "max": self.kth(n),
+            "median": median,
+            "percentiles": {f"p{p}": self.percentile(p) for p in self.PERCENTILES},
+            "histogram": histogram
+        }
+
+
+class RangeCounts:
+    """Per-day counts stored as boundaries: +n where ranges start, -n the day after they end.
+
+    Adding a range is two dict updates however long it is; reading the counts
+    is a sweep over the sorted boundaries.
+    """
+    __slots__ = ("edges",)
+
+    def __init__(self):
+        self.edges: Dict[date, int] = {}
+
+    def _bump(self, day: date, delta: int) -> None:
+        value = self.edges.get(day, 0) + delta
+        if value:
+            self.edges[day] = value
+        else:
+            self.edges.pop(day, None)
+
+    def add(self, start: date, end: date, delta: int = 1) -> None:
+        self._bump(start, delta)
+        self._bump(end + ONE_DAY, -delta)
+
+    def clear(self) -> None:
+        self.edges.clear()
+
+
+class AvailabilityCounts:
+    """How many trip members (and how many required attendees) are free each day.
+
+    Storage applies each member's old and new ranges on every availability
+    upsert, so reading the heatmap never re-scans members and costs
+    O(ranges + days) however many members there are.
+    """
+    __slots__ = ("members", "required", "required_ids")
+
+    def __init__(self):
+        self.members = RangeCounts()
+        self.required = RangeCounts()
+        self.required_ids: Set[str] = set()
+
+    def apply(self, member_id: str, old_ranges: List[DateRange], new_ranges: List[DateRange]) -> None:
+        if old_ranges == new_ranges:
+            return
+        targets = [self.members]
+        if member_id in self.required_ids:
+            targets.append(self.required)
+        for counts in targets:
+            for start, end in old_ranges:
+                counts.add(start, end, -1)
+            for start, end in new_ranges:
+                counts.add(start, end)
+
+    def set_required(self, required_ids: Set[str], ranges_by_member: Dict[str, List[DateRange]]) -> None:
+        """Replace the required attendee set and rebuild their counts."""
+        self.required_ids = set(required_ids)
+        self.required.clear()
+        for member_id in self.required_ids:
+            for start, end in ranges_by_member.get(member_id, ()):
+                self.required.add(start, end)
+
+    def heatmap(self, start: Optional[date] = None, end: Optional[date] = None) -> List[Dict[str, Any]]:
+        """Per-day counts from start to end, inclusive.
+
+        Without start the heatmap begins on the first day anyone is free.
+        Without end it runs MAX_HEATMAP_DAYS from start. Either way, days nobody
+        is free after the last range ends are dropped.
+        """
+        # Sweep both boundary maps together; between two boundaries both
+        # counts are constant, so each stretch is expanded to days directly.
+        boundaries = sorted(set(self.members.edges) | set(self.required.edges))
+        needed = len(self.required_ids)
+        days = []
+        free = required_free = 0
+        for current, following in zip(boundaries, boundaries[1:]):
+            free += self.members.edges.get(current, 0)
+            required_free += self.required.edges.get(current, 0)
+            if start is None:
+                if free == 0:
+                    continue
+                start = current
+            if end is None:
+                end = start + (MAX_HEATMAP_DAYS - 1) * ONE_DAY
+            if current > end:
+                break
+            if following - ONE_DAY < start:
+                continue
+            for day in expand_ranges([(max(current, start), min(following - ONE_DAY, end))]):
+                days.append({
+                    "date": day.isoformat(),
+                    "count": free,
+                    "all_required_free": required_free == needed
+                })
+        # Drop days nobody is free after the last range ends
+        while days and days[-1]["count"] == 0:
+            days.pop()
+        return days
+
+
+class FeedbackStats:
+    """Running totals over a set of feedback entries (one option, or a whole trip)."""
+    __slots__ = ("count", "rating_sum", "dislikes", "members", "comments")
+
+    def __init__(self):
+        self.count = 0
+        self.rating_sum = 0
+        self.dislikes: Dict[str, int] = {}  # activity id -> times disliked
+        self.members: Dict[str, int] = {}  # member id -> entries counted here
+        # (option id, member id) -> comment; a member may comment on every option
+        self.comments: Dict[Tuple[str, str], str] = {}
+
+    @property
+    def average_rating(self) -> float:
+        return self.rating_sum / self.count if self.count else 0
+
+    def apply(self, feedback, delta: int) -> None:
+        """Add (delta=1) or remove (delta=-1) one feedback entry."""
+        self.count += delta
+        self.rating_sum += feedback.rating * delta
+        for activity_id in feedback.disliked_activity_ids:
+            _bump(self.dislikes, activity_id, delta)
+        _bump(self.members, feedback.member_id, delta)
+        key = (feedback.option_id, feedback.member_id)
+        if delta > 0 and feedback.comment:
+            self.comments[key] = feedback.comment
+        elif delta < 0:
+            self.comments.pop(key, None)
+
+
+class TripFeedbackStats:
+    """Feedback totals for a trip and for each option in it."""
+    __slots__ = ("total", "by_option")
+
+    def __init__(self):
+        self.total = FeedbackStats()
+        self.by_option: Dict[str, FeedbackStats] = {}
+
+    def apply(self, feedback, delta: int) -> None:
+        self.total.apply(feedback, delta)
+        option_stats = self.by_option.get(feedback.option_id)
+        if option_stats is None:
+            option_stats = self.by_option[feedback.option_id] = FeedbackStats()
+        option_stats.apply(feedback, delta)
+
+
+def _bump(counter: Dict[str, int], key: str, delta: int) -> None:
+    value = counter.get(key, 0) + delta
+    if value:
+        counter[key] = value
+    else:
+        counter.pop(key, None)
@@ -1,16 +1,59 @@
 import os
 from pathlib import Path
 
-try:
-	from dotenv import load_dotenv
-except ImportError:  # Optional dependency
-	load_dotenv = None
+# Only import dotenv when there is a .env to load; deployed workers get their
+# settings from the real environment and skip the import entirely.
+env_path = Path(__file__).resolve().parents[1] / ".env"
+if env_path.is_file():
+	try:
+		from dotenv import load_dotenv
+	except ImportError:  # Optional dependency
+		load_dotenv = None
 
-if load_dotenv:
-	env_path = Path(__file__).resolve().parents[1] / ".env"
-	load_dotenv(dotenv_path=env_path)
+	if load_dotenv:
+		load_dotenv(dotenv_path=env_path)
 
 # Environment flags
 MOCK_MODE = os.getenv("MOCK_MODE", "true").lower() in ("1", "true", "yes")
 CLAUDE_API_KEY = os.getenv("CLAUDE_API_KEY")
 CLAUDE_MODEL = os.getenv("CLAUDE_MODEL", "claude-3-haiku-20240307")
+# Point the SDK elsewhere, e.g. tools/stub_llm_server.py for local checks
+CLAUDE_BASE_URL = os.getenv("CLAUDE_BASE_URL")
+# Generate each option with its own concurrent Claude call (mode="fanout")
+AI_FANOUT = os.getenv("AI_FANOUT", "true").lower() in ("1", "true", "yes")
+
+# Per-trip change log length for GET /trips/{trip_id}/changes
+CHANGE_LOG_SIZE = int(os.getenv("CHANGE_LOG_SIZE", "500"))
+
+# Speculative generation once trip inputs are complete or have gone quiet.
+# Off by default: each run spends Claude credits on options nobody asked for yet
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "false").lower() in ("1", "true", "yes")
+PREFETCH_READY_DELAY_SECONDS = float(os.getenv("PREFETCH_READY_DELAY_SECONDS", "3"))
+PREFETCH_QUIET_SECONDS = float(os.getenv("PREFETCH_QUIET_SECONDS", "60"))
+PREFETCH_MAX_PER_TRIP = int(os.getenv("PREFETCH_MAX_PER_TRIP", "3"))
+
+# Rerun keeps options whose average rating is at or above this
+RERUN_KEEP_RATING = float(os.getenv("RERUN_KEEP_RATING", "4"))
+
+# Recent AI calls kept per trip (and latency samples kept per total) for GET /ai-usage
+AI_USAGE_LOG_SIZE = int(os.getenv("AI_USAGE_LOG_SIZE", "200"))
+
+# Admission control for AI generation (see app/services/admission.py)
+AI_MAX_CONCURRENT = int(os.getenv("AI_MAX_CONCURRENT", "4"))
+AI_QUEUE_SIZE = int(os.getenv("AI_QUEUE_SIZE", "16"))
+AI_MAX_QUEUED_PER_TRIP = int(os.getenv("AI_MAX_QUEUED_PER_TRIP", "2"))
+AI_QUEUE_TIMEOUT_SECONDS = float(os.getenv("AI_QUEUE_TIMEOUT_SECONDS", "60"))
+AI_TRIP_RATE_PER_MINUTE = float(os.getenv("AI_TRIP_RATE_PER_MINUTE", "6"))
+AI_TRIP_BURST = int(os.getenv("AI_TRIP_BURST", "3"))
+
+# LLM transport: "anthropic" (SDK) or "http" (stdlib client, e.g. for tools/stub_llm_server.py)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "anthropic").lower()
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+# Append every LLM reply to this JSONL file so the stub server can replay them
+LLM_RECORD_PATH = os.getenv("LLM_RECORD_PATH")
+
+# Responses kept for Idempotency-Key replays on mutating POSTs
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "5000"))
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+# Total response bytes kept; plan responses are large, so this binds before the count does
+IDEMPOTENCY_CACHE_BYTES = int(os.getenv("IDEMPOTENCY_CACHE_BYTES", str(32 * 1024 * 1024)))
@@ -0,0 +1,181 @@
+import functools
+import hashlib
+import inspect
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable, Optional, Tuple
+from fastapi import Header, HTTPException, Response
+from pydantic import BaseModel
+from app import config, serializers
+
+# ============================================================================
+# IDEMPOTENCY KEYS
+# ============================================================================
+# Clients on flaky connections retry POSTs. With an Idempotency-Key header the
+# first request runs the handler and its response is kept (LRU bounded by
+# entry count and total body bytes, with a TTL); retries with the same key get
+# that response back without running the handler again. A retry that arrives while the first is still running waits
+# for it. Failed requests aren't kept, so they can be retried. Reusing a key
+# with a different body is rejected with 422. Routes opt in with @idempotent.
+
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyKeyReused(Exception):
+    pass
+
+
+class StoredResponse:
+    __slots__ = ("body", "status_code", "media_type")
+
+    def __init__(self, body: bytes, status_code: int, media_type: Optional[str]):
+        self.body = body
+        self.status_code = status_code
+        self.media_type = media_type
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "future", "expires", "size")
+
+    def __init__(self, fingerprint: str, expires: float):
+        self.fingerprint = fingerprint
+        self.future: Future = Future()
+        self.expires = expires
+        self.size = 0
+
+
+class IdempotencyCache:
+    """Results of fn keyed by idempotency key. Results are StoredResponses; their
+    body sizes count against max_bytes."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, max_bytes: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._bytes = 0
+
+    def run(self, key: Hashable, fingerprint: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run fn once for key, or return the stored result. Returns (result, replayed)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= now:
+                self._remove(key)
+                entry = None
+            leader = entry is None
+            if leader:
+                entry = self._entries[key] = _Entry(fingerprint, now + self.ttl_seconds)
+                while len(self._entries) > self.max_entries:
+                    self._remove(next(iter(self._entries)))
+            elif entry.fingerprint != fingerprint:
+                raise IdempotencyKeyReused()
+            else:
+                self._entries.move_to_end(key)
+
+        if not leader:
+            return entry.future.result(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            entry.future.set_exception(e)
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    self._remove(key)
+            raise
+        entry.future.set_result(result)
+        with self._lock:
+            if self._entries.get(key) is entry:
+                entry.size = len(result.body)
+                self._bytes += entry.size
+                if entry.size > self.max_bytes:
+                    # Bigger than the whole budget: only in-flight retries get it
+                    self._remove(key)
+                while self._bytes > self.max_bytes:
+                    self._remove(next(iter(self._entries)))
+        return result, False
+
+    def _remove(self, key: Hashable) -> None:
+        self._bytes -= self._entries.pop(key).size
+
+    @property
+    def bytes(self) -> int:
+        with self._lock:
+            return self._bytes
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+cache = IdempotencyCache(config.IDEMPOTENCY_CACHE_SIZE, config.IDEMPOTENCY_TTL_SECONDS,
+                         config.IDEMPOTENCY_CACHE_BYTES)
+
+
+def request_fingerprint(payload: Any) -> str:
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def respond(idempotency_key: Optional[str], scope: Tuple, payload: Any, handler: Callable[[], Any]) -> Any:
+    """Run an endpoint handler under an optional Idempotency-Key.
+
+    `scope` names the endpoint and its path parameters so the same key on
+    different endpoints or trips doesn't collide; `payload` is the request
+    body (plus any query options) a retry must repeat exactly.
+    """
+    if not idempotency_key:
+        return handler()
+    if len(idempotency_key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key longer than {MAX_KEY_LENGTH} characters")
+
+    def run() -> StoredResponse:
+        result = handler()
+        if not isinstance(result, Response):
+            result = serializers.json_response(result)
+        return StoredResponse(result.body, result.status_code, result.media_type)
+
+    try:
+        stored, replayed = cache.run((scope, idempotency_key), request_fingerprint(payload), run)
+    except IdempotencyKeyReused:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+    return Response(
+        content=stored.body,
+        status_code=stored.status_code,
+        media_type=stored.media_type,
+        headers={"Idempotent-Replayed": "true" if replayed else "false"}
+    )
+
+
+def idempotent(endpoint: str, *path_params: str) -> Callable:
+    """Route decorator adding an optional Idempotency-Key header.
+
+    The key is scoped by `endpoint` and the named path parameters; every other
+    argument (request body, query options) is what a retry must repeat.
+    Goes under the @router decorator.
+    """
+    def decorate(fn: Callable) -> Callable:
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, idempotency_key: Optional[str] = None, **kwargs):
+            arguments = signature.bind(*args, **kwargs).arguments
+            scope = (endpoint,) + tuple(arguments[name] for name in path_params)
+            payload = {
+                name: value.model_dump() if isinstance(value, BaseModel) else value
+                for name, value in arguments.items()
+                if name not in path_params
+            }
+            return respond(idempotency_key, scope, payload, lambda: fn(*args, **kwargs))
+
+        # FastAPI reads the parameters from the signature: add the header to it
+        header = inspect.Parameter("idempotency_key", inspect.Parameter.KEYWORD_ONLY,
+                                   default=Header(None), annotation=Optional[str])
+        wrapper.__signature__ = signature.replace(parameters=[*signature.parameters.values(), header])
+        return wrapper
+
+    return decorate
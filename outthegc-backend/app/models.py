@@ -35,9 +35,15 @@ class Constraints(BaseModel):
     requests: Optional[str] = None
 
 
+class DateWindow(BaseModel):
+    start: str
+    end: str
+
+
 class Availability(BaseModel):
     member_id: str
     available_dates: List[str] = []
+    available_ranges: List[DateWindow] = []
 
 
 class PollOption(BaseModel):
@@ -45,11 +51,6 @@ class PollOption(BaseModel):
     label: str
 
 
-class DateWindow(BaseModel):
-    start: str
-    end: str
-
-
 class SliderConfig(BaseModel):
     title: Optional[str] = None
     left_label: str
@@ -126,6 +127,10 @@ class JoinTripRequest(BaseModel):
     name: str
 
 
+class RenameMemberRequest(BaseModel):
+    name: str
+
+
 class UpdateBriefRequest(BaseModel):
     brief: str
 
@@ -143,6 +148,7 @@ class UpsertMemberInputsRequest(BaseModel):
     must_avoids: List[str] = []
     requests: Optional[str] = None
     available_dates: List[str] = []
+    available_ranges: List[DateWindow] = []
 
 
 class CreatePollOptionInput(BaseModel):
@@ -174,10 +180,13 @@ class ClosePollRequest(BaseModel):
 class GenerateOptionsRequest(BaseModel):
     created_by_member_id: str
     duration_days: Optional[int] = None
+    mode: Optional[str] = None  # "fast" (offline planner), "fanout" or "single"; default per config
 
 
 class RerunOptionsRequest(BaseModel):
     created_by_member_id: str
+    mode: Optional[str] = None  # "incremental" (default), "fast" (planner replacements) or "full"
+    keep_rating: Optional[float] = None  # defaults to config.RERUN_KEEP_RATING
 
 
 class FeedbackRequest(BaseModel):
@@ -0,0 +1,87 @@
+from datetime import date
+from typing import List, Optional, Tuple
+from app.models import Member, Availability, Vote, DateWindow
+
+# ============================================================================
+# INTERNAL RECORDS (High-cardinality storage rows)
+# ============================================================================
+# Members, availability and votes are created far more often than anything
+# else, so storage keeps them as plain __slots__ objects instead of pydantic
+# models. They expose the same attributes as their models in app/models.py;
+# call to_model() when a validated model is needed at the API boundary.
+
+class MemberRecord:
+    __slots__ = ("id", "trip_id", "name", "role")
+
+    def __init__(self, id: str, trip_id: str, name: str, role: str):
+        self.id = id
+        self.trip_id = trip_id
+        self.name = name
+        self.role = role
+
+    def to_model(self) -> Member:
+        return Member(id=self.id, trip_id=self.trip_id, name=self.name, role=self.role)
+
+
+class AvailabilityRecord:
+    """Availability as sorted, merged, inclusive date ranges.
+
+    available_dates expands the ranges to ISO day strings for callers that
+    still want the flat list; prefer ranges for anything on a hot path.
+    """
+    __slots__ = ("member_id", "ranges")
+
+    def __init__(self, member_id: str, ranges: List[Tuple[date, date]]):
+        self.member_id = member_id
+        self.ranges = ranges
+
+    @property
+    def available_dates(self) -> List[str]:
+        return [
+            date.fromordinal(ordinal).isoformat()
+            for start, end in self.ranges
+            for ordinal in range(start.toordinal(), end.toordinal() + 1)
+        ]
+
+    def day_count(self) -> int:
+        return sum((end - start).days + 1 for start, end in self.ranges)
+
+    def to_model(self) -> Availability:
+        return Availability(
+            member_id=self.member_id,
+            available_dates=self.available_dates,
+            available_ranges=[
+                DateWindow(start=start.isoformat(), end=end.isoformat())
+                for start, end in self.ranges
+            ]
+        )
+
+
+class VoteRecord:
+    __slots__ = ("poll_id", "member_id", "option_id", "value", "start_date", "end_date")
+
+    def __init__(
+        self,
+        poll_id: str,
+        member_id: str,
+        option_id: Optional[str] = None,
+        value: Optional[int] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ):
+        self.poll_id = poll_id
+        self.member_id = member_id
+        self.option_id = option_id
+        self.value = value
+        self.start_date = start_date
+        self.end_date = end_date
+
+    def to_model(self) -> Vote:
+        return Vote(
+            poll_id=self.poll_id,
+            member_id=self.member_id,
+            option_id=self.option_id,
+            value=self.value,
+            start_date=self.start_date,
+            end_date=self.end_date
+        )
@@ -1,36 +1,27 @@
-from fastapi import APIRouter, HTTPException
-from typing import Dict, Any
+from fastapi import APIRouter, HTTPException, Request, Response
+from contextlib import nullcontext
+from typing import Dict, Any, Optional
 from app.models import GenerateOptionsRequest, RerunOptionsRequest
-from app import storage
-from app.services import ai, availability
+from app import idempotency, storage, serializers
+from app.singleflight import SingleFlight
+from app.services import ai, admission, availability, prefetch, usage
 
 router = APIRouter(prefix="/trips", tags=["ai"])
 
+# Concurrent generate/rerun calls for the same trip and inputs (double
+# clicks, a second tab) share one generation and one stored plan version
+generation_flights = SingleFlight()
 
-def build_plan_response(plan_version) -> Dict[str, Any]:
-    """Build plan version response."""
-    return {
-        "id": plan_version.id,
-        "trip_id": plan_version.trip_id,
-        "version_num": plan_version.version_num,
-        "created_at": plan_version.created_at.isoformat(),
-        "options": [
-            {
-                "id": opt.id,
-                "title": opt.title,
-                "destination": opt.destination,
-                "date_window": opt.date_window,
-                "summary": opt.summary,
-                "itinerary": opt.itinerary,
-                "transport": opt.transport,
-                "costs": opt.costs,
-                "packing_list": opt.packing_list,
-                "rationale": opt.rationale,
-                "assumptions": opt.assumptions
-            }
-            for opt in plan_version.options
-        ]
-    }
+
+def generation_slot(trip_id: str, mode: Optional[str]):
+    """Admission slot for generations that call Claude; planner-only runs skip it."""
+    if not ai.uses_llm(mode):
+        return nullcontext()
+    return admission.controller.slot(trip_id)
+
+
+def too_many_requests(e: admission.AdmissionRejected) -> HTTPException:
+    return HTTPException(status_code=429, detail=e.reason, headers={"Retry-After": e.retry_after_header})
 
 
 @router.get("/claude-test")
@@ -39,6 +30,7 @@ def claude_test() -> Dict[str, Any]:
     response = ai.call_claude_api(
         "Reply with exactly 10 random french words separated by single spaces. No punctuation.",
         debug=True,
+        purpose="test",
     )
     if not response:
         return {"ok": False, "detail": "Claude unavailable"}
@@ -52,8 +44,38 @@ def claude_test() -> Dict[str, Any]:
     return {"ok": True, "response": response}
 
 
+@router.get("/ai-usage")
+def get_ai_usage() -> Response:
+    """Process-wide LLM usage: totals, per model, and how many trips have used it."""
+    return serializers.json_response(usage.get_process_usage())
+
+
+@router.get("/{trip_id}/ai-usage")
+def get_trip_ai_usage(trip_id: str) -> Response:
+    """LLM calls made for a trip, newest first, with running totals."""
+    try:
+        storage.get_trip_or_404(trip_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Trip not found")
+    return serializers.json_response(usage.get_trip_usage(trip_id))
+
+
+@router.get("/{trip_id}/plans/{version_num}")
+def get_plan_version(trip_id: str, version_num: int, request: Request) -> Response:
+    """Get a stored plan version. Plan versions are immutable, so the response is cached."""
+    try:
+        storage.get_trip_or_404(trip_id)
+        plan = storage.get_plan_version_or_404(trip_id, version_num)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Plan version not found")
+
+    encoded = serializers.encode_plan(plan)
+    return serializers.encoded_response(encoded, request, "public, max-age=31536000, immutable")
+
+
 @router.post("/{trip_id}/generate-options")
-def generate_options(trip_id: str, req: GenerateOptionsRequest) -> Dict[str, Any]:
+@idempotency.idempotent("generate", "trip_id")
+def generate_options(trip_id: str, req: GenerateOptionsRequest) -> Response:
     """Generate trip options using AI. Organiser only."""
     try:
         trip = storage.get_trip_or_404(trip_id)
@@ -61,27 +83,36 @@ def generate_options(trip_id: str, req: GenerateOptionsRequest) -> Dict[str, Any
         # Enforce organiser-only
         if not storage.is_organiser(req.created_by_member_id, trip_id):
             raise HTTPException(status_code=403, detail="Only organiser can generate options")
+        if req.mode not in (None, "fast", "fanout", "single"):
+            raise HTTPException(status_code=400, detail=f"Unknown mode: {req.mode}")
         
-        # Generate options via AI service
-        result = ai.generate_options(trip_id)
-        plan_version = result['plan_version']
-        warning = result['warning']
-        success = result['success']
-        
-        # Store plan version
-        storage.add_plan_version(trip_id, plan_version.options)
-        
-        # Get latest stored plan (to return version_num, etc)
-        latest_plan = storage.get_latest_plan(trip_id)
+        fingerprint = ai.input_fingerprint(trip_id, req.duration_days, req.mode)
+
+        def run() -> Dict[str, Any]:
+            # Use options generated ahead of time if inputs haven't changed since
+            result = prefetch.take(trip_id, fingerprint)
+            prefetched = result is not None
+            if result is None:
+                with generation_slot(trip_id, req.mode):
+                    result = ai.generate_options(trip_id, duration_days=req.duration_days, mode=req.mode)
+            # Store plan version
+            stored = storage.add_plan_version(trip_id, result['plan_version'].options)
+            return {**result, 'plan_version': stored, 'prefetched': prefetched}
+
+        result, coalesced = generation_flights.do((trip_id, "generate", fingerprint), run)
         
-        response = build_plan_response(latest_plan)
-        if warning:
-            response['warning'] = warning
-        response['success'] = success
+        response = serializers.serialize_plan(result['plan_version'])
+        if result['warning']:
+            response['warning'] = result['warning']
+        response['success'] = result['success']
+        response['prefetched'] = result['prefetched']
+        response['coalesced'] = coalesced
         
-        return response
+        return serializers.json_response(response)
     except HTTPException:
         raise
+    except admission.AdmissionRejected as e:
+        raise too_many_requests(e)
     except ValueError as e:
         msg = str(e)
         if "not found" in msg.lower():
@@ -92,7 +123,7 @@ def generate_options(trip_id: str, req: GenerateOptionsRequest) -> Dict[str, Any
 
 
 @router.post("/{trip_id}/rerun-options")
-def rerun_options(trip_id: str, req: RerunOptionsRequest) -> Dict[str, Any]:
+def rerun_options(trip_id: str, req: RerunOptionsRequest) -> Response:
     """Rerun option generation with feedback. Organiser only."""
     try:
         trip = storage.get_trip_or_404(trip_id)
@@ -101,54 +132,73 @@ def rerun_options(trip_id: str, req: RerunOptionsRequest) -> Dict[str, Any]:
         if not storage.is_organiser(req.created_by_member_id, trip_id):
             raise HTTPException(status_code=403, detail="Only organiser can rerun options")
         
-        # Pull feedback for trip
-        feedback_list = storage.get_feedback_for_trip(trip_id)
-        
-        # Build feedback summary for context
+        # Build feedback summary for context from running per-option totals;
+        # only the latest plan's options are considered by the rerun
+        feedback_stats = storage.get_feedback_stats(trip_id)
+        latest_plan = storage.get_latest_plan(trip_id)
+        latest_ids = {opt.id for opt in latest_plan.options} if latest_plan else set()
         feedback_summary = {
-            'total_feedback': len(feedback_list),
-            'by_option': {}
-        }
-        for feedback in feedback_list:
-            opt_id = feedback.option_id
-            if opt_id not in feedback_summary['by_option']:
-                feedback_summary['by_option'][opt_id] = {
-                    'ratings': [],
-                    'disliked_activities': [],
-                    'comments': []
+            'total_feedback': feedback_stats.total.count,
+            'by_option': {
+                opt_id: {
+                    'count': stats.count,
+                    'average_rating': stats.average_rating,
+                    'disliked_activities': dict(stats.dislikes),
+                    'comments': list(stats.comments.values())
                 }
-            feedback_summary['by_option'][opt_id]['ratings'].append(feedback.rating)
-            feedback_summary['by_option'][opt_id]['disliked_activities'].extend(feedback.disliked_activity_ids)
-            if feedback.comment:
-                feedback_summary['by_option'][opt_id]['comments'].append(feedback.comment)
-        
-        # Calculate average ratings per option
-        for opt_id in feedback_summary['by_option']:
-            ratings = feedback_summary['by_option'][opt_id]['ratings']
-            feedback_summary['by_option'][opt_id]['average_rating'] = sum(ratings) / len(ratings) if ratings else 0
-        
-        # TODO: Enhance AI prompt with feedback insights
-        # For now, just generate fresh options (can be enhanced to use feedback)
-        result = ai.generate_options(trip_id)
-        plan_version = result['plan_version']
-        warning = result['warning']
-        success = result['success']
-        
-        # Store new plan version
-        storage.add_plan_version(trip_id, plan_version.options)
+                for opt_id, stats in feedback_stats.by_option.items()
+                if stats.count and opt_id in latest_ids
+            }
+        }
         
-        # Get latest stored plan
-        latest_plan = storage.get_latest_plan(trip_id)
+        if req.mode not in (None, "incremental", "fast", "full"):
+            raise HTTPException(status_code=400, detail=f"Unknown mode: {req.mode}")
+
+        def run() -> Dict[str, Any]:
+            if req.mode != "full":
+                # Nothing rated below the threshold: no admission slot, no new version
+                result = ai.unchanged_rerun(trip_id, req.keep_rating)
+                if result is not None:
+                    return result
+            with generation_slot(trip_id, req.mode):
+                if req.mode == "full":
+                    result = ai.generate_options(trip_id)
+                else:
+                    # Keep well-rated options, regenerate low-rated ones from their feedback
+                    result = ai.rerun_options(trip_id, keep_rating=req.keep_rating, mode=req.mode)
+            if result.get('unchanged'):
+                return result
+            # Store new plan version
+            stored = storage.add_plan_version(trip_id, result['plan_version'].options)
+            if 'kept' in result:
+                # Storing re-ids the options; report the ids clients will see
+                stored_ids = {
+                    opt.id: stored_opt.id
+                    for opt, stored_opt in zip(result['plan_version'].options, stored.options)
+                }
+                result['kept'] = [stored_ids[opt_id] for opt_id in result['kept']]
+                result['regenerated'] = [stored_ids[opt_id] for opt_id in result['regenerated']]
+            return {**result, 'plan_version': stored}
+
+        fingerprint = ai.input_fingerprint(trip_id, mode=req.mode)
+        key = (trip_id, "rerun", req.keep_rating, fingerprint)
+        result, coalesced = generation_flights.do(key, run)
         
-        response = build_plan_response(latest_plan)
-        if warning:
-            response['warning'] = warning
-        response['success'] = success
+        response = serializers.serialize_plan(result['plan_version'])
+        if result['warning']:
+            response['warning'] = result['warning']
+        response['success'] = result['success']
         response['feedback_considered'] = feedback_summary
+        if 'kept' in result:
+            response['kept_option_ids'] = result['kept']
+            response['regenerated_option_ids'] = result['regenerated']
+        response['coalesced'] = coalesced
         
-        return response
+        return serializers.json_response(response)
     except HTTPException:
         raise
+    except admission.AdmissionRejected as e:
+        raise too_many_requests(e)
     except ValueError as e:
         msg = str(e)
         if "not found" in msg.lower():
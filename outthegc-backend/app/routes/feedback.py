@@ -1,12 +1,13 @@
 from fastapi import APIRouter, HTTPException
 from typing import Dict
 from app.models import FeedbackRequest
-from app import storage
+from app import idempotency, storage
 
 router = APIRouter(prefix="/trips", tags=["feedback"])
 
 
 @router.post("/{trip_id}/options/{option_id}/feedback")
+@idempotency.idempotent("feedback", "trip_id", "option_id")
 def submit_feedback(trip_id: str, option_id: str, req: FeedbackRequest) -> Dict[str, bool]:
     """Submit feedback on a trip option."""
     try:
@@ -26,7 +27,7 @@ def submit_feedback(trip_id: str, option_id: str, req: FeedbackRequest) -> Dict[
             raise HTTPException(status_code=400, detail="Invalid option ID")
         
         # Store feedback (upsert by trip_id, option_id, member_id)
-        storage.add_feedback(
+        storage.upsert_feedback(
             trip_id=trip_id,
             option_id=option_id,
             member_id=req.member_id,
@@ -1,83 +1,31 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
 from typing import Dict, List, Any
 from datetime import datetime
 from app.models import CreatePollRequest, VoteRequest, ClosePollRequest
-from app import storage
+from app import idempotency, storage, serializers
+from app.aggregates import MAX_RANGE_DAYS, parse_day
 
 router = APIRouter(prefix="/trips", tags=["polls"])
 
+# vote ?response= modes: the full poll (default), just the caller's vote, or
+# the vote plus the counters it changed
+VOTE_RESPONSES = ("full", "ack", "delta")
+VOTE_DETAILS_PAGE_SIZE = 100
+VOTE_DETAILS_MAX_PAGE_SIZE = 500
+# Slider tallies keep a counter per value in min..max, so the range is capped
+MAX_SLIDER_RANGE = 10_000
 
-def build_poll_response(poll_id: str) -> Dict[str, Any]:
+
+def build_poll_response(poll_id: str) -> Response:
     """Build poll response with vote counts and member info."""
     poll = storage.get_poll_or_404(poll_id)
-    
-    # Get all votes for this poll
     poll_votes = storage.get_poll_votes(poll_id)
-    
-    # Count votes per option and collect vote details
-    votes_by_option = {}
-    vote_details = []
-    
-    for opt in poll.options:
-        votes_for_option = [v for v in poll_votes if v.option_id == opt.id]
-        votes_by_option[opt.id] = len(votes_for_option)
-
-        # Add vote details (member_id and member name if available)
-        for vote in votes_for_option:
-            try:
-                member = storage.get_member_or_404(vote.member_id)
-                member_name = member.name
-            except ValueError:
-                member_name = "Unknown"
-            vote_details.append({
-                "member_id": vote.member_id,
-                "member_name": member_name,
-                "option_id": vote.option_id,
-                "value": vote.value,
-                "start_date": vote.start_date,
-                "end_date": vote.end_date
-            })
-
-    if poll.type in ["slider", "dates"]:
-        for vote in poll_votes:
-            try:
-                member = storage.get_member_or_404(vote.member_id)
-                member_name = member.name
-            except ValueError:
-                member_name = "Unknown"
-            vote_details.append({
-                "member_id": vote.member_id,
-                "member_name": member_name,
-                "option_id": None,
-                "value": vote.value,
-                "start_date": vote.start_date,
-                "end_date": vote.end_date
-            })
-    
-    return {
-        "poll_id": poll.id,
-        "trip_id": poll.trip_id,
-        "type": poll.type,
-        "question": poll.question,
-        "options": [
-            {
-                "id": opt.id,
-                "label": opt.label,
-                "vote_count": votes_by_option.get(opt.id, 0)
-            }
-            for opt in poll.options
-        ],
-        "slider": poll.slider.dict() if poll.slider else None,
-        "date_window": poll.date_window.dict() if poll.date_window else None,
-        "is_open": poll.is_open,
-        "created_at": poll.created_at.isoformat(),
-        "total_votes": len(poll_votes),
-        "vote_details": vote_details
-    }
+    names = storage.get_member_names(poll.trip_id)
+    return serializers.json_response(serializers.serialize_poll_results(poll, poll_votes, names))
 
 
 @router.post("/{trip_id}/polls")
-def create_poll(trip_id: str, req: CreatePollRequest) -> Dict[str, Any]:
+def create_poll(trip_id: str, req: CreatePollRequest) -> Response:
     """Create new poll. Organiser only."""
     # Example (dates poll):
     # {
@@ -110,6 +58,12 @@ def create_poll(trip_id: str, req: CreatePollRequest) -> Dict[str, Any]:
         elif req.type == "slider":
             if not req.slider or not req.slider.left_label or not req.slider.right_label:
                 raise HTTPException(status_code=400, detail="Slider poll requires left_label and right_label")
+            if req.slider.min > req.slider.max:
+                raise HTTPException(status_code=400, detail="slider.min must be less than or equal to slider.max")
+            if req.slider.max - req.slider.min > MAX_SLIDER_RANGE:
+                raise HTTPException(status_code=400, detail=f"slider range must be at most {MAX_SLIDER_RANGE}")
+            if req.slider.step < 1:
+                raise HTTPException(status_code=400, detail="slider.step must be at least 1")
             poll = storage.create_poll(trip_id, req.type, req.question, [], req.slider)
         else:
             if not req.date_window or not req.date_window.start or not req.date_window.end:
@@ -121,6 +75,8 @@ def create_poll(trip_id: str, req: CreatePollRequest) -> Dict[str, Any]:
                 raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
             if start > end:
                 raise HTTPException(status_code=400, detail="date_window.start must be before or equal to date_window.end")
+            if (end - start).days + 1 > MAX_RANGE_DAYS:
+                raise HTTPException(status_code=400, detail=f"date_window must span at most {MAX_RANGE_DAYS} days")
             poll = storage.create_poll(trip_id, req.type, req.question, [], None, req.date_window)
         
         return build_poll_response(poll.id)
@@ -138,8 +94,16 @@ def create_poll(trip_id: str, req: CreatePollRequest) -> Dict[str, Any]:
 
 
 @router.post("/{trip_id}/polls/{poll_id}/vote")
-def vote_on_poll(trip_id: str, poll_id: str, req: VoteRequest) -> Dict[str, Any]:
-    """Vote on a poll."""
+@idempotency.idempotent("vote", "trip_id", "poll_id")
+def vote_on_poll(trip_id: str, poll_id: str, req: VoteRequest, response: str = "full") -> Response:
+    """Vote on a poll.
+
+    ?response=ack returns only the stored vote and ?response=delta adds the
+    option counters it changed; voters are listed by GET on the poll.
+    """
+    if response not in VOTE_RESPONSES:
+        raise HTTPException(status_code=400, detail=f"Unknown response mode: {response}")
+
     # Example (dates vote):
     # {"member_id": "...", "start_date": "2026-02-10", "end_date": "2026-02-14"}
     try:
@@ -162,8 +126,14 @@ def vote_on_poll(trip_id: str, poll_id: str, req: VoteRequest) -> Dict[str, Any]
             # Ensure option exists
             if not any(opt.id == req.option_id for opt in poll.options):
                 raise HTTPException(status_code=400, detail="Invalid poll option")
+            # A single-choice vote moves the member's previous option down
+            changed_option_ids = {req.option_id}
+            if poll.type == "single":
+                changed_option_ids.update(
+                    v.option_id for v in storage.get_member_votes_for_poll(poll_id, req.member_id)
+                )
             # Record vote (upserts if member already voted)
-            storage.vote(poll_id, req.member_id, req.option_id)
+            vote = storage.vote(poll_id, req.member_id, req.option_id)
         elif poll.type == "slider":
             if req.value is None:
                 raise HTTPException(status_code=400, detail="Slider value is required")
@@ -171,25 +141,30 @@ def vote_on_poll(trip_id: str, poll_id: str, req: VoteRequest) -> Dict[str, Any]
                 raise HTTPException(status_code=400, detail="Slider configuration missing")
             if req.value < poll.slider.min or req.value > poll.slider.max:
                 raise HTTPException(status_code=400, detail="Slider value out of range")
-            storage.vote(poll_id, req.member_id, None, req.value)
+            vote = storage.vote(poll_id, req.member_id, None, req.value)
         else:
             if not req.start_date or not req.end_date:
                 raise HTTPException(status_code=400, detail="start_date and end_date are required")
-            if poll.date_window is None:
+            # Window bounds were parsed once when the poll was created
+            tally = storage.get_date_tally(poll_id)
+            if tally is None:
                 raise HTTPException(status_code=400, detail="Date window missing")
             try:
-                start = datetime.strptime(req.start_date, "%Y-%m-%d").date()
-                end = datetime.strptime(req.end_date, "%Y-%m-%d").date()
-                window_start = datetime.strptime(poll.date_window.start, "%Y-%m-%d").date()
-                window_end = datetime.strptime(poll.date_window.end, "%Y-%m-%d").date()
+                start = parse_day(req.start_date)
+                end = parse_day(req.end_date)
             except ValueError:
                 raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
             if start > end:
                 raise HTTPException(status_code=400, detail="start_date must be before or equal to end_date")
-            if start < window_start or end > window_end:
+            if not tally.contains(start, end):
                 raise HTTPException(status_code=400, detail="Dates must be within poll date_window")
-            storage.vote(poll_id, req.member_id, None, None, req.start_date, req.end_date)
-        
+            vote = storage.vote(poll_id, req.member_id, None, None, req.start_date, req.end_date)
+
+        if response == "ack":
+            return serializers.json_response(serializers.serialize_vote_ack(poll, vote))
+        if response == "delta":
+            changed = changed_option_ids if poll.type in ["single", "multi"] else set()
+            return serializers.json_response(serializers.serialize_vote_delta(poll, vote, changed))
         # Return updated poll results
         return build_poll_response(poll_id)
     except HTTPException:
@@ -205,8 +180,31 @@ def vote_on_poll(trip_id: str, poll_id: str, req: VoteRequest) -> Dict[str, Any]
         raise HTTPException(status_code=400, detail=f"Failed to vote: {str(e)}")
 
 
+@router.get("/{trip_id}/polls/{poll_id}")
+def get_poll(trip_id: str, poll_id: str, offset: int = 0, limit: int = VOTE_DETAILS_PAGE_SIZE) -> Response:
+    """Get poll results with one page of vote_details."""
+    if offset < 0 or not 1 <= limit <= VOTE_DETAILS_MAX_PAGE_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"offset must be >= 0 and limit between 1 and {VOTE_DETAILS_MAX_PAGE_SIZE}"
+        )
+    try:
+        poll = storage.get_poll_or_404(poll_id)
+        if poll.trip_id != trip_id:
+            raise HTTPException(status_code=404, detail="Poll not found")
+        names = storage.get_member_names(trip_id)
+        results = serializers.serialize_poll_results(poll, storage.get_poll_votes(poll_id), names, offset, limit)
+        return serializers.json_response(results)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail="Poll not found")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to get poll: {str(e)}")
+
+
 @router.post("/{trip_id}/polls/{poll_id}/close")
-def close_poll(trip_id: str, poll_id: str, req: ClosePollRequest) -> Dict[str, Any]:
+def close_poll(trip_id: str, poll_id: str, req: ClosePollRequest) -> Response:
     """Close a poll. Organiser only."""
     try:
         trip = storage.get_trip_or_404(trip_id)
@@ -1,20 +1,181 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, HTTPException, Request, Response
+from typing import List, Dict, Any, Optional, Set, Tuple
 from datetime import datetime
 from app.models import (
-    CreateTripRequest, JoinTripRequest, UpdateBriefRequest,
+    CreateTripRequest, JoinTripRequest, RenameMemberRequest, UpdateBriefRequest,
     RequiredAttendeesRequest, UpsertMemberInputsRequest
 )
-from app import storage
-from app.services import seed
+from app import idempotency, storage, serializers
+from app.aggregates import MAX_HEATMAP_DAYS, ONE_DAY, parse_availability, parse_day
+from app.services import seed, prefetch
 
 router = APIRouter(prefix="/trips", tags=["trips"])
 
+# ============================================================================
+# TRIP DOCUMENT SECTIONS
+# ============================================================================
+
+def build_trip_section(trip_id: str) -> Dict[str, Any]:
+    return serializers.serialize_trip(storage.get_trip_or_404(trip_id))
+
+
+def build_members_section(trip_id: str) -> List[Dict[str, Any]]:
+    members = storage.get_trip_members(trip_id)
+    return [{"id": m.id, "name": m.name, "role": m.role} for m in members]
+
+
+def build_constraints_completion_section(trip_id: str) -> List[Dict[str, Any]]:
+    constraints_completion = []
+    for member in storage.get_trip_members(trip_id):
+        member_constraints = storage.get_constraints(member.id)
+        member_availability = storage.get_availability(member.id)
+        has_constraints = member_constraints is not None
+        has_availability = member_availability is not None and bool(member_availability.ranges)
+        constraints_completion.append({
+            "member_id": member.id,
+            "name": member.name,
+            "has_constraints": has_constraints,
+            "has_availability": has_availability
+        })
+    return constraints_completion
+
+
+def build_polls_section(trip_id: str) -> List[Dict[str, Any]]:
+    names = storage.get_member_names(trip_id)
+    return [
+        serializers.serialize_poll_summary(poll, storage.get_poll_votes(poll.id), names)
+        for poll in storage.get_all_polls_for_trip(trip_id)
+    ]
+
+
+def build_latest_plan_section(trip_id: str) -> Optional[Dict[str, Any]]:
+    # Reference only; options are served by GET /plans/{version_num}
+    latest = storage.get_latest_plan(trip_id)
+    return serializers.serialize_plan_ref(latest) if latest else None
+
+
+def build_feedback_summary_section(trip_id: str) -> Dict[str, Any]:
+    stats = storage.get_feedback_stats(trip_id).total
+    return {
+        "total_count": stats.count,
+        "average_rating": stats.average_rating,
+        "by_member": len(stats.members)
+    }
+
+
+# Section name -> builder, in document order
+TRIP_SECTIONS = {
+    "trip": build_trip_section,
+    "members": build_members_section,
+    "constraints_completion": build_constraints_completion_section,
+    "polls": build_polls_section,
+    "latest_plan": build_latest_plan_section,
+    "feedback_summary": build_feedback_summary_section,
+}
+
+
+def parse_sections(include: Optional[str], exclude: Optional[str]) -> List[str]:
+    """Resolve include=/exclude= comma lists into the sections to build."""
+    def split(value: str) -> List[str]:
+        names = [name.strip() for name in value.split(",") if name.strip()]
+        unknown = [name for name in names if name not in TRIP_SECTIONS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown trip sections: {', '.join(unknown)}")
+        return names
+
+    selected = split(include) if include else list(TRIP_SECTIONS)
+    excluded = set(split(exclude)) if exclude else set()
+    return [name for name in TRIP_SECTIONS if name in selected and name not in excluded]
+
+
+# ============================================================================
+# MATERIALIZED TRIP DOCUMENT
+# ============================================================================
+# Dashboards poll GET /trips/{trip_id} every few seconds, and most polls see
+# nothing new. Every mutation bumps the trip's change sequence, which serves
+# as the document revision. Built sections and encoded bodies are kept per
+# trip for the current revision, so a repeat GET is a dict lookup plus a
+# write of ready-made bytes. When the revision moves on, the change log says
+# which sections went stale; only those are rebuilt, on the next GET.
+
+# Change type -> sections it can alter; unknown types invalidate everything
+SECTIONS_BY_CHANGE = {
+    "member_joined": ("members", "constraints_completion"),
+    "member_renamed": ("members", "constraints_completion", "polls"),
+    "trip_updated": ("trip",),
+    "constraints_updated": ("constraints_completion",),
+    "availability_updated": ("constraints_completion",),
+    "poll_created": ("polls",),
+    "vote_upserted": ("polls",),
+    "vote_removed": ("polls",),
+    "poll_closed": ("polls",),
+    "plan_added": ("latest_plan",),
+    "feedback_added": ("feedback_summary",),
+}
+
+
+class TripDocument:
+    """A trip's sections and encoded bodies (per section list) at one revision."""
+    __slots__ = ("revision", "sections", "encoded")
+
+    def __init__(self, revision: int, sections: Optional[Dict[str, Any]] = None):
+        self.revision = revision
+        self.sections: Dict[str, Any] = sections or {}
+        self.encoded: Dict[Tuple[str, ...], serializers.EncodedBody] = {}
+
+
+_documents: Dict[str, TripDocument] = {}
+
+
+def _stale_sections(trip_id: str, since: int, revision: int) -> Optional[Set[str]]:
+    """Sections changed between revisions `since` and `revision`, or None if everything must be rebuilt."""
+    changes, resync = storage.get_changes_since(trip_id, since)
+    # A partial or overlapping view of the log can't say what's stale
+    if resync or len(changes) != revision - since:
+        return None
+    stale: Set[str] = set()
+    for change in changes:
+        names = SECTIONS_BY_CHANGE.get(change["type"])
+        if names is None:
+            return None
+        stale.update(names)
+    return stale
+
+
+def get_trip_document(trip_id: str, sections: List[str]) -> serializers.EncodedBody:
+    """Encoded trip document for `sections` at the trip's current revision."""
+    # Read the revision before building: a write that lands mid-build then
+    # only makes this entry stale for the next GET, never wrong under its revision
+    revision = storage.get_trip_revision(trip_id)
+    document = _documents.get(trip_id)
+    if document is None or document.revision != revision:
+        carried: Dict[str, Any] = {}
+        if document is not None and document.revision < revision:
+            stale = _stale_sections(trip_id, document.revision, revision)
+            if stale is not None:
+                carried = {name: value for name, value in document.sections.items() if name not in stale}
+        fresh = TripDocument(revision, carried)
+        if document is None or document.revision < revision:
+            _documents[trip_id] = fresh
+        document = fresh
+
+    key = tuple(sections)
+    encoded = document.encoded.get(key)
+    if encoded is None:
+        for name in sections:
+            if name not in document.sections:
+                document.sections[name] = TRIP_SECTIONS[name](trip_id)
+        encoded = serializers.encode_body({name: document.sections[name] for name in sections})
+        document.encoded[key] = encoded
+    return encoded
+
+
 # ============================================================================
 # ENDPOINTS
 # ============================================================================
 
 @router.post("/")
+@idempotency.idempotent("create_trip")
 def create_trip(req: CreateTripRequest) -> Dict[str, str]:
     """Create new trip with organiser member."""
     try:
@@ -38,11 +199,13 @@ def create_trip(req: CreateTripRequest) -> Dict[str, str]:
 
 
 @router.post("/{trip_id}/join")
+@idempotency.idempotent("join", "trip_id")
 def join_trip(trip_id: str, req: JoinTripRequest) -> Dict[str, str]:
     """Add new member to trip."""
     try:
         storage.get_trip_or_404(trip_id)
         member = storage.join_trip(trip_id, req.name)
+        prefetch.notify_inputs_changed(trip_id)
         return {"member_id": member.id}
     except ValueError as e:
         raise HTTPException(status_code=404, detail="Trip not found")
@@ -51,119 +214,83 @@ def join_trip(trip_id: str, req: JoinTripRequest) -> Dict[str, str]:
 
 
 @router.get("/{trip_id}")
-def get_trip(trip_id: str) -> Dict[str, Any]:
-    """Get full trip state."""
+def get_trip(trip_id: str, request: Request, include: Optional[str] = None,
+             exclude: Optional[str] = None) -> Response:
+    """Get trip state.
+
+    include / exclude take comma-separated section names (see TRIP_SECTIONS)
+    so screens can fetch only what they render, e.g. ?include=trip,members.
+    Served from the materialized document with an ETag, so an unchanged
+    trip answers If-None-Match with 304.
+    """
     try:
-        trip = storage.get_trip_or_404(trip_id)
-        members = storage.get_trip_members(trip_id)
-        
-        # Build members list
-        members_list = [{"id": m.id, "name": m.name, "role": m.role} for m in members]
-        
-        # Build constraints completion status
-        constraints_completion = []
-        for member in members:
-            member_constraints = storage.get_constraints(member.id)
-            member_availability = storage.get_availability(member.id)
-            has_constraints = member_constraints is not None
-            has_availability = member_availability is not None and bool(member_availability.available_dates)
-            constraints_completion.append({
-                "member_id": member.id,
-                "name": member.name,
-                "has_constraints": has_constraints,
-                "has_availability": has_availability
-            })
-        
-        # Build polls summary
-        polls_summary = []
-        trip_polls = storage.get_all_polls_for_trip(trip_id)
-        for poll in trip_polls:
-            # Get votes for poll with member names
-            votes_for_poll = storage.get_poll_votes(poll.id)
-            votes_list = []
-            for vote in votes_for_poll:
-                try:
-                    member = storage.get_member_or_404(vote.member_id)
-                    member_name = member.name
-                except ValueError:
-                    member_name = "Unknown"
-                votes_list.append({
-                    "member_id": vote.member_id,
-                    "member_name": member_name,
-                    "option_id": vote.option_id,
-                    "value": vote.value,
-                    "start_date": vote.start_date,
-                    "end_date": vote.end_date
-                })
-            
-            polls_summary.append({
-                "id": poll.id,
-                "question": poll.question,
-                "type": poll.type,
-                "is_open": poll.is_open,
-                "options": [{"id": opt.id, "label": opt.label} for opt in poll.options],
-                "slider": poll.slider.dict() if poll.slider else None,
-                "date_window": poll.date_window.dict() if poll.date_window else None,
-                "votes": votes_list
-            })
-        
-        # Build latest plan
-        latest_plan = None
-        plan_list = storage.get_plans_for_trip(trip_id)
-        if plan_list:
-            latest = plan_list[-1]
-            latest_plan = {
-                "id": latest.id,
-                "version_num": latest.version_num,
-                "created_at": latest.created_at.isoformat(),
-                "options": [
-                    {
-                        "id": opt.id,
-                        "title": opt.title,
-                        "destination": opt.destination,
-                        "date_window": opt.date_window,
-                        "summary": opt.summary
-                    }
-                    for opt in latest.options
-                ]
-            }
-        
-        # Build feedback summary
-        feedback_list = storage.get_feedback_for_trip(trip_id)
-        feedback_summary = {
-            "total_count": len(feedback_list),
-            "average_rating": sum(f.rating for f in feedback_list) / len(feedback_list) if feedback_list else 0,
-            "by_member": len(set(f.member_id for f in feedback_list))
-        }
-        
-        return {
-            "trip": {
-                "id": trip.id,
-                "name": trip.name,
-                "organiser_member_id": trip.organiser_member_id,
-                "brief": trip.brief,
-                "origin": trip.origin,
-                "destination_seed_list": trip.destination_seed_list,
-                "required_member_ids": trip.required_member_ids,
-                "created_at": trip.created_at.isoformat()
-            },
-            "members": members_list,
-            "constraints_completion": constraints_completion,
-            "polls": polls_summary,
-            "latest_plan": latest_plan,
-            "feedback_summary": feedback_summary
-        }
+        sections = parse_sections(include, exclude)
+        storage.get_trip_or_404(trip_id)
+        return serializers.encoded_response(get_trip_document(trip_id, sections), request, "no-cache")
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=404, detail="Trip not found")
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to get trip: {str(e)}")
 
 
+@router.get("/{trip_id}/changes")
+def get_trip_changes(trip_id: str, since: Optional[int] = None) -> Response:
+    """Get trip changes after sequence number `since`.
+
+    Without `since`, returns only the current sequence number so a client can
+    take a cursor before fetching the full trip. When `resync` is true the log
+    no longer covers `since` and the client must refetch GET /trips/{trip_id}.
+    """
+    try:
+        storage.get_trip_or_404(trip_id)
+        seq = storage.get_trip_revision(trip_id)
+        if since is None:
+            return serializers.json_response({"trip_id": trip_id, "seq": seq, "changes": [], "resync": False})
+        changes, resync = storage.get_changes_since(trip_id, since)
+        return serializers.json_response({"trip_id": trip_id, "seq": seq, "changes": changes, "resync": resync})
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail="Trip not found")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to get changes: {str(e)}")
+
+
+@router.get("/{trip_id}/availability/heatmap")
+def get_availability_heatmap(trip_id: str, start: Optional[str] = None, end: Optional[str] = None) -> Response:
+    """Per-day count of free members, flagging days every required attendee is free.
+
+    start / end (YYYY-MM-DD) bound the days returned, at most MAX_HEATMAP_DAYS
+    apart; by default the heatmap starts on the first day anyone is free.
+    """
+    try:
+        start_day = parse_day(start) if start else None
+        end_day = parse_day(end) if end else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if start_day and end_day and (end_day - start_day).days + 1 > MAX_HEATMAP_DAYS:
+        raise HTTPException(status_code=400, detail=f"start..end must span at most {MAX_HEATMAP_DAYS} days")
+    if end_day and not start_day:
+        start_day = end_day - (MAX_HEATMAP_DAYS - 1) * ONE_DAY
+    try:
+        counts = storage.get_availability_counts(trip_id)
+        return serializers.json_response({
+            "trip_id": trip_id,
+            "required_member_ids": sorted(counts.required_ids),
+            "days": counts.heatmap(start_day, end_day)
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail="Trip not found")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to get availability heatmap: {str(e)}")
+
+
 @router.put("/{trip_id}/brief")
 def update_brief(trip_id: str, req: UpdateBriefRequest) -> Dict[str, bool]:
     """Update trip brief."""
     try:
         storage.update_brief(trip_id, req.brief)
+        prefetch.notify_inputs_changed(trip_id)
         return {"success": True}
     except ValueError as e:
         raise HTTPException(status_code=404, detail="Trip not found")
@@ -176,6 +303,7 @@ def set_required_attendees(trip_id: str, req: RequiredAttendeesRequest) -> Dict[
     """Set required attendee members."""
     try:
         storage.set_required_attendees(trip_id, req.required_member_ids)
+        prefetch.notify_inputs_changed(trip_id)
         return {"success": True}
     except ValueError as e:
         msg = str(e)
@@ -186,12 +314,31 @@ def set_required_attendees(trip_id: str, req: RequiredAttendeesRequest) -> Dict[
         raise HTTPException(status_code=400, detail=f"Failed to set required attendees: {str(e)}")
 
 
+@router.put("/{trip_id}/members/{member_id}/name")
+def rename_member(trip_id: str, member_id: str, req: RenameMemberRequest) -> Dict[str, bool]:
+    """Change a member's display name."""
+    try:
+        storage.rename_member(trip_id, member_id, req.name)
+        return {"success": True}
+    except ValueError as e:
+        msg = str(e)
+        if "not found" in msg.lower():
+            raise HTTPException(status_code=404, detail="Member or trip not found")
+        if "not in trip" in msg.lower():
+            raise HTTPException(status_code=403, detail="Member not authorized for this trip")
+        raise HTTPException(status_code=400, detail=msg)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to rename member: {str(e)}")
+
+
 @router.put("/{trip_id}/members/{member_id}/constraints")
 def upsert_member_constraints(trip_id: str, member_id: str, req: UpsertMemberInputsRequest) -> Dict[str, bool]:
     """Upsert member constraints and availability."""
     try:
         # Validate member belongs to trip
         member = storage.assert_member_in_trip(member_id, trip_id)
+        # Parse availability first so a bad range leaves both records untouched
+        ranges = parse_availability(req.available_dates or [], req.available_ranges or [])
         
         # Upsert constraints
         storage.upsert_constraints(
@@ -206,7 +353,8 @@ def upsert_member_constraints(trip_id: str, member_id: str, req: UpsertMemberInp
         )
         
         # Upsert availability
-        storage.upsert_availability(member_id, req.available_dates)
+        storage.set_availability_ranges(member, ranges)
+        prefetch.notify_inputs_changed(trip_id)
         
         return {"success": True}
     except ValueError as e:
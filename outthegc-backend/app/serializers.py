@@ -0,0 +1,263 @@
+import gzip
+import hashlib
+import json
+from typing import Any, Dict, List, NamedTuple, Optional
+from fastapi import Request, Response
+try:
+    import orjson
+except ImportError:  # Optional dependency, falls back to stdlib json
+    orjson = None
+from app import storage
+
+# ============================================================================
+# ENCODING
+# ============================================================================
+
+def dumps(payload: Any) -> bytes:
+    """Encode a payload of plain JSON types to UTF-8 bytes."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def json_response(payload: Any, status_code: int = 200,
+                  headers: Optional[Dict[str, str]] = None) -> Response:
+    """Encode payload once and return it as a raw response.
+
+    Bypasses FastAPI's jsonable_encoder pass, so payloads must already be
+    plain JSON types (datetimes as ISO strings).
+    """
+    return Response(
+        content=dumps(payload),
+        status_code=status_code,
+        media_type="application/json",
+        headers=headers
+    )
+
+
+# ============================================================================
+# MODEL SERIALIZERS
+# ============================================================================
+
+def serialize_trip(trip) -> Dict[str, Any]:
+    """Trip header fields."""
+    return {
+        "id": trip.id,
+        "name": trip.name,
+        "organiser_member_id": trip.organiser_member_id,
+        "brief": trip.brief,
+        "origin": trip.origin,
+        "destination_seed_list": trip.destination_seed_list,
+        "required_member_ids": trip.required_member_ids,
+        "created_at": trip.created_at.isoformat()
+    }
+
+
+def serialize_vote(vote, names: Dict[str, str]) -> Dict[str, Any]:
+    """Single vote with the voter's display name.
+
+    `names` is the trip's member-name map (storage.get_member_names), fetched
+    once per response rather than per vote.
+    """
+    return {
+        "member_id": vote.member_id,
+        "member_name": names.get(vote.member_id, "Unknown"),
+        "option_id": vote.option_id,
+        "value": vote.value,
+        "start_date": vote.start_date,
+        "end_date": vote.end_date
+    }
+
+
+def serialize_poll_aggregates(poll) -> Dict[str, Any]:
+    """Precomputed per-type summaries (slider statistics, date heatmap)."""
+    if poll.type == "slider":
+        tally = storage.get_slider_tally(poll.id)
+        if tally is not None:
+            return {"slider_summary": tally.summary()}
+    elif poll.type == "dates":
+        tally = storage.get_date_tally(poll.id)
+        if tally is not None:
+            return {"date_summary": tally.summary()}
+    return {}
+
+
+def serialize_poll_summary(poll, votes: List, names: Dict[str, str]) -> Dict[str, Any]:
+    """Poll as embedded in the trip document."""
+    return {
+        "id": poll.id,
+        "question": poll.question,
+        "type": poll.type,
+        "is_open": poll.is_open,
+        "options": [{"id": opt.id, "label": opt.label} for opt in poll.options],
+        "slider": poll.slider.dict() if poll.slider else None,
+        "date_window": poll.date_window.dict() if poll.date_window else None,
+        "votes": [serialize_vote(v, names) for v in votes],
+        **serialize_poll_aggregates(poll)
+    }
+
+
+def serialize_poll_results(poll, votes: List, names: Dict[str, str],
+                           offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+    """Poll with per-option vote counts and vote details.
+
+    With `limit`, vote_details holds one page starting at `offset`, and
+    vote_details_page describes it. Only that page's voters are serialized.
+    """
+    if poll.type in ["slider", "dates"]:
+        ordered = votes
+    else:
+        # Group in a single pass, then emit details in option order
+        votes_by_option = {opt.id: [] for opt in poll.options}
+        for vote in votes:
+            if vote.option_id in votes_by_option:
+                votes_by_option[vote.option_id].append(vote)
+        ordered = [v for opt in poll.options for v in votes_by_option[opt.id]]
+    page = ordered[offset:offset + limit] if limit is not None else ordered[offset:]
+    counts = storage.get_option_counts(poll.id)
+
+    result = {
+        "poll_id": poll.id,
+        "trip_id": poll.trip_id,
+        "type": poll.type,
+        "question": poll.question,
+        "options": [
+            {
+                "id": opt.id,
+                "label": opt.label,
+                "vote_count": counts.get(opt.id, 0)
+            }
+            for opt in poll.options
+        ],
+        "slider": poll.slider.dict() if poll.slider else None,
+        "date_window": poll.date_window.dict() if poll.date_window else None,
+        "is_open": poll.is_open,
+        "created_at": poll.created_at.isoformat(),
+        "total_votes": len(votes),
+        "vote_details": [serialize_vote(v, names) for v in page],
+        **serialize_poll_aggregates(poll)
+    }
+    if limit is not None:
+        end = offset + len(page)
+        result["vote_details_page"] = {
+            "offset": offset,
+            "limit": limit,
+            "total": len(ordered),
+            "next_offset": end if end < len(ordered) else None
+        }
+    return result
+
+
+def serialize_vote_ack(poll, vote) -> Dict[str, Any]:
+    """Just the caller's stored vote (vote ?response=ack)."""
+    return {"poll_id": poll.id, "vote": serialize_vote(vote, storage.get_member_names(poll.trip_id))}
+
+
+def serialize_vote_delta(poll, vote, changed_option_ids) -> Dict[str, Any]:
+    """Caller's vote plus the counters it changed (vote ?response=delta).
+
+    Choice polls list only the options whose counts moved; slider and dates
+    polls carry their running summary instead.
+    """
+    counts = storage.get_option_counts(poll.id)
+    return {
+        **serialize_vote_ack(poll, vote),
+        "options": [
+            {"id": opt.id, "vote_count": counts.get(opt.id, 0)}
+            for opt in poll.options
+            if opt.id in changed_option_ids
+        ],
+        "total_votes": storage.count_poll_votes(poll.id),
+        **serialize_poll_aggregates(poll)
+    }
+
+
+def serialize_option(opt) -> Dict[str, Any]:
+    """Trip option with full itinerary, costs and packing details."""
+    return {
+        "id": opt.id,
+        "title": opt.title,
+        "destination": opt.destination,
+        "date_window": opt.date_window,
+        "summary": opt.summary,
+        "itinerary": opt.itinerary,
+        "transport": opt.transport,
+        "costs": opt.costs,
+        "packing_list": opt.packing_list,
+        "rationale": opt.rationale,
+        "assumptions": opt.assumptions
+    }
+
+
+def serialize_plan(plan_version) -> Dict[str, Any]:
+    """Plan version with its options."""
+    return {
+        "id": plan_version.id,
+        "trip_id": plan_version.trip_id,
+        "version_num": plan_version.version_num,
+        "created_at": plan_version.created_at.isoformat(),
+        "options": [serialize_option(opt) for opt in plan_version.options]
+    }
+
+
+def serialize_plan_ref(plan_version) -> Dict[str, Any]:
+    """Pointer to a plan version, as embedded in the trip document."""
+    return {
+        "id": plan_version.id,
+        "version_num": plan_version.version_num,
+        "created_at": plan_version.created_at.isoformat(),
+        "href": f"/trips/{plan_version.trip_id}/plans/{plan_version.version_num}"
+    }
+
+
+# ============================================================================
+# PLAN CACHE
+# ============================================================================
+# Plan versions are never modified once stored, so each one is encoded (and
+# gzipped) at most once and served from these bytes afterwards.
+
+class EncodedBody(NamedTuple):
+    body: bytes
+    gzipped: Optional[bytes]
+    etag: str
+
+
+# Skip compression for small bodies where gzip framing outweighs the saving
+GZIP_MIN_BYTES = 1024
+
+_encoded_plans: Dict[str, EncodedBody] = {}
+
+
+def encode_body(payload: Any) -> EncodedBody:
+    """Encode a payload once, with its gzipped form and a content ETag."""
+    body = dumps(payload)
+    gzipped = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_BYTES else None
+    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+    return EncodedBody(body, gzipped, etag)
+
+
+def encode_plan(plan_version) -> EncodedBody:
+    """Get the cached encoding of a plan version, building it on first use."""
+    cached = _encoded_plans.get(plan_version.id)
+    if cached is None:
+        cached = encode_body(serialize_plan(plan_version))
+        _encoded_plans[plan_version.id] = cached
+    return cached
+
+
+def encoded_response(encoded: EncodedBody, request: Request, cache_control: str) -> Response:
+    """Serve pre-encoded bytes: 304 on a matching If-None-Match, gzip when accepted."""
+    headers = {
+        "Cache-Control": cache_control,
+        "ETag": encoded.etag,
+        "Vary": "Accept-Encoding"
+    }
+
+    if request.headers.get("if-none-match") == encoded.etag:
+        return Response(status_code=304, headers=headers)
+
+    accepts_gzip = "gzip" in request.headers.get("accept-encoding", "")
+    if encoded.gzipped is not None and accepts_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=encoded.gzipped, media_type="application/json", headers=headers)
+    return Response(content=encoded.body, media_type="application/json", headers=headers)
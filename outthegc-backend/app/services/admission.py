@@ -0,0 +1,166 @@
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator
+from app import config
+
+# ============================================================================
+# ADMISSION CONTROL FOR AI GENERATION
+# ============================================================================
+# Each generation holds a worker thread for seconds, so they are admitted
+# through three gates:
+#   1. a per-trip token bucket (AI_TRIP_RATE_PER_MINUTE, burst AI_TRIP_BURST)
+#   2. a global limit of AI_MAX_CONCURRENT generations in flight
+#   3. a bounded wait queue, served round-robin across trips so a trip with
+#      several queued requests can't starve the others
+# Anything that can't be admitted raises AdmissionRejected, which routes turn
+# into 429 with Retry-After.
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated = now
+
+
+class _Waiter:
+    __slots__ = ("event", "granted")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent: int, queue_size: int, queued_per_trip: int,
+                 queue_timeout: float, rate_per_minute: float, burst: int):
+        self.max_concurrent = max_concurrent
+        self.queue_size = queue_size
+        self.queued_per_trip = queued_per_trip
+        self.queue_timeout = queue_timeout
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._running = 0
+        self._queued = 0
+        # trip_id -> waiters; order of keys is the round-robin order
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._avg_seconds = 10.0  # running estimate of generation time, for Retry-After
+
+    # ------------------------------------------------------------------------
+
+    def _take_token(self, trip_id: str, now: float) -> None:
+        bucket = self._buckets.get(trip_id)
+        if bucket is None:
+            bucket = self._buckets[trip_id] = TokenBucket(self.burst, now)
+        bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+        bucket.updated = now
+        if bucket.tokens < 1:
+            raise AdmissionRejected("Trip generation rate limit exceeded", (1 - bucket.tokens) / self.rate)
+        bucket.tokens -= 1
+
+    def _queue_wait_estimate(self) -> float:
+        return self._avg_seconds * (self._queued // self.max_concurrent + 1)
+
+    def _refund(self, trip_id: str) -> None:
+        bucket = self._buckets.get(trip_id)
+        if bucket is not None:
+            bucket.tokens = min(self.burst, bucket.tokens + 1)
+
+    def _reject(self, trip_id: str, charged: bool, reason: str) -> AdmissionRejected:
+        # Caller holds the lock. Requests that never ran don't use up the trip's rate.
+        if charged:
+            self._refund(trip_id)
+        return AdmissionRejected(reason, self._queue_wait_estimate())
+
+    def _acquire(self, trip_id: str, queue: bool, rate_limit: bool) -> None:
+        with self._lock:
+            if rate_limit:
+                self._take_token(trip_id, time.monotonic())
+            if self._running < self.max_concurrent and not self._queued:
+                self._running += 1
+                return
+            trip_queue = self._queues.get(trip_id)
+            if not queue or self._queued >= self.queue_size or (
+                trip_queue is not None and len(trip_queue) >= self.queued_per_trip
+            ):
+                raise self._reject(trip_id, rate_limit, "AI generation is busy, try again shortly")
+            waiter = _Waiter()
+            if trip_queue is None:
+                trip_queue = self._queues[trip_id] = deque()
+            trip_queue.append(waiter)
+            self._queued += 1
+
+        waiter.event.wait(self.queue_timeout)
+        with self._lock:
+            if waiter.granted:
+                return
+            # Timed out: leave the queue
+            trip_queue = self._queues.get(trip_id)
+            if trip_queue is not None and waiter in trip_queue:
+                trip_queue.remove(waiter)
+                self._queued -= 1
+                if not trip_queue:
+                    del self._queues[trip_id]
+            raise self._reject(trip_id, rate_limit, "Timed out waiting for an AI generation slot")
+
+    def _release(self, elapsed: float) -> None:
+        with self._lock:
+            self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * elapsed
+            if not self._queues:
+                self._running -= 1
+                return
+            # Hand the slot straight to the next trip in round-robin order
+            trip_id, trip_queue = next(iter(self._queues.items()))
+            waiter = trip_queue.popleft()
+            self._queued -= 1
+            if trip_queue:
+                self._queues.move_to_end(trip_id)
+            else:
+                del self._queues[trip_id]
+            waiter.granted = True
+            waiter.event.set()
+
+    @contextmanager
+    def slot(self, trip_id: str, queue: bool = True, rate_limit: bool = True) -> Iterator[None]:
+        """Hold a generation slot for the duration of the block.
+
+        queue=False fails fast instead of waiting; rate_limit=False skips the
+        trip's token bucket (used for speculative work).
+        """
+        self._acquire(trip_id, queue, rate_limit)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - started)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"running": self._running, "queued": self._queued, "queued_trips": len(self._queues)}
+
+
+controller = AdmissionController(
+    max_concurrent=config.AI_MAX_CONCURRENT,
+    queue_size=config.AI_QUEUE_SIZE,
+    queued_per_trip=config.AI_MAX_QUEUED_PER_TRIP,
+    queue_timeout=config.AI_QUEUE_TIMEOUT_SECONDS,
+    rate_per_minute=config.AI_TRIP_RATE_PER_MINUTE,
+    burst=config.AI_TRIP_BURST
+)
@@ -1,13 +1,13 @@
+import asyncio
+import hashlib
 import json
-from typing import Optional, List, Dict, Any
+import time
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime
-try:
-    from anthropic import Anthropic
-except ImportError:  # Optional if dependency not installed
-    Anthropic = None
 from app.models import PlanVersion, Option
 from app import storage, config
-from app.services import availability
+from app.services import availability, llm, parsing, planner, usage
+from app.services.catalog import CATALOG
 
 
 # ============================================================================
@@ -38,26 +38,23 @@ def aggregate_trip_context(trip_id: str) -> Dict[str, Any]:
     availability_status = []
     for member in members:
         avail = storage.availability_by_member.get(member.id)
-        has_dates = bool(avail and avail.available_dates)
+        has_dates = bool(avail and avail.ranges)
         availability_status.append({
             'member_name': member.name,
             'provided': has_dates,
-            'count': len(avail.available_dates) if avail else 0
+            'count': avail.day_count() if avail else 0
         })
     
     # Get best availability windows
     best_windows = availability.find_best_availability_windows(trip_id, window_length=4)
     
     # Feedback summaries (for reruns)
-    feedback_list = storage.get_feedback_for_trip(trip_id)
+    feedback_stats = storage.get_feedback_stats(trip_id).total
     feedback_summary = {
-        'total_feedback_count': len(feedback_list),
-        'average_rating': sum(f.rating for f in feedback_list) / len(feedback_list) if feedback_list else 0,
-        'common_dislikes': {}
+        'total_feedback_count': feedback_stats.count,
+        'average_rating': feedback_stats.average_rating,
+        'common_dislikes': dict(feedback_stats.dislikes)
     }
-    for f in feedback_list:
-        for activity_id in f.disliked_activity_ids:
-            feedback_summary['common_dislikes'][activity_id] = feedback_summary['common_dislikes'].get(activity_id, 0) + 1
     
     return {
         'trip': {
@@ -76,21 +73,45 @@ def aggregate_trip_context(trip_id: str) -> Dict[str, Any]:
     }
 
 
+def input_fingerprint(trip_id: str, duration_days: Optional[int] = None,
+                      mode: Optional[str] = None) -> str:
+    """Hash of everything generation reads, so identical requests can share a result."""
+    payload = json.dumps(
+        [aggregate_trip_context(trip_id), duration_days, mode],
+        sort_keys=True, default=str
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
 # ============================================================================
 # PROMPT BUILDER
 # ============================================================================
+# Everything that doesn't depend on the trip lives in SYSTEM_PROMPT, sent as
+# a system block marked for provider-side prompt caching. It must stay byte-
+# identical between calls for the cache to hit, so keep trip data out of it.
+# The user message carries only the small per-trip section. Providers only
+# cache prefixes above a minimum size (1024-2048 tokens depending on model);
+# the catalog reference keeps the prefix above it.
+
+def _catalog_reference() -> str:
+    """Planner catalog as compact reference lines (static, so part of the cached prefix)."""
+    lines = []
+    for dest in CATALOG:
+        transport = dest['transport']
+        lines.append(
+            f"- {dest['name']} [{', '.join(dest['tags'])}]: {transport['mode']} ~{transport['duration']}, "
+            f"~£{transport['cost']} return; stay ~£{dest['accommodation_per_night']}/night; "
+            f"food ~£{dest['food_per_day']}/day"
+        )
+        for activity in dest['activities']:
+            lines.append(f"  - {activity['title']} ({', '.join(activity['tags'])}; ~£{activity['cost']})")
+    return "\n".join(lines)
 
-def build_ai_prompt(trip_id: str) -> str:
-    """Build comprehensive prompt for Claude."""
-    context = aggregate_trip_context(trip_id)
-    trip = context['trip']
-    constraints = context['constraints']
-    windows = context['best_windows']
-    
-    prompt = f"""You are an expert travel planner AI and group decision assistant.
 
-Your task is to generate MULTIPLE realistic holiday plan options for a group of people,
-based strictly on the structured input provided.
+SYSTEM_PROMPT = """You are an expert travel planner AI and group decision assistant.
+
+Your task is to generate realistic holiday plan options for a group of people,
+based strictly on the structured input provided in the user message.
 
 You must follow ALL instructions carefully.
 
@@ -114,48 +135,6 @@ You are NOT resolving conflicts.
 
 You are ONLY generating holiday plan OPTIONS that respect the given constraints.
 
-────────────────────────────────
-INPUT DATA
-────────────────────────────────
-
-**Trip Details:**
-- Name: {trip['name']}
-- Origin: {trip['origin']}
-- Organiser Brief: {trip.get('brief', 'No brief provided')}
-- Destination Candidates: {', '.join(trip['destination_seed_list']) if trip['destination_seed_list'] else 'Open to suggestions'}
-
-**Members:**
-{json.dumps(context['members'], indent=2)}
-
-**Member Constraints & Preferences:**
-{json.dumps(constraints, indent=2)}
-
-**Best Availability Windows:**
-{json.dumps(windows, indent=2)}
-
-**Feedback Summary:**
-{json.dumps(context['feedback_summary'], indent=2)}
-
-────────────────────────────────
-WHAT YOU MUST GENERATE
-────────────────────────────────
-
-You MUST generate EXACTLY **3 holiday options**.
-
-Each option must:
-- be clearly distinct from the others
-- target a different travel "style" where possible
-- use DIFFERENT destinations (vary style: beach vs city vs mountains, etc.)
-- use DIFFERENT date windows (spread across available windows)
-- stay realistic and internally consistent
-- respect budget and constraints
-
-Label them: Option A, Option B, Option C
-
-DO NOT invent extra options.
-DO NOT ask questions.
-DO NOT include explanations outside the JSON.
-
 ────────────────────────────────
 OPTION REQUIREMENTS
 ────────────────────────────────
@@ -191,52 +170,53 @@ NO commentary.
 NO explanations.
 NO trailing text.
 
-Use EXACTLY this schema:
-
-[
-  {{
-    "id": "option-a",
-    "title": "string",
-    "destination": "City, Country",
-    "date_window": "string (use from best_windows verbatim)",
-    "summary": "2-3 sentences",
-    "itinerary": [
-      {{
-        "day": 1,
-        "blocks": [
-          {{
-            "time": "08:00-09:00",
-            "title": "Breakfast",
-            "notes": "details"
-          }}
-        ]
-      }}
-    ],
-    "costs": {{
-      "total_per_person": 950,
-      "breakdown": {{
-        "transport": 200,
-        "accommodation": 400,
-        "food": 180,
-        "activities": 120,
-        "buffer": 50
-      }}
-    }},
-    "transport": [
-      {{
-        "leg": "origin -> destination",
-        "mode": "flight|train|coach|car",
-        "duration": "2h 15m",
-        "cost_per_person": 150
-      }}
-    ],
-    "packing_list": [
-      "item: reason"
-    ],
-    "rationale": "Why this option fits the group",
-    "assumptions": ["assumption1", "assumption2"]
-  }}
-]
+Each option is an object with EXACTLY this schema:
+
+{
+  "id": "option-a",
+  "title": "string",
+  "destination": "City, Country",
+  "date_window": "string (use the given window verbatim)",
+  "summary": "2-3 sentences",
+  "itinerary": [
+    {
+      "day": 1,
+      "blocks": [
+        {
+          "time": "08:00-09:00",
+          "title": "Breakfast",
+          "notes": "details"
+        }
+      ]
+    }
+  ],
+  "costs": {
+    "total_per_person": 950,
+    "breakdown": {
+      "transport": 200,
+      "accommodation": 400,
+      "food": 180,
+      "activities": 120,
+      "buffer": 50
+    }
+  },
+  "transport": [
+    {
+      "leg": "origin -> destination",
+      "mode": "flight|train|coach|car",
+      "duration": "2h 15m",
+      "cost_per_person": 150
+    }
+  ],
+  "packing_list": [
+    "item: reason"
+  ],
+  "rationale": "Why this option fits the group",
+  "assumptions": ["assumption1", "assumption2"]
+}
+
+When asked for several options, respond with a JSON array of these objects.
+When asked for one option, respond with a single object.
 
 ────────────────────────────────
 GUARDRAILS
@@ -256,139 +236,391 @@ If any required information is missing:
 
 Failure to follow format = invalid output.
 
+────────────────────────────────
+REFERENCE PRICES
+────────────────────────────────
+
+Typical per-person prices from a UK origin, for calibrating estimates.
+Other destinations are fine when they suit the group better.
+
+""" + _catalog_reference()
+
+
+def build_trip_section(context: Dict[str, Any]) -> str:
+    """Per-trip input data shared by every user message."""
+    trip = context['trip']
+    return f"""**Trip Details:**
+- Name: {trip['name']}
+- Origin: {trip['origin']}
+- Organiser Brief: {trip.get('brief') or 'No brief provided'}
+- Destination Candidates: {', '.join(trip['destination_seed_list']) if trip['destination_seed_list'] else 'Open to suggestions'}
+
+**Members:**
+{json.dumps(context['members'], indent=2)}
+
+**Member Constraints & Preferences:**
+{json.dumps(context['constraints'], indent=2)}
+
+**Feedback Summary:**
+{json.dumps(context['feedback_summary'], indent=2)}
+"""
+
+
+def build_ai_prompt(trip_id: str) -> str:
+    """User message asking for all three options in one reply (sent with SYSTEM_PROMPT)."""
+    context = aggregate_trip_context(trip_id)
+    return f"""{build_trip_section(context)}
+**Best Availability Windows:**
+{json.dumps(context['best_windows'], indent=2)}
+
+Generate EXACTLY 3 holiday options as a JSON array, labelled Option A, Option B, Option C
+(ids option-a, option-b, option-c). Each option must:
+- be clearly distinct from the others and target a different travel "style"
+- use DIFFERENT destinations (beach vs city vs mountains, etc.)
+- use DIFFERENT date windows (spread across the available windows)
+- stay realistic, internally consistent, and within budget and constraints
+
+BEGIN.
+"""
+
+
+def build_option_prompt(context: Dict[str, Any], label: str, style: str,
+                        destination: str, date_window: str, extra: str = "") -> str:
+    """User message for a single option of a given style, used by the per-option fan-out."""
+    return f"""{build_trip_section(context)}
+**This option:**
+- Label: Option {label} (id option-{label.lower()})
+- Style: {style}
+- Destination: {destination} (pick a similar destination only if this one clearly breaks a constraint)
+- Date window: {date_window} (use verbatim)
+{extra}
+Generate ONE holiday option as a single JSON object.
+
 BEGIN.
 """
-    return prompt
 
 
 # ============================================================================
-# MOCK OPTIONS (Deterministic Fallback)
+# OFFLINE OPTIONS (Catalog planner)
 # ============================================================================
 
-def generate_mock_options(trip_id: str) -> List[Option]:
-    """Generate deterministic mock trip options."""
-    context = aggregate_trip_context(trip_id)
-    trip = context['trip']
-    windows = context['best_windows']
-    
-    # Use first best window, or default dates
-    if windows:
-        date_window = windows[0]['window']
-        destination = trip['destination_seed_list'][0] if trip['destination_seed_list'] else "Barcelona, Spain"
-    else:
-        date_window = "2026-02-03..2026-02-06"
-        destination = trip['destination_seed_list'][0] if trip['destination_seed_list'] else "Barcelona, Spain"
-    
-    options = [
-        Option(
-            id="mock-opt-001",
-            title="Adventure Option",
-            destination=destination,
-            date_window=date_window,
-            summary="High-energy itinerary with outdoor activities and cultural exploration",
-            itinerary=[
-                {"day": 1, "activity": "Arrive and explore local markets"},
-                {"day": 2, "activity": "Hiking or outdoor adventure"},
-                {"day": 3, "activity": "City tour and cultural sites"},
-                {"day": 4, "activity": "Beach day or water activity"}
-            ],
-            transport=[
-                {"leg": f"{trip['origin']} -> {destination}", "mode": "flight", "duration": "2h", "cost_per_person": 180}
-            ],
-            costs={"accommodation": 400, "activities": 250, "transport": 180, "contingency": 100},
-            packing_list=["hiking boots", "swimsuit", "sunscreen", "casual clothes", "comfortable shoes"],
-            rationale="Balances activity levels and cultural immersion for diverse group",
-            assumptions=["Budget-conscious group", "Mix of adventure seekers", "4-day window available"]
-        ),
-        Option(
-            id="mock-opt-002",
-            title="Relaxation Option",
-            destination=destination,
-            date_window=date_window,
-            summary="Leisure-focused itinerary with wellness and cultural experiences",
-            itinerary=[
-                {"day": 1, "activity": "Arrive and settle in"},
-                {"day": 2, "activity": "Spa or wellness retreat"},
-                {"day": 3, "activity": "Museum visits and gastronomy"},
-                {"day": 4, "activity": "Leisurely local exploration"}
-            ],
-            transport=[
-                {"leg": f"{trip['origin']} -> {destination}", "mode": "flight", "duration": "2h", "cost_per_person": 160}
-            ],
-            costs={"accommodation": 500, "activities": 300, "transport": 160, "contingency": 100},
-            packing_list=["comfortable clothes", "spa essentials", "casual shoes", "light layers"],
-            rationale="Low-stress option emphasizing relaxation and cultural discovery",
-            assumptions=["Preference for downtime", "Moderate budget", "Mix of interests"]
-        ),
-        Option(
-            id="mock-opt-003",
-            title="Social Option",
-            destination=destination,
-            date_window=date_window,
-            summary="Group-focused itinerary with communal experiences and nightlife",
-            itinerary=[
-                {"day": 1, "activity": "Group welcome dinner"},
-                {"day": 2, "activity": "Guided group tour"},
-                {"day": 3, "activity": "Team activities and workshops"},
-                {"day": 4, "activity": "Celebration and local nightlife"}
-            ],
-            transport=[
-                {"leg": f"{trip['origin']} -> {destination}", "mode": "flight", "duration": "2h", "cost_per_person": 170}
-            ],
-            costs={"accommodation": 420, "activities": 280, "transport": 170, "contingency": 100},
-            packing_list=["evening attire", "comfortable walking shoes", "casual clothes", "small day bag"],
-            rationale="Maximizes group bonding with shared experiences and social activities",
-            assumptions=["Group cohesion important", "Mix of social comfort levels", "Evening activities welcome"]
-        )
-    ]
-    
-    return options
+def generate_mock_options(trip_id: str, duration_days: Optional[int] = None) -> List[Option]:
+    """Generate options offline from the bundled catalog (no LLM call)."""
+    return planner.plan_options(trip_id, duration_days=duration_days)
 
 
 # ============================================================================
 # AI GENERATION
 # ============================================================================
 
-def call_claude_api(prompt: str, *, debug: bool = False) -> Optional[str]:
+def complete(prompt: str, *, trip_id: Optional[str] = None, purpose: str = "generate",
+             max_tokens: int = 4096, system: Optional[str] = None) -> Tuple[Optional[str], usage.UsageEntry]:
+    """
+    Call Claude through the configured LLM backend and return (text, usage entry).
+
+    `system` is sent as a single cache_control block so the provider can reuse
+    it across calls; pass SYSTEM_PROMPT for planning requests. The entry is
+    not recorded yet: callers pass it to usage.record() once they know whether
+    the reply was usable. On failure text is None and entry.error says why.
+    """
+    entry = usage.UsageEntry(trip_id, purpose, config.CLAUDE_MODEL)
+    request = {
+        "model": config.CLAUDE_MODEL,
+        "max_tokens": max_tokens,
+        "messages": [{"role": "user", "content": prompt}]
+    }
+    if system:
+        request["system"] = [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+
+    started = time.perf_counter()
+    try:
+        response = llm.complete(request)
+    except llm.LLMError as e:
+        entry.error = str(e)
+        return None, entry
+    finally:
+        entry.latency_ms = (time.perf_counter() - started) * 1000
+
+    # Anthropic reports input_tokens excluding cached input
+    for field in llm.LLMResponse.USAGE_FIELDS:
+        setattr(entry, field, getattr(response, field))
+    entry.model = response.model or entry.model
+
+    text = response.text.strip()
+    if not text:
+        entry.error = "EMPTY_TEXT"
+        return None, entry
+    if response.stop_reason == "max_tokens":
+        entry.error = "TRUNCATED"  # Reply cut off; the parser keeps what's complete
+    return text, entry
+
+
+def call_claude_api(prompt: str, *, debug: bool = False, max_tokens: int = 4096,
+                    system: Optional[str] = None, trip_id: Optional[str] = None,
+                    purpose: str = "generate") -> Optional[str]:
     """
     Call Claude API for trip planning.
+
+    Records the call as ok/fallback; use complete() when the outcome depends
+    on parsing the reply.
     """
-    if not config.CLAUDE_API_KEY:
-        if debug:
-            return "MISSING_CLAUDE_API_KEY"
-        return None
+    text, entry = complete(prompt, trip_id=trip_id, purpose=purpose, max_tokens=max_tokens, system=system)
+    usage.record(entry, "ok" if text else "fallback")
+    if text is None and debug:
+        return entry.error
+    return text
 
-    if Anthropic is None:
-        if debug:
-            return "ANTHROPIC_SDK_NOT_INSTALLED"
-        return None
 
+# ============================================================================
+# PER-OPTION FAN-OUT
+# ============================================================================
+# One smaller completion per option style, run concurrently, so latency tracks
+# the slowest single option instead of the whole three-option reply. The
+# offline planner supplies each request's destination and date-window hint,
+# and its option stands in for any request that fails.
+
+OPTION_MAX_TOKENS = 1536
+
+
+def parse_option(response: str, option_id: str, date_window: Optional[str] = None) -> Option:
+    """Parse a single-option reply. Raises ValueError if nothing can be salvaged."""
+    objects = parsing.extract_objects(response)
+    if not objects:
+        raise ValueError("no complete option object in response")
+    raw = dict(objects[0], id=option_id)
+    return parsing.normalize_option(raw, option_id, date_window)
+
+
+async def _generate_one(context: Dict[str, Any], label: str, style: str, hint: Option,
+                        extra: str = "", option_id: Optional[str] = None,
+                        purpose: str = "generate_option") -> Optional[Option]:
+    prompt = build_option_prompt(context, label, style, hint.destination, hint.date_window, extra)
+    response, entry = await asyncio.to_thread(
+        complete, prompt, trip_id=context['trip']['id'], purpose=purpose,
+        max_tokens=OPTION_MAX_TOKENS, system=SYSTEM_PROMPT
+    )
+    if not response:
+        usage.record(entry, "fallback")
+        return None
     try:
-        client = Anthropic(api_key=config.CLAUDE_API_KEY)
-        message = client.messages.create(
-            model=config.CLAUDE_MODEL,
-            max_tokens=4096,
-            messages=[{"role": "user", "content": prompt}]
-        )
-        if not message or not getattr(message, "content", None):
-            return "EMPTY_RESPONSE" if debug else None
-
-        parts = []
-        for block in message.content:
-            text = getattr(block, "text", None)
-            if text:
-                parts.append(text)
-        text = "".join(parts).strip()
-        return text or ("EMPTY_TEXT" if debug else None)
-    except Exception as e:
-        if debug:
-            return f"ERROR: {type(e).__name__}: {e}"
+        option = parse_option(response, option_id or f"option-{label.lower()}", hint.date_window)
+    except ValueError as e:
+        entry.error = str(e)
+        usage.record(entry, "parse_error")
         return None
+    usage.record(entry, "ok")
+    return option
+
+
+def _option_slots(hints: List[Option]) -> List[Tuple[str, str, Option]]:
+    """(label, style, planner hint) for each option position."""
+    return [
+        (chr(ord("A") + i), style['title'], hint)
+        for i, (style, hint) in enumerate(zip(planner.STYLES, hints))
+    ]
 
 
-def generate_options(trip_id: str) -> Dict[str, Any]:
+async def _fan_out(context: Dict[str, Any], slots: List[Tuple[str, str, Option]]) -> List[Optional[Option]]:
+    return await asyncio.gather(*(
+        _generate_one(context, label, style, hint) for label, style, hint in slots
+    ))
+
+
+def generate_options_fanout(trip_id: str, duration_days: Optional[int] = None) -> Dict[str, Any]:
+    """Generate each option with its own concurrent Claude call, falling back per option."""
+    context = aggregate_trip_context(trip_id)
+    hints = generate_mock_options(trip_id, duration_days)
+    results = asyncio.run(_fan_out(context, _option_slots(hints)))
+
+    options = [result or hint for result, hint in zip(results, hints)]
+    failed = [chr(ord("A") + i) for i, result in enumerate(results) if result is None]
+    warning = None
+    if failed:
+        warning = f"Claude failed for option(s) {', '.join(failed)}; using offline planner options for those"
+    return {
+        'plan_version': _plan_version(trip_id, options),
+        'warning': warning,
+        'success': len(failed) < len(options)
+    }
+
+
+def complete_options(trip_id: str, salvaged: List[Option],
+                     duration_days: Optional[int] = None) -> Tuple[List[Option], int]:
+    """Top up a partial reply with per-option calls for the missing positions only.
+
+    Returns (options, number of positions that fell back to the planner).
     """
-    Generate trip options. Uses MOCK_MODE or Claude.
+    hints = generate_mock_options(trip_id, duration_days)
+    missing = len(hints) - len(salvaged)
+    if missing <= 0:
+        return salvaged, 0
+
+    # Prefer planner hints for destinations the reply didn't already cover
+    taken = {opt.destination for opt in salvaged}
+    slots = [slot for slot in _option_slots(hints) if slot[2].destination not in taken][:missing]
+    # Salvaged ids come from the reply, so they needn't be a, b, c in order:
+    # label each replacement with a letter whose option id none of them uses
+    taken_ids = {opt.id for opt in salvaged}
+    labelled = []
+    for i, (_, style, hint) in enumerate(slots):
+        option_id = parsing.free_option_id(taken_ids, len(salvaged) + i)
+        taken_ids.add(option_id)
+        labelled.append((option_id[len("option-"):].upper(), style, hint))
+    results = asyncio.run(_fan_out(aggregate_trip_context(trip_id), labelled))
+    filled = [result or hint for result, (_, _, hint) in zip(results, labelled)]
+    return salvaged + filled, sum(1 for result in results if result is None)
+
+
+# ============================================================================
+# INCREMENTAL RERUN
+# ============================================================================
+# Options members rated well (or haven't rated) are carried over unchanged;
+# only low-rated ones are regenerated, each with its own feedback as targeted
+# prompt input.
+
+def build_feedback_brief(previous: Option, stats) -> str:
+    """Prompt section describing why a previous option is being replaced."""
+    titles = {block.get("id"): block.get("title") for block in previous.itinerary if isinstance(block, dict)}
+    disliked = [titles.get(activity_id) or activity_id for activity_id in stats.dislikes]
+    lines = [
+        "",
+        "**Replacing a low-rated option:**",
+        f"- Previous: {previous.title} ({previous.destination}, {previous.date_window})",
+        f"- Average rating: {stats.average_rating:.1f} from {stats.count} member(s)",
+    ]
+    if disliked:
+        lines.append(f"- Disliked activities (do not repeat these or close equivalents): {'; '.join(disliked)}")
+    if stats.comments:
+        lines.append(f"- Member comments: {json.dumps(list(stats.comments.values()))}")
+    return "\n".join(lines) + "\n"
+
+
+def _replacement_hints(hints: List[Option], positions: List[int], kept: List[Option]) -> List[Option]:
+    """Planner option per replaced position, avoiding destinations already in the plan."""
+    taken = {opt.destination for opt in kept}
+    chosen = []
+    for position in positions:
+        candidates = hints[position % len(hints):] + hints[:position % len(hints)]
+        hint = next((h for h in candidates if h.destination not in taken), candidates[0])
+        taken.add(hint.destination)
+        chosen.append(hint)
+    return chosen
+
+
+def _rerun_positions(trip_id: str, latest: PlanVersion,
+                     keep_rating: Optional[float]) -> Tuple[float, List[int]]:
+    """(threshold, positions of the latest plan's options rated below it)."""
+    threshold = config.RERUN_KEEP_RATING if keep_rating is None else keep_rating
+    by_option = storage.get_feedback_stats(trip_id).by_option
+    positions = [
+        i for i, opt in enumerate(latest.options)
+        if by_option.get(opt.id) is not None
+        and by_option[opt.id].count
+        and by_option[opt.id].average_rating < threshold
+    ]
+    return threshold, positions
+
+
+def _unchanged_rerun(latest: PlanVersion, threshold: float) -> Dict[str, Any]:
+    return {
+        'plan_version': latest,
+        'warning': f'No options rated below {threshold}; kept all unchanged',
+        'success': True,
+        'unchanged': True,
+        'kept': [opt.id for opt in latest.options],
+        'regenerated': []
+    }
+
+
+def unchanged_rerun(trip_id: str, keep_rating: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """The rerun_options result when nothing in the latest plan is rated below
+    keep_rating: the stored latest plan itself. None if a rerun has work to do."""
+    latest = storage.get_latest_plan(trip_id)
+    if latest is None or not latest.options:
+        return None
+    threshold, positions = _rerun_positions(trip_id, latest, keep_rating)
+    return None if positions else _unchanged_rerun(latest, threshold)
+
+
+def rerun_options(trip_id: str, keep_rating: Optional[float] = None,
+                  mode: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Regenerate only the latest plan's options rated below keep_rating.
+
+    Returns the generate_options dict plus 'kept' and 'regenerated' option ids.
+    With no previous plan this is a full generation. With nothing to regenerate
+    the latest stored plan is returned as is, flagged 'unchanged'.
+    """
+    latest = storage.get_latest_plan(trip_id)
+    if latest is None or not latest.options:
+        result = generate_options(trip_id, mode=mode)
+        return {**result, 'kept': [], 'regenerated': [opt.id for opt in result['plan_version'].options]}
+
+    threshold, positions = _rerun_positions(trip_id, latest, keep_rating)
+    if not positions:
+        return _unchanged_rerun(latest, threshold)
+    by_option = storage.get_feedback_stats(trip_id).by_option
+    options = list(latest.options)
+    kept = [opt for i, opt in enumerate(options) if i not in positions]
+
+    hints = _replacement_hints(generate_mock_options(trip_id), positions, kept)
+    warning = None
+    if config.MOCK_MODE or mode == "fast":
+        replacements = hints
+        fallbacks = 0
+    else:
+        context = aggregate_trip_context(trip_id)
+        styles = [planner.STYLES[i % len(planner.STYLES)]['title'] for i in positions]
+
+        async def regenerate() -> List[Optional[Option]]:
+            return await asyncio.gather(*(
+                _generate_one(
+                    context, chr(ord("A") + i), style, hint,
+                    extra=build_feedback_brief(options[i], by_option[options[i].id]),
+                    option_id=hint.id,
+                    purpose="rerun_option"
+                )
+                for i, style, hint in zip(positions, styles, hints)
+            ))
+
+        results = asyncio.run(regenerate())
+        replacements = [result or hint for result, hint in zip(results, hints)]
+        fallbacks = sum(1 for result in results if result is None)
+        if fallbacks:
+            warning = f'Claude failed for {fallbacks} option(s); using offline planner options for those'
+
+    for i, replacement in zip(positions, replacements):
+        options[i] = replacement
+    return {
+        'plan_version': _plan_version(trip_id, options),
+        'warning': warning,
+        'success': fallbacks < len(positions),
+        'kept': [opt.id for opt in kept],
+        'regenerated': [opt.id for opt in replacements]
+    }
+
+
+def _plan_version(trip_id: str, options: List[Option]) -> PlanVersion:
+    return PlanVersion(
+        id=str(__import__('uuid').uuid4()),
+        trip_id=trip_id,
+        version_num=1,
+        created_at=datetime.utcnow(),
+        options=options
+    )
+
+
+def uses_llm(mode: Optional[str] = None) -> bool:
+    """Whether generating in this mode calls Claude (vs. only the offline planner)."""
+    return not (config.MOCK_MODE or mode == "fast")
+
+
+def generate_options(trip_id: str, duration_days: Optional[int] = None,
+                     mode: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Generate trip options. Uses the offline planner (MOCK_MODE or mode="fast") or Claude,
+    either one request per option (mode="fanout", default via AI_FANOUT) or one
+    request for all three (mode="single").
     
     Returns:
         {
@@ -399,77 +631,48 @@ def generate_options(trip_id: str) -> Dict[str, Any]:
     """
     trip = storage.get_trip_or_404(trip_id)
     
-    if config.MOCK_MODE:
-        # Use mock options
-        options = generate_mock_options(trip_id)
-        plan = PlanVersion(
-            id=str(__import__('uuid').uuid4()),
-            trip_id=trip_id,
-            version_num=1,
-            created_at=datetime.utcnow(),
-            options=options
-        )
+    if config.MOCK_MODE or mode == "fast":
+        options = generate_mock_options(trip_id, duration_days)
         return {
-            'plan_version': plan,
-            'warning': 'MOCK_MODE: Using deterministic sample options',
+            'plan_version': _plan_version(trip_id, options),
+            'warning': 'MOCK_MODE: Using offline planner options' if mode != "fast" else None,
             'success': True
         }
+    elif mode == "fanout" or (mode is None and config.AI_FANOUT):
+        return generate_options_fanout(trip_id, duration_days)
     else:
-        # Try Claude
+        # Try Claude with a single three-option request
         prompt = build_ai_prompt(trip_id)
-        response = call_claude_api(prompt)
+        response, entry = complete(prompt, trip_id=trip_id, purpose="generate", system=SYSTEM_PROMPT)
         
         if not response:
-            # Fall back to mock if Claude unavailable
-            options = generate_mock_options(trip_id)
-            plan = PlanVersion(
-                id=str(__import__('uuid').uuid4()),
-                trip_id=trip_id,
-                version_num=1,
-                created_at=datetime.utcnow(),
-                options=options
-            )
+            usage.record(entry, "fallback")
+            # Fall back to the offline planner if Claude unavailable
+            options = generate_mock_options(trip_id, duration_days)
             return {
-                'plan_version': plan,
-                'warning': 'Claude unavailable, using mock options',
+                'plan_version': _plan_version(trip_id, options),
+                'warning': 'Claude unavailable, using offline planner options',
                 'success': False
             }
         
-        # Parse and validate Claude response
-        try:
-            # Log raw response for debugging
-            print(f"[DEBUG] Claude raw response length: {len(response)}")
-            print(f"[DEBUG] Claude response preview: {response[:500]}...")
-            
-            parsed = json.loads(response)
-            if not isinstance(parsed, list):
-                parsed = [parsed]
-            
-            options = [Option(**opt) for opt in parsed]
-            plan = PlanVersion(
-                id=str(__import__('uuid').uuid4()),
-                trip_id=trip_id,
-                version_num=1,
-                created_at=datetime.utcnow(),
-                options=options
+        # Keep every option that parses, regenerate only the rest
+        salvaged, errors = parsing.parse_options(response)
+        if errors or len(salvaged) < 3:
+            entry.error = '; '.join(errors) or f'only {len(salvaged)} complete option(s)'
+            usage.record(entry, "parse_error")
+        else:
+            usage.record(entry, "ok")
+        options, fallbacks = complete_options(trip_id, salvaged, duration_days)
+        warning = None
+        if len(salvaged) < len(options):
+            warning = (
+                f"Claude response incomplete ({'; '.join(errors) or 'truncated'}): "
+                f"kept {len(salvaged)} option(s), regenerated {len(options) - len(salvaged)}"
             )
-            return {
-                'plan_version': plan,
-                'warning': None,
-                'success': True
-            }
-        except (json.JSONDecodeError, ValueError) as e:
-            # Validation failed, return mock + warning
-            options = generate_mock_options(trip_id)
-            plan = PlanVersion(
-                id=str(__import__('uuid').uuid4()),
-                trip_id=trip_id,
-                version_num=1,
-                created_at=datetime.utcnow(),
-                options=options
-            )
-            return {
-                'plan_version': plan,
-                'warning': f'Claude response invalid: {str(e)}. Using mock options.',
-                'success': False
-            }
+            if fallbacks:
+                warning += f", {fallbacks} from the offline planner"
+        return {
+            'plan_version': _plan_version(trip_id, options),
+            'warning': warning,
+            'success': fallbacks < len(options)
+        }
@@ -1,23 +1,16 @@
+from collections import defaultdict
 from datetime import datetime, date, timedelta
 from typing import List, Optional, Dict, Set
 from app import storage
+from app.aggregates import ONE_DAY, expand_ranges
 
 
 def get_available_dates_set(member_id: str) -> Set[date]:
-    """Convert member's ISO date strings to set of date objects."""
+    """Convert member's availability to set of date objects."""
     avail = storage.availability_by_member.get(member_id)
     if not avail:
         return set()
-    
-    dates = set()
-    for date_str in avail.available_dates:
-        try:
-            d = datetime.fromisoformat(date_str).date()
-            dates.add(d)
-        except ValueError:
-            # Skip invalid dates
-            pass
-    return dates
+    return set(expand_ranges(avail.ranges))
 
 
 def find_best_availability_windows(trip_id: str, window_length: int = 4) -> List[Dict]:
@@ -25,6 +18,11 @@ def find_best_availability_windows(trip_id: str, window_length: int = 4) -> List
     Find top 3 contiguous date windows where organiser and all required attendees
     are available for every day. Score by total members available for full window.
     
+    Works on each member's availability ranges: a member covers the window
+    starting on day s iff one of their ranges (a, b) has a <= s <= b - length + 1,
+    so every range becomes one interval of valid start days and a single sweep
+    scores all starts at once.
+    
     Returns:
         List of dicts with keys:
         - window: "2026-02-03..2026-02-06"
@@ -39,65 +37,54 @@ def find_best_availability_windows(trip_id: str, window_length: int = 4) -> List
     must_attend = {trip.organiser_member_id}
     must_attend.update(trip.required_member_ids)
     
-    # Build availability map for all members in trip
-    avail_map: Dict[str, Set[date]] = {}
-    all_dates: Set[date] = set()
+    span = timedelta(days=window_length - 1)
     
-    for member_id, member in storage.members.items():
-        if member.trip_id == trip_id:
-            avail_dates = get_available_dates_set(member_id)
-            avail_map[member_id] = avail_dates
-            all_dates.update(avail_dates)
+    # Boundaries of valid-start intervals: day -> [score delta, required delta]
+    edges: Dict[date, List[int]] = defaultdict(lambda: [0, 0])
+    for member in storage.get_trip_members(trip_id):
+        avail = storage.availability_by_member.get(member.id)
+        if not avail:
+            continue
+        required = 1 if member.id in must_attend else 0
+        for start, end in avail.ranges:
+            last_start = end - span
+            if last_start < start:
+                continue
+            edges[start][0] += 1
+            edges[start][1] += required
+            edges[last_start + ONE_DAY][0] -= 1
+            edges[last_start + ONE_DAY][1] -= required
     
-    if not all_dates:
+    if not edges:
         return []
     
-    # Sort all dates chronologically
-    sorted_dates = sorted(all_dates)
-    
-    # Generate and score all contiguous windows
+    # Sweep: between two boundaries every start day has the same score, so
+    # only the earliest three starts of each stretch can make the top 3.
     candidate_windows = []
-    
-    for i in range(len(sorted_dates) - window_length + 1):
-        window_dates = sorted_dates[i : i + window_length]
-        window_set = set(window_dates)
-        
-        # Check: all must_attend members have availability for all days in window
-        all_required_available = True
-        for mid in must_attend:
-            if mid not in avail_map or not window_set.issubset(avail_map[mid]):
-                all_required_available = False
-                break
-        
-        if not all_required_available:
+    score = required_count = 0
+    boundaries = sorted(edges)
+    for current, following in zip(boundaries, boundaries[1:]):
+        score += edges[current][0]
+        required_count += edges[current][1]
+        if required_count < len(must_attend):
             continue
-        
-        # Score: count how many total members are available for all days
-        score = 0
-        for member_id, member_dates in avail_map.items():
-            if window_set.issubset(member_dates):
-                score += 1
-        
-        candidate_windows.append({
-            'start': window_dates[0],
-            'end': window_dates[-1],
-            'days': window_dates,
-            'score': score
-        })
+        stretch = (following - current).days
+        for offset in range(min(3, stretch)):
+            candidate_windows.append((-score, current + timedelta(days=offset)))
     
     # Sort by score (descending), then start date (ascending) for determinism
-    candidate_windows.sort(key=lambda w: (-w['score'], w['start']))
+    candidate_windows.sort()
     
     # Format and return top 3
     result = []
-    for w in candidate_windows[:3]:
-        day_strs = [d.isoformat() for d in w['days']]
+    for neg_score, start in candidate_windows[:3]:
+        end = start + span
         result.append({
-            'window': f"{w['start'].isoformat()}..{w['end'].isoformat()}",
-            'start': w['start'].isoformat(),
-            'end': w['end'].isoformat(),
-            'days': day_strs,
-            'score': w['score']
+            'window': f"{start.isoformat()}..{end.isoformat()}",
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'days': [d.isoformat() for d in expand_ranges([(start, end)])],
+            'score': -neg_score
         })
     
     return result
@@ -0,0 +1,170 @@
+"""
+Bundled destination and activity catalog for the offline planner.
+
+Costs are rough per-person GBP estimates: transport is a return trip from a
+UK/European origin, accommodation is per night, food is per day. Activity
+intensity and social are 0-1 scores used to match slider preferences.
+"""
+
+CATALOG = [
+    {
+        "id": "barcelona",
+        "name": "Barcelona, Spain",
+        "tags": ["city", "beach", "cultural", "foodie", "nightlife", "shopping"],
+        "transport": {"mode": "flight", "duration": "2h 10m", "cost": 160},
+        "accommodation_per_night": 70,
+        "food_per_day": 40,
+        "activities": [
+            {"id": "bcn-sagrada", "title": "Sagrada Família and Eixample walk", "tags": ["cultural", "museums", "photography"], "cost": 35, "intensity": 0.3, "social": 0.3},
+            {"id": "bcn-tapas", "title": "Gothic Quarter tapas crawl", "tags": ["foodie", "nightlife"], "cost": 45, "intensity": 0.2, "social": 0.9},
+            {"id": "bcn-beach", "title": "Barceloneta beach afternoon", "tags": ["beach", "relaxation"], "cost": 0, "intensity": 0.1, "social": 0.5},
+            {"id": "bcn-montjuic", "title": "Hike up Montjuïc", "tags": ["hiking", "nature", "adventure"], "cost": 0, "intensity": 0.7, "social": 0.4},
+            {"id": "bcn-kayak", "title": "Sea kayaking along the coast", "tags": ["water sports", "adventure"], "cost": 50, "intensity": 0.8, "social": 0.6},
+            {"id": "bcn-club", "title": "Beach club night out", "tags": ["nightlife"], "cost": 40, "intensity": 0.5, "social": 1.0},
+        ],
+    },
+    {
+        "id": "lisbon",
+        "name": "Lisbon, Portugal",
+        "tags": ["city", "cultural", "foodie", "budget-friendly", "photography", "nightlife"],
+        "transport": {"mode": "flight", "duration": "2h 40m", "cost": 150},
+        "accommodation_per_night": 60,
+        "food_per_day": 35,
+        "activities": [
+            {"id": "lis-tram", "title": "Tram 28 and Alfama viewpoints", "tags": ["cultural", "photography"], "cost": 10, "intensity": 0.3, "social": 0.4},
+            {"id": "lis-pasteis", "title": "Belém monuments and pastéis de nata", "tags": ["cultural", "foodie", "museums"], "cost": 20, "intensity": 0.3, "social": 0.4},
+            {"id": "lis-sintra", "title": "Day trip to Sintra palaces", "tags": ["cultural", "nature", "hiking"], "cost": 40, "intensity": 0.6, "social": 0.4},
+            {"id": "lis-surf", "title": "Surf lesson at Costa da Caparica", "tags": ["beach", "water sports", "adventure"], "cost": 45, "intensity": 0.8, "social": 0.7},
+            {"id": "lis-fado", "title": "Fado dinner in Bairro Alto", "tags": ["foodie", "nightlife", "cultural"], "cost": 45, "intensity": 0.1, "social": 0.8},
+            {"id": "lis-lxfactory", "title": "LX Factory markets and rooftop bar", "tags": ["shopping", "nightlife"], "cost": 20, "intensity": 0.2, "social": 0.8},
+        ],
+    },
+    {
+        "id": "rome",
+        "name": "Rome, Italy",
+        "tags": ["city", "cultural", "museums", "foodie", "photography"],
+        "transport": {"mode": "flight", "duration": "2h 30m", "cost": 170},
+        "accommodation_per_night": 80,
+        "food_per_day": 45,
+        "activities": [
+            {"id": "rom-colosseum", "title": "Colosseum and Roman Forum tour", "tags": ["cultural", "museums"], "cost": 30, "intensity": 0.4, "social": 0.4},
+            {"id": "rom-vatican", "title": "Vatican Museums and St Peter's", "tags": ["cultural", "museums", "photography"], "cost": 35, "intensity": 0.4, "social": 0.3},
+            {"id": "rom-pasta", "title": "Pasta-making class", "tags": ["foodie"], "cost": 60, "intensity": 0.2, "social": 0.9},
+            {"id": "rom-trastevere", "title": "Trastevere aperitivo evening", "tags": ["foodie", "nightlife"], "cost": 30, "intensity": 0.1, "social": 0.9},
+            {"id": "rom-bike", "title": "Appian Way bike ride", "tags": ["adventure", "nature"], "cost": 30, "intensity": 0.7, "social": 0.5},
+            {"id": "rom-spa", "title": "Thermal baths afternoon", "tags": ["relaxation", "wellness"], "cost": 50, "intensity": 0.1, "social": 0.4},
+        ],
+    },
+    {
+        "id": "paris",
+        "name": "Paris, France",
+        "tags": ["city", "cultural", "museums", "foodie", "shopping", "photography"],
+        "transport": {"mode": "train", "duration": "2h 20m", "cost": 140},
+        "accommodation_per_night": 95,
+        "food_per_day": 50,
+        "activities": [
+            {"id": "par-louvre", "title": "Louvre highlights", "tags": ["museums", "cultural"], "cost": 22, "intensity": 0.3, "social": 0.3},
+            {"id": "par-montmartre", "title": "Montmartre walk and Sacré-Cœur", "tags": ["cultural", "photography"], "cost": 0, "intensity": 0.5, "social": 0.4},
+            {"id": "par-seine", "title": "Seine evening cruise", "tags": ["relaxation", "photography"], "cost": 20, "intensity": 0.1, "social": 0.6},
+            {"id": "par-bistro", "title": "Bistro dinner and wine bar", "tags": ["foodie", "nightlife"], "cost": 55, "intensity": 0.1, "social": 0.9},
+            {"id": "par-marais", "title": "Le Marais shopping afternoon", "tags": ["shopping"], "cost": 0, "intensity": 0.3, "social": 0.5},
+            {"id": "par-versailles", "title": "Versailles by bike", "tags": ["cultural", "adventure"], "cost": 60, "intensity": 0.6, "social": 0.5},
+        ],
+    },
+    {
+        "id": "amsterdam",
+        "name": "Amsterdam, Netherlands",
+        "tags": ["city", "cultural", "nightlife", "museums", "shopping"],
+        "transport": {"mode": "flight", "duration": "1h 15m", "cost": 120},
+        "accommodation_per_night": 100,
+        "food_per_day": 45,
+        "activities": [
+            {"id": "ams-canal", "title": "Canal boat tour", "tags": ["cultural", "photography", "relaxation"], "cost": 20, "intensity": 0.1, "social": 0.6},
+            {"id": "ams-rijks", "title": "Rijksmuseum and Van Gogh Museum", "tags": ["museums", "cultural"], "cost": 45, "intensity": 0.3, "social": 0.3},
+            {"id": "ams-bike", "title": "Cycle to the windmills", "tags": ["nature", "adventure"], "cost": 15, "intensity": 0.6, "social": 0.5},
+            {"id": "ams-foodhall", "title": "Foodhallen and brown café crawl", "tags": ["foodie", "nightlife"], "cost": 35, "intensity": 0.2, "social": 0.9},
+            {"id": "ams-jordaan", "title": "Jordaan markets", "tags": ["shopping", "foodie"], "cost": 10, "intensity": 0.3, "social": 0.5},
+            {"id": "ams-club", "title": "Leidseplein night out", "tags": ["nightlife"], "cost": 35, "intensity": 0.5, "social": 1.0},
+        ],
+    },
+    {
+        "id": "santorini",
+        "name": "Santorini, Greece",
+        "tags": ["beach", "relaxation", "photography", "wellness", "foodie"],
+        "transport": {"mode": "flight", "duration": "4h", "cost": 230},
+        "accommodation_per_night": 110,
+        "food_per_day": 45,
+        "activities": [
+            {"id": "san-oia", "title": "Oia sunset viewpoint", "tags": ["photography", "relaxation"], "cost": 0, "intensity": 0.2, "social": 0.5},
+            {"id": "san-catamaran", "title": "Caldera catamaran cruise", "tags": ["beach", "water sports", "relaxation"], "cost": 120, "intensity": 0.3, "social": 0.8},
+            {"id": "san-hike", "title": "Fira to Oia clifftop hike", "tags": ["hiking", "nature", "adventure"], "cost": 0, "intensity": 0.8, "social": 0.4},
+            {"id": "san-wine", "title": "Volcanic winery tasting", "tags": ["foodie"], "cost": 45, "intensity": 0.1, "social": 0.8},
+            {"id": "san-beach", "title": "Red and black sand beaches", "tags": ["beach", "relaxation"], "cost": 10, "intensity": 0.2, "social": 0.5},
+            {"id": "san-spa", "title": "Cave spa afternoon", "tags": ["wellness", "relaxation"], "cost": 70, "intensity": 0.1, "social": 0.3},
+        ],
+    },
+    {
+        "id": "lake-district",
+        "name": "Lake District, UK",
+        "tags": ["nature", "hiking", "relaxation", "budget-friendly", "adventure"],
+        "transport": {"mode": "train", "duration": "3h 30m", "cost": 90},
+        "accommodation_per_night": 55,
+        "food_per_day": 30,
+        "activities": [
+            {"id": "lak-catbells", "title": "Catbells ridge walk", "tags": ["hiking", "nature", "photography"], "cost": 0, "intensity": 0.7, "social": 0.5},
+            {"id": "lak-windermere", "title": "Windermere lake cruise", "tags": ["relaxation", "nature"], "cost": 20, "intensity": 0.1, "social": 0.5},
+            {"id": "lak-ghyll", "title": "Ghyll scrambling", "tags": ["adventure", "extreme sports", "water sports"], "cost": 55, "intensity": 1.0, "social": 0.8},
+            {"id": "lak-pub", "title": "Country pub dinner", "tags": ["foodie", "nightlife"], "cost": 25, "intensity": 0.1, "social": 0.9},
+            {"id": "lak-paddle", "title": "Paddleboarding on Derwentwater", "tags": ["water sports", "adventure"], "cost": 35, "intensity": 0.6, "social": 0.6},
+            {"id": "lak-cabin", "title": "Log cabin hot tub evening", "tags": ["relaxation", "wellness"], "cost": 0, "intensity": 0.0, "social": 0.8},
+        ],
+    },
+    {
+        "id": "new-york",
+        "name": "New York, USA",
+        "tags": ["city", "shopping", "nightlife", "museums", "foodie", "cultural"],
+        "transport": {"mode": "flight", "duration": "8h", "cost": 480},
+        "accommodation_per_night": 160,
+        "food_per_day": 60,
+        "activities": [
+            {"id": "nyc-highline", "title": "High Line and Chelsea Market", "tags": ["foodie", "photography"], "cost": 0, "intensity": 0.4, "social": 0.5},
+            {"id": "nyc-met", "title": "The Met", "tags": ["museums", "cultural"], "cost": 30, "intensity": 0.3, "social": 0.3},
+            {"id": "nyc-broadway", "title": "Broadway show", "tags": ["cultural", "nightlife"], "cost": 110, "intensity": 0.1, "social": 0.7},
+            {"id": "nyc-bridge", "title": "Walk the Brooklyn Bridge", "tags": ["photography", "adventure"], "cost": 0, "intensity": 0.5, "social": 0.5},
+            {"id": "nyc-soho", "title": "SoHo shopping", "tags": ["shopping"], "cost": 0, "intensity": 0.3, "social": 0.5},
+            {"id": "nyc-rooftop", "title": "Rooftop bar night", "tags": ["nightlife"], "cost": 50, "intensity": 0.3, "social": 1.0},
+        ],
+    },
+    {
+        "id": "interlaken",
+        "name": "Interlaken, Switzerland",
+        "tags": ["adventure", "nature", "hiking", "photography", "extreme sports"],
+        "transport": {"mode": "flight", "duration": "3h 30m", "cost": 210},
+        "accommodation_per_night": 120,
+        "food_per_day": 55,
+        "activities": [
+            {"id": "int-paraglide", "title": "Tandem paragliding", "tags": ["extreme sports", "adventure"], "cost": 170, "intensity": 0.9, "social": 0.5},
+            {"id": "int-harder", "title": "Harder Kulm funicular and viewpoint", "tags": ["photography", "nature"], "cost": 35, "intensity": 0.2, "social": 0.4},
+            {"id": "int-hike", "title": "Lauterbrunnen valley hike", "tags": ["hiking", "nature"], "cost": 0, "intensity": 0.7, "social": 0.5},
+            {"id": "int-quad", "title": "Quad biking tour", "tags": ["adventure", "extreme sports"], "cost": 120, "intensity": 0.8, "social": 0.8},
+            {"id": "int-lake", "title": "Lake Brienz boat trip", "tags": ["relaxation", "nature"], "cost": 40, "intensity": 0.1, "social": 0.5},
+            {"id": "int-fondue", "title": "Fondue dinner", "tags": ["foodie"], "cost": 45, "intensity": 0.1, "social": 0.9},
+        ],
+    },
+    {
+        "id": "mediterranean-cruise",
+        "name": "Western Mediterranean Cruise",
+        "tags": ["relaxation", "beach", "wellness", "nightlife", "foodie"],
+        "transport": {"mode": "flight", "duration": "2h 30m", "cost": 150},
+        "accommodation_per_night": 130,
+        "food_per_day": 0,
+        "activities": [
+            {"id": "cru-deck", "title": "Pool deck and spa", "tags": ["relaxation", "wellness"], "cost": 0, "intensity": 0.0, "social": 0.6},
+            {"id": "cru-port", "title": "Port-day walking tour", "tags": ["cultural", "photography"], "cost": 40, "intensity": 0.4, "social": 0.5},
+            {"id": "cru-snorkel", "title": "Shore excursion snorkelling", "tags": ["water sports", "beach", "adventure"], "cost": 70, "intensity": 0.6, "social": 0.7},
+            {"id": "cru-show", "title": "Theatre show and late lounge", "tags": ["nightlife"], "cost": 0, "intensity": 0.1, "social": 0.9},
+            {"id": "cru-dinner", "title": "Speciality restaurant dinner", "tags": ["foodie"], "cost": 45, "intensity": 0.0, "social": 0.9},
+            {"id": "cru-beach", "title": "Beach stop", "tags": ["beach", "relaxation"], "cost": 10, "intensity": 0.2, "social": 0.6},
+        ],
+    },
+]
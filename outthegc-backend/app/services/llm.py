@@ -0,0 +1,174 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from typing import Any, Dict, Optional
+from app import config
+
+# ============================================================================
+# LLM BACKENDS
+# ============================================================================
+# ai.py builds Anthropic Messages API requests (plain dicts) and hands them to
+# the backend chosen by LLM_BACKEND:
+#   anthropic  the official SDK (default)
+#   http       the same wire format over stdlib urllib, for the local fake in
+#              tools/stub_llm_server.py (latency, token rate, truncation and
+#              error injection) or any compatible endpoint
+# Backends raise LLMError with a short code; ai.complete() records it.
+
+ANTHROPIC_VERSION = "2023-06-01"
+
+
+class LLMError(Exception):
+    """Backend failure. str(e) is a code such as MISSING_CLAUDE_API_KEY or 'ERROR: ...'."""
+
+
+class LLMResponse:
+    __slots__ = (
+        "text", "model", "stop_reason", "input_tokens", "cache_creation_input_tokens",
+        "cache_read_input_tokens", "output_tokens"
+    )
+
+    USAGE_FIELDS = ("input_tokens", "cache_creation_input_tokens", "cache_read_input_tokens", "output_tokens")
+
+    def __init__(self, text: str, model: Optional[str], stop_reason: Optional[str], usage: Any):
+        self.text = text
+        self.model = model
+        self.stop_reason = stop_reason
+        for field in self.USAGE_FIELDS:
+            value = usage.get(field) if isinstance(usage, dict) else getattr(usage, field, None)
+            setattr(self, field, value or 0)
+
+
+class LLMBackend:
+    name = "base"
+
+    def complete(self, request: Dict[str, Any]) -> LLMResponse:
+        raise NotImplementedError
+
+
+class AnthropicBackend(LLMBackend):
+    name = "anthropic"
+
+    def __init__(self):
+        self._client = None
+
+    def _get_client(self):
+        # Shared client, so repeat calls reuse the HTTP connection pool. The SDK
+        # is imported here rather than at module load: it is slow to import and
+        # never needed in MOCK_MODE or with the http backend.
+        if self._client is None:
+            try:
+                from anthropic import Anthropic
+            except ImportError:  # Optional if dependency not installed
+                raise LLMError("ANTHROPIC_SDK_NOT_INSTALLED")
+            kwargs = {"api_key": config.CLAUDE_API_KEY}
+            if config.CLAUDE_BASE_URL:
+                kwargs["base_url"] = config.CLAUDE_BASE_URL
+            self._client = Anthropic(**kwargs)
+        return self._client
+
+    def complete(self, request: Dict[str, Any]) -> LLMResponse:
+        if not config.CLAUDE_API_KEY:
+            raise LLMError("MISSING_CLAUDE_API_KEY")
+        client = self._get_client()
+        try:
+            message = client.messages.create(**request)
+        except Exception as e:
+            raise LLMError(f"ERROR: {type(e).__name__}: {e}")
+        if not message or not getattr(message, "content", None):
+            raise LLMError("EMPTY_RESPONSE")
+        text = "".join(getattr(block, "text", None) or "" for block in message.content)
+        return LLMResponse(text, getattr(message, "model", None), getattr(message, "stop_reason", None),
+                           getattr(message, "usage", None))
+
+
+class HTTPBackend(LLMBackend):
+    """Messages API over urllib; no SDK needed."""
+    name = "http"
+
+    def __init__(self, base_url: str, api_key: Optional[str], timeout: float):
+        self.url = base_url.rstrip("/") + "/v1/messages"
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def complete(self, request: Dict[str, Any]) -> LLMResponse:
+        http_request = urllib.request.Request(
+            self.url,
+            data=json.dumps(request).encode("utf-8"),
+            headers={
+                "content-type": "application/json",
+                "x-api-key": self.api_key or "local",
+                "anthropic-version": ANTHROPIC_VERSION
+            }
+        )
+        try:
+            with urllib.request.urlopen(http_request, timeout=self.timeout) as response:
+                body = json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read())["error"]["message"]
+            except Exception:
+                message = e.reason
+            raise LLMError(f"ERROR: HTTPError {e.code}: {message}")
+        except Exception as e:
+            raise LLMError(f"ERROR: {type(e).__name__}: {e}")
+        content = body.get("content")
+        if not content:
+            raise LLMError("EMPTY_RESPONSE")
+        text = "".join(block.get("text", "") for block in content if isinstance(block, dict))
+        return LLMResponse(text, body.get("model"), body.get("stop_reason"), body.get("usage") or {})
+
+
+_backend: Optional[LLMBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> LLMBackend:
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if config.LLM_BACKEND == "http":
+                _backend = HTTPBackend(
+                    config.CLAUDE_BASE_URL or "https://api.anthropic.com",
+                    config.CLAUDE_API_KEY,
+                    config.LLM_TIMEOUT_SECONDS
+                )
+            elif config.LLM_BACKEND == "anthropic":
+                _backend = AnthropicBackend()
+            else:
+                # An LLMError, so callers fall back to the offline planner
+                raise LLMError(f"UNKNOWN_LLM_BACKEND: {config.LLM_BACKEND}")
+        return _backend
+
+
+def complete(request: Dict[str, Any]) -> LLMResponse:
+    """Send a Messages API request through the configured backend."""
+    response = get_backend().complete(request)
+    if config.LLM_RECORD_PATH:
+        try:
+            record_response(request, response)
+        except (OSError, TypeError, ValueError):
+            # Recording is a debugging aid; it must never fail a completion
+            pass
+    return response
+
+
+_record_lock = threading.Lock()
+
+
+def record_response(request: Dict[str, Any], response: LLMResponse) -> None:
+    """Append a reply to LLM_RECORD_PATH (JSONL) for the fake server to replay."""
+    line = json.dumps({
+        "max_tokens": request.get("max_tokens"),
+        "prompt": "".join(
+            m["content"] if isinstance(m["content"], str) else ""
+            for m in request.get("messages", [])
+        )[-2000:],
+        "text": response.text,
+        "stop_reason": response.stop_reason,
+        "usage": {field: getattr(response, field) for field in LLMResponse.USAGE_FIELDS}
+    })
+    with _record_lock:
+        with open(config.LLM_RECORD_PATH, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
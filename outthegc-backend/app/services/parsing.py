@@ -0,0 +1,202 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+from app.models import Option
+
+# ============================================================================
+# TOLERANT OPTION PARSING
+# ============================================================================
+# Claude replies are paid for by the token, so a reply with a markdown fence,
+# a sentence after the JSON, or a cut-off final option is salvaged rather than
+# discarded: every complete option object is kept and mapped onto Option.
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL | re.IGNORECASE)
+_decoder = json.JSONDecoder()
+
+
+def strip_fences(text: str) -> str:
+    """Return the body of the first ``` fence, or the text unchanged."""
+    match = _FENCE.search(text)
+    return match.group(1) if match else text
+
+
+def extract_objects(text: str) -> List[Dict[str, Any]]:
+    """Every complete JSON object from a reply, tolerating prose and truncation.
+
+    Accepts a bare object, an array of objects (stopping at the first
+    incomplete element), or a wrapper object such as {"options": [...]}.
+    """
+    text = strip_fences(text)
+    starts = [i for i in (text.find("["), text.find("{")) if i >= 0]
+    if not starts:
+        return []
+    pos = min(starts)
+
+    if text[pos] == "{":
+        try:
+            obj, _ = _decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            return []
+        for key in ("options", "plans"):
+            if isinstance(obj.get(key), list):
+                return [o for o in obj[key] if isinstance(o, dict)]
+        return [obj]
+
+    objects = []
+    pos += 1
+    while True:
+        while pos < len(text) and text[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(text) or text[pos] != "{":
+            break  # End of array, trailing text, or truncated between elements
+        try:
+            obj, pos = _decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            break  # Truncated mid-object; keep what we have
+        objects.append(obj)
+    return objects
+
+
+# ----------------------------------------------------------------------------
+# Schema mapping
+# ----------------------------------------------------------------------------
+# The prompt asks for nested itinerary days and a costs breakdown, while the
+# frontend renders flat time blocks and sums a flat costs dict.
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        match = re.search(r"-?\d+(?:\.\d+)?", value.replace(",", ""))
+        if match:
+            number = float(match.group())
+            return int(number) if number.is_integer() else number
+    return None
+
+
+def _itinerary(option_id: str, itinerary: Any) -> List[Dict[str, Any]]:
+    if not isinstance(itinerary, list):
+        return []
+    blocks = []
+    for i, entry in enumerate(itinerary):
+        if not isinstance(entry, dict):
+            continue
+        day = entry.get("day", i + 1)
+        if isinstance(entry.get("blocks"), list):
+            day_blocks = [b for b in entry["blocks"] if isinstance(b, dict)]
+        else:
+            day_blocks = [entry]
+        for block in day_blocks:
+            blocks.append({
+                "id": str(block.get("id") or f"{option_id}-d{day}-{len(blocks)}"),
+                "day": block.get("day", day),
+                "time": block.get("time", ""),
+                "title": block.get("title") or block.get("activity") or "",
+                "description": block.get("description") or block.get("notes") or ""
+            })
+    return blocks
+
+
+def _costs(costs: Any) -> Dict[str, Any]:
+    if not isinstance(costs, dict):
+        return {}
+    breakdown = costs.get("breakdown")
+    if isinstance(breakdown, dict):
+        costs = breakdown
+    elif set(costs) - {"total_per_person", "total", "currency"}:
+        costs = {k: v for k, v in costs.items() if k not in ("total_per_person", "total", "currency")}
+    else:
+        costs = {"total": costs.get("total_per_person", costs.get("total"))}
+    flat = {}
+    for key, value in costs.items():
+        number = _number(value)
+        if number is not None:
+            flat[key] = number
+    return flat
+
+
+def _transport(transport: Any) -> List[Dict[str, Any]]:
+    if isinstance(transport, dict):
+        transport = [transport]
+    if not isinstance(transport, list):
+        return []
+    legs = []
+    for leg in transport:
+        if not isinstance(leg, dict):
+            continue
+        leg = dict(leg)
+        price = _number(leg.get("cost_per_person", leg.get("price_estimate")))
+        leg.setdefault("details", ", ".join(str(leg[k]) for k in ("leg", "duration") if leg.get(k)))
+        if price is not None:
+            leg["price_estimate"] = price
+        legs.append(leg)
+    return legs
+
+
+def _strings(value: Any) -> List[str]:
+    if isinstance(value, str):
+        return [value]
+    if not isinstance(value, list):
+        return []
+    items = []
+    for item in value:
+        if isinstance(item, dict):
+            name = item.get("item") or item.get("name")
+            reason = item.get("reason")
+            if name:
+                items.append(f"{name}: {reason}" if reason else str(name))
+        elif item is not None:
+            items.append(str(item))
+    return items
+
+
+def normalize_option(raw: Dict[str, Any], option_id: str, date_window: Optional[str] = None) -> Option:
+    """Map a parsed reply object onto Option. Raises ValueError if it can't be salvaged."""
+    destination = raw.get("destination")
+    if not destination or not isinstance(destination, str):
+        raise ValueError("option has no destination")
+    option_id = str(raw.get("id") or option_id)
+    return Option(
+        id=option_id,
+        title=str(raw.get("title") or destination),
+        destination=destination,
+        date_window=str(raw.get("date_window") or date_window or "TBC"),
+        summary=str(raw.get("summary") or ""),
+        itinerary=_itinerary(option_id, raw.get("itinerary")),
+        transport=_transport(raw.get("transport")),
+        costs=_costs(raw.get("costs")),
+        packing_list=_strings(raw.get("packing_list")),
+        rationale=str(raw.get("rationale") or ""),
+        assumptions=_strings(raw.get("assumptions"))
+    )
+
+
+def free_option_id(taken: Set[str], position: int) -> str:
+    """option-a, option-b, ... for `position`, or the first such id not in `taken`."""
+    option_id = f"option-{chr(ord('a') + position)}"
+    n = 0
+    while option_id in taken:
+        option_id = f"option-{chr(ord('a') + n)}"
+        n += 1
+    return option_id
+
+
+def parse_options(text: str, limit: int = 3, date_window: Optional[str] = None) -> Tuple[List[Option], List[str]]:
+    """Salvage up to `limit` valid options from a reply. Returns (options, errors)."""
+    options: List[Option] = []
+    errors: List[str] = []
+    seen_ids: Set[str] = set()
+    for i, raw in enumerate(extract_objects(text)[:limit]):
+        fallback_id = free_option_id(seen_ids, i)
+        if str(raw.get("id") or fallback_id) in seen_ids:
+            raw = dict(raw, id=fallback_id)
+        try:
+            option = normalize_option(raw, fallback_id, date_window)
+        except ValueError as e:
+            errors.append(f"option {i + 1}: {e}")
+            continue
+        seen_ids.add(option.id)
+        options.append(option)
+    if not options and not errors:
+        errors.append("no complete option objects in response")
+    return options, errors
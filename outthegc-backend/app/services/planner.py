@@ -0,0 +1,328 @@
+from typing import Any, Dict, List, Optional, Set
+from uuid import uuid4
+from app.models import Option
+from app import storage
+from app.services import availability
+from app.services.catalog import CATALOG
+
+# ============================================================================
+# OFFLINE PLANNER
+# ============================================================================
+# Builds options from the bundled catalog by scoring every (style, destination)
+# pair against all members' constraints. No network, so it doubles as the
+# fallback when Claude is unavailable and as generate-options' fast mode.
+
+DEFAULT_DAYS = 4
+
+STYLES = [
+    {
+        "key": "adventure",
+        "title": "Adventure",
+        "tags": ["adventure", "hiking", "nature", "water sports", "extreme sports"],
+        "intensity": 0.8,
+        "social": 0.5,
+        "summary": "High-energy trip built around outdoor activities"
+    },
+    {
+        "key": "relaxation",
+        "title": "Relaxation",
+        "tags": ["relaxation", "beach", "wellness", "foodie"],
+        "intensity": 0.2,
+        "social": 0.4,
+        "summary": "Slower-paced trip with downtime, good food and wellness"
+    },
+    {
+        "key": "social",
+        "title": "Social",
+        "tags": ["nightlife", "foodie", "cultural", "city"],
+        "intensity": 0.4,
+        "social": 0.9,
+        "summary": "Group-focused trip with shared experiences and nights out"
+    },
+]
+
+# Score weights; avoid penalty is subtracted
+WEIGHTS = {"budget": 0.35, "tags": 0.3, "style": 0.25, "seed": 0.1, "avoid": 0.5}
+
+PACKING_BY_TAG = {
+    "beach": "swimwear: beach and boat days",
+    "water sports": "quick-dry clothes: water activities",
+    "hiking": "walking boots: trail days",
+    "nature": "waterproof jacket: weather changes outdoors",
+    "nightlife": "evening outfit: nights out",
+    "wellness": "flip-flops: spa and pool",
+    "city": "comfortable shoes: lots of walking",
+    "photography": "power bank: long days of photos",
+}
+
+
+# Every tag gets one bit, so overlap between a member's interests and a
+# destination or activity is a single AND plus a popcount.
+TAG_BITS: Dict[str, int] = {}
+
+
+def _mask(tags) -> int:
+    mask = 0
+    for tag in tags:
+        bit = TAG_BITS.get(tag.lower())
+        if bit is not None:
+            mask |= bit
+    return mask
+
+
+for _dest in CATALOG:
+    for _tag in _dest["tags"] + [t for a in _dest["activities"] for t in a["tags"]]:
+        TAG_BITS.setdefault(_tag, 1 << len(TAG_BITS))
+
+DEST_MASKS = {dest["id"]: _mask(dest["tags"]) for dest in CATALOG}
+ACTIVITY_MASKS = {a["id"]: _mask(a["tags"]) for dest in CATALOG for a in dest["activities"]}
+STYLE_MASKS = {style["key"]: _mask(style["tags"]) for style in STYLES}
+
+
+def _popcount(mask: int) -> int:
+    return bin(mask).count("1")
+
+
+# ============================================================================
+# GROUP PROFILE
+# ============================================================================
+
+class MemberProfile:
+    """One member's constraints reduced to what scoring needs."""
+    __slots__ = ("mask", "tag_count", "budget_min", "budget_max", "avoids", "energy", "social")
+
+    def __init__(self, constraint):
+        self.mask = _mask(constraint.tags)
+        self.tag_count = _popcount(self.mask)
+        self.budget_min = constraint.budget_min
+        self.budget_max = constraint.budget_max
+        self.avoids = [term.lower() for term in constraint.must_avoids if term.strip()]
+        sliders = constraint.sliders or {}
+        self.energy = _slider(sliders, ("energy_level", 5), ("activity_level", 10))
+        self.social = _slider(sliders, ("social_preference", 10))
+
+
+def _slider(sliders: Dict[str, Any], *keys) -> Optional[float]:
+    """First present slider scaled to 0-1, given (name, max) pairs."""
+    for name, top in keys:
+        value = sliders.get(name)
+        if isinstance(value, (int, float)):
+            return min(max(value / top, 0.0), 1.0)
+    return None
+
+
+def _mean(values: List[float], default: float) -> float:
+    return sum(values) / len(values) if values else default
+
+
+def _avoided(profile: MemberProfile, tags: List[str], title: str = "") -> bool:
+    text = title.lower()
+    return any(term in tags or (text and term in text) for term in profile.avoids)
+
+
+def _activity_score(activity: Dict[str, Any], style: Dict[str, Any],
+                    group: List[MemberProfile], energy: float, social: float) -> float:
+    mask = ACTIVITY_MASKS[activity["id"]]
+    style_fit = _popcount(mask & STYLE_MASKS[style["key"]]) / max(1, _popcount(mask))
+    interest = _mean([1.0 if m.mask & mask else 0.0 for m in group if m.tag_count], 0.5)
+    pace = 1 - abs(activity["intensity"] - energy)
+    mood = 1 - abs(activity["social"] - social)
+    return style_fit + interest + 0.5 * pace + 0.5 * mood
+
+
+def _pick_activities(dest: Dict[str, Any], style: Dict[str, Any], group: List[MemberProfile],
+                     slots: int, disliked: Set[str]) -> List[Dict[str, Any]]:
+    """Best-scoring activities for a style, skipping anything a member avoids or disliked."""
+    energy = (style["intensity"] + _mean([m.energy for m in group if m.energy is not None], style["intensity"])) / 2
+    social = (style["social"] + _mean([m.social for m in group if m.social is not None], style["social"])) / 2
+    allowed = [
+        a for a in dest["activities"]
+        if a["id"] not in disliked
+        and not any(_avoided(m, a["tags"], a["title"]) for m in group)
+    ]
+    allowed.sort(key=lambda a: _activity_score(a, style, group, energy, social), reverse=True)
+    return allowed[:slots]
+
+
+def _score(dest: Dict[str, Any], style: Dict[str, Any], group: List[MemberProfile],
+           activities: List[Dict[str, Any]], nights: int, days: int, seeds: List[str]) -> Dict[str, Any]:
+    costs = _costs(dest, activities, nights, days)
+    per_person = sum(costs.values())
+
+    budget_fits = []
+    for m in group:
+        if m.budget_max:
+            over = per_person - m.budget_max
+            budget_fits.append(1.0 if over <= 0 else max(0.0, 1 - over / m.budget_max))
+    dest_mask = DEST_MASKS[dest["id"]]
+    tag_fits = [_popcount(m.mask & dest_mask) / m.tag_count for m in group if m.tag_count]
+    style_mask = STYLE_MASKS[style["key"]]
+    style_fit = _popcount(style_mask & dest_mask) / _popcount(style_mask)
+    avoid_hits = [1.0 if _avoided(m, dest["tags"]) else 0.0 for m in group]
+    city = dest["name"].split(",")[0].lower()
+    seeded = 1.0 if any(seed.split(",")[0].strip().lower() == city for seed in seeds) else 0.0
+
+    parts = {
+        "budget": _mean(budget_fits, 1.0),
+        "tags": _mean(tag_fits, 0.5),
+        "style": style_fit,
+        "seed": seeded,
+        "avoid": _mean(avoid_hits, 0.0),
+    }
+    total = sum(WEIGHTS[k] * v for k, v in parts.items() if k != "avoid") - WEIGHTS["avoid"] * parts["avoid"]
+    return {"total": total, "parts": parts, "costs": costs, "per_person": per_person}
+
+
+def _costs(dest: Dict[str, Any], activities: List[Dict[str, Any]], nights: int, days: int) -> Dict[str, int]:
+    costs = {
+        "transport": dest["transport"]["cost"],
+        "accommodation": dest["accommodation_per_night"] * nights,
+        "food": dest["food_per_day"] * days,
+        "activities": sum(a["cost"] for a in activities),
+    }
+    costs["buffer"] = round(sum(costs.values()) * 0.1)
+    return costs
+
+
+# ============================================================================
+# OPTION BUILDING
+# ============================================================================
+
+def _itinerary(option_id: str, dest: Dict[str, Any], activities: List[Dict[str, Any]], days: int) -> List[Dict[str, Any]]:
+    """Flat list of time blocks. Activity blocks keep their catalog id so dislikes carry over."""
+    queue = list(activities)
+    blocks = []
+
+    def block(day: int, time: str, title: str, description: str, block_id: Optional[str] = None):
+        blocks.append({
+            "id": block_id or f"{option_id}-d{day}-{len(blocks)}",
+            "day": day,
+            "time": time,
+            "title": title,
+            "description": description
+        })
+
+    def activity(day: int, time: str):
+        if queue:
+            a = queue.pop(0)
+            block(day, time, a["title"], ", ".join(a["tags"]), a["id"])
+        else:
+            block(day, time, "Free time", "Explore at your own pace")
+
+    for day in range(1, days + 1):
+        if day == 1:
+            block(day, "10:00-14:00", f"Travel to {dest['name']}", f"{dest['transport']['mode'].capitalize()}, {dest['transport']['duration']}")
+            activity(day, "16:00-19:00")
+        else:
+            block(day, "08:30-09:30", "Breakfast", "Near the accommodation")
+            activity(day, "10:00-13:00")
+            if day < days:
+                activity(day, "14:30-18:00")
+        if day < days:
+            block(day, "19:30-21:30", "Group dinner", "Local restaurant")
+        else:
+            block(day, "15:00-19:00", "Travel home", f"{dest['transport']['mode'].capitalize()}, {dest['transport']['duration']}")
+    return blocks
+
+
+def _activity_slots(days: int) -> int:
+    # Arrival afternoon, two per full day, one on the last morning
+    return 1 if days == 1 else 2 * days - 2
+
+
+def _build_option(label: str, style: Dict[str, Any], dest: Dict[str, Any], scored: Dict[str, Any],
+                  activities: List[Dict[str, Any]], date_window: str, days: int, origin: str,
+                  assumptions: List[str]) -> Option:
+    option_id = f"opt-{uuid4().hex[:8]}"
+    transport = dest["transport"]
+    one_way = round(transport["cost"] / 2)
+    legs = [(f"{origin} -> {dest['name']}", one_way), (f"{dest['name']} -> {origin}", transport["cost"] - one_way)]
+
+    parts = scored["parts"]
+    reasons = [f"~£{scored['per_person']} per person"]
+    reasons.append(f"budget fit {parts['budget']:.0%}")
+    reasons.append(f"matches {parts['tags']:.0%} of members' interests")
+    if parts["seed"]:
+        reasons.append("on the organiser's destination list")
+    if parts["avoid"]:
+        reasons.append(f"conflicts with {parts['avoid']:.0%} of must-avoids")
+
+    tags = set(dest["tags"]) | {t for a in activities for t in a["tags"]}
+    packing = [item for tag, item in PACKING_BY_TAG.items() if tag in tags]
+
+    return Option(
+        id=option_id,
+        title=f"Option {label}: {style['title']} in {dest['name'].split(',')[0]}",
+        destination=dest["name"],
+        date_window=date_window,
+        summary=f"{style['summary']} in {dest['name']}. Highlights: {', '.join(a['title'] for a in activities[:3])}.",
+        itinerary=_itinerary(option_id, dest, activities, days),
+        transport=[
+            {
+                "leg": leg,
+                "mode": transport["mode"],
+                "duration": transport["duration"],
+                "cost_per_person": cost,
+                "details": f"{leg}, {transport['duration']}",
+                "price_estimate": cost
+            }
+            for leg, cost in legs
+        ],
+        costs=scored["costs"],
+        packing_list=packing + ["travel documents: ID and bookings"],
+        rationale=f"{style['title']} pick: " + "; ".join(reasons) + ".",
+        assumptions=assumptions
+    )
+
+
+def plan_options(trip_id: str, duration_days: Optional[int] = None, count: int = 3) -> List[Option]:
+    """Score the catalog against the group and build `count` options with distinct destinations."""
+    trip = storage.get_trip_or_404(trip_id)
+    members = storage.get_trip_members(trip_id)
+    constraints = [storage.constraints_by_member[m.id] for m in members if m.id in storage.constraints_by_member]
+    group = [MemberProfile(c) for c in constraints]
+    disliked = set(storage.get_feedback_stats(trip_id).total.dislikes)
+
+    days = max(1, duration_days or DEFAULT_DAYS)
+    nights = max(1, days - 1)
+    windows = availability.find_best_availability_windows(trip_id, window_length=days)
+
+    assumptions = [f"Prices are rough per-person estimates for {days} days / {nights} nights"]
+    if len(constraints) < len(members):
+        assumptions.append(f"{len(members) - len(constraints)} member(s) have not submitted constraints")
+    if not windows:
+        assumptions.append("No shared availability yet; dates are a placeholder")
+
+    # Score every (style, destination) pair once
+    slots = _activity_slots(days)
+    scored = []
+    for style in STYLES:
+        for dest in CATALOG:
+            activities = _pick_activities(dest, style, group, slots, disliked)
+            result = _score(dest, style, group, activities, nights, days, trip.destination_seed_list)
+            scored.append((result["total"], style["key"], dest["id"], style, dest, activities, result))
+    scored.sort(key=lambda row: (row[0], row[1], row[2]), reverse=True)
+
+    # Greedy assignment: best remaining pair whose style and destination are both unused
+    chosen = {}
+    used_dests = set()
+    for total, style_key, dest_id, style, dest, activities, result in scored:
+        if style_key in chosen or dest_id in used_dests:
+            continue
+        chosen[style_key] = (style, dest, activities, result)
+        used_dests.add(dest_id)
+        if len(chosen) == min(count, len(STYLES)):
+            break
+
+    options = []
+    ordered = [chosen[style["key"]] for style in STYLES if style["key"] in chosen]
+    for i, (style, dest, activities, result) in enumerate(ordered):
+        if windows:
+            date_window = windows[i % len(windows)]["window"]
+        else:
+            date_window = "TBC"
+        options.append(_build_option(
+            chr(ord("A") + i), style, dest, result, activities,
+            date_window, days, trip.origin, assumptions
+        ))
+    return options
@@ -0,0 +1,94 @@
+import threading
+from typing import Any, Dict, Optional
+from app import storage, config
+from app.services import admission, ai
+
+# ============================================================================
+# SPECULATIVE GENERATION
+# ============================================================================
+# Organisers usually hit "generate" right after the last member fills in their
+# inputs. Routes call notify_inputs_changed() on every input write; after a
+# debounce the scheduler generates options in the background into a pending
+# slot, and generate-options takes them from there if the inputs still match.
+#
+# Debounce: a short delay once every member has constraints and availability,
+# a long quiet period otherwise. Each trip gets at most PREFETCH_MAX_PER_TRIP
+# speculative runs until one of them is actually used.
+
+class TripPrefetch:
+    __slots__ = ("timer", "fingerprint", "result", "runs")
+
+    def __init__(self):
+        self.timer: Optional[threading.Timer] = None
+        self.fingerprint: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.runs = 0  # speculative runs since one was last used
+
+
+_lock = threading.Lock()
+_trips: Dict[str, TripPrefetch] = {}
+
+
+def inputs_complete(trip_id: str) -> bool:
+    """Every member has submitted constraints and at least one available day."""
+    for member in storage.get_trip_members(trip_id):
+        avail = storage.get_availability(member.id)
+        if storage.get_constraints(member.id) is None or not (avail and avail.ranges):
+            return False
+    return True
+
+
+def notify_inputs_changed(trip_id: str) -> None:
+    """(Re)start the trip's debounce timer after an input write."""
+    if not config.PREFETCH_ENABLED or config.MOCK_MODE:
+        return
+    delay = config.PREFETCH_READY_DELAY_SECONDS if inputs_complete(trip_id) else config.PREFETCH_QUIET_SECONDS
+    with _lock:
+        state = _trips.setdefault(trip_id, TripPrefetch())
+        if state.runs >= config.PREFETCH_MAX_PER_TRIP:
+            return
+        if state.timer is not None:
+            state.timer.cancel()
+        state.timer = threading.Timer(delay, _run, args=(trip_id,))
+        state.timer.daemon = True
+        state.timer.start()
+
+
+def _run(trip_id: str) -> None:
+    try:
+        fingerprint = ai.input_fingerprint(trip_id)
+        with _lock:
+            state = _trips[trip_id]
+            if state.timer is threading.current_thread():
+                state.timer = None
+            if state.fingerprint == fingerprint or state.runs >= config.PREFETCH_MAX_PER_TRIP:
+                return  # Pending result already matches these inputs, or out of budget
+            state.runs += 1
+        # Speculative work only uses idle capacity and never the trip's rate limit
+        with admission.controller.slot(trip_id, queue=False, rate_limit=False):
+            result = ai.generate_options(trip_id)
+    except admission.AdmissionRejected:
+        with _lock:
+            state.runs -= 1  # Didn't run; don't count it against the cap
+        return
+    except ValueError:
+        return  # Trip deleted or inputs invalid; nothing to prefetch
+    with _lock:
+        state.fingerprint = fingerprint
+        state.result = result
+
+
+def take(trip_id: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+    """Pop the pending result if it was generated from inputs with this fingerprint.
+
+    Speculative runs use the default request (no duration_days or mode), so
+    only a default request's fingerprint can match.
+    """
+    with _lock:
+        state = _trips.get(trip_id)
+        if state is None or state.result is None or state.fingerprint != fingerprint:
+            return None
+        result = state.result
+        state.result = state.fingerprint = None
+        state.runs = 0
+        return result
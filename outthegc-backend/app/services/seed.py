@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta
 from uuid import uuid4
 from app import storage
+from app.models import DateWindow
 from app.services import ai
 
 
@@ -47,11 +48,11 @@ def seed_trip_data(trip_id: str) -> dict:
         # Add availability (varied overlapping date ranges)
         num_dates = fake_data["dates"]
         start_offset = i * 2  # Stagger start dates
-        available_dates = [
-            (base_date + timedelta(days=start_offset + j)).isoformat()
-            for j in range(num_dates)
-        ]
-        storage.upsert_availability(member.id, available_dates)
+        available_range = DateWindow(
+            start=(base_date + timedelta(days=start_offset)).isoformat(),
+            end=(base_date + timedelta(days=start_offset + num_dates - 1)).isoformat()
+        )
+        storage.upsert_availability(member.id, available_ranges=[available_range])
     
     # Mark first 2 members as required attendees
     if len(created_members) >= 2:
@@ -96,19 +97,19 @@ def seed_trip_data(trip_id: str) -> dict:
     stored_plan = storage.add_plan_version(trip_id, plan_version.options)
     
     # Add some sample feedback
-    if len(created_members) >= 2 and plan_version.options:
-        storage.add_feedback(
+    if len(created_members) >= 2 and stored_plan.options:
+        storage.upsert_feedback(
             trip_id=trip_id,
-            option_id=plan_version.options[0].id,
+            option_id=stored_plan.options[0].id,
             member_id=created_members[0].id,
             rating=4,
             disliked_activity_ids=[],
             comment="Love the adventure focus! Would prefer more downtime though."
         )
         
-        storage.add_feedback(
+        storage.upsert_feedback(
             trip_id=trip_id,
-            option_id=plan_version.options[1].id,
+            option_id=stored_plan.options[1].id,
             member_id=created_members[1].id,
             rating=5,
             disliked_activity_ids=[],
@@ -0,0 +1,160 @@
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+from app import config
+
+# ============================================================================
+# AI USAGE LEDGER
+# ============================================================================
+# Every LLM call is recorded once its outcome is known: tokens (split into
+# uncached, cache-write and cache-read input), latency, model and whether the
+# reply was used. Kept per trip (recent entries plus running totals) and
+# process-wide, for GET /trips/{trip_id}/ai-usage and GET /trips/ai-usage.
+
+OUTCOMES = ("ok", "parse_error", "fallback")
+
+
+class UsageEntry:
+    __slots__ = (
+        "trip_id", "purpose", "model", "input_tokens", "cache_creation_input_tokens",
+        "cache_read_input_tokens", "output_tokens", "latency_ms", "outcome", "error", "created_at"
+    )
+
+    def __init__(self, trip_id: Optional[str], purpose: str, model: str):
+        self.trip_id = trip_id
+        self.purpose = purpose
+        self.model = model
+        self.input_tokens = 0
+        self.cache_creation_input_tokens = 0
+        self.cache_read_input_tokens = 0
+        self.output_tokens = 0
+        self.latency_ms = 0.0
+        self.outcome = "ok"
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow()
+
+    @property
+    def cache_status(self) -> str:
+        if self.cache_read_input_tokens:
+            return "hit"
+        if self.cache_creation_input_tokens:
+            return "write"
+        return "none"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trip_id": self.trip_id,
+            "purpose": self.purpose,
+            "model": self.model,
+            "input_tokens": self.input_tokens,
+            "cache_creation_input_tokens": self.cache_creation_input_tokens,
+            "cache_read_input_tokens": self.cache_read_input_tokens,
+            "output_tokens": self.output_tokens,
+            "latency_ms": round(self.latency_ms, 1),
+            "cache": self.cache_status,
+            "outcome": self.outcome,
+            "error": self.error,
+            "created_at": self.created_at.isoformat()
+        }
+
+
+class UsageTotals:
+    """Running totals over a set of entries (one trip, or the whole process)."""
+    __slots__ = (
+        "calls", "outcomes", "input_tokens", "cache_creation_input_tokens",
+        "cache_read_input_tokens", "output_tokens", "latency_ms_total", "latency_ms_max", "recent_latencies"
+    )
+
+    def __init__(self):
+        self.calls = 0
+        self.outcomes = {outcome: 0 for outcome in OUTCOMES}
+        self.input_tokens = 0
+        self.cache_creation_input_tokens = 0
+        self.cache_read_input_tokens = 0
+        self.output_tokens = 0
+        self.latency_ms_total = 0.0
+        self.latency_ms_max = 0.0
+        self.recent_latencies: Deque[float] = deque(maxlen=config.AI_USAGE_LOG_SIZE)
+
+    def apply(self, entry: UsageEntry) -> None:
+        self.calls += 1
+        self.outcomes[entry.outcome] = self.outcomes.get(entry.outcome, 0) + 1
+        self.input_tokens += entry.input_tokens
+        self.cache_creation_input_tokens += entry.cache_creation_input_tokens
+        self.cache_read_input_tokens += entry.cache_read_input_tokens
+        self.output_tokens += entry.output_tokens
+        self.latency_ms_total += entry.latency_ms
+        self.latency_ms_max = max(self.latency_ms_max, entry.latency_ms)
+        self.recent_latencies.append(entry.latency_ms)
+
+    def to_dict(self) -> Dict[str, Any]:
+        total_input = self.input_tokens + self.cache_creation_input_tokens + self.cache_read_input_tokens
+        latencies = sorted(self.recent_latencies)
+
+        def percentile(p: int) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[max(0, -(-p * len(latencies) // 100) - 1)], 1)
+
+        return {
+            "calls": self.calls,
+            "outcomes": dict(self.outcomes),
+            "input_tokens": self.input_tokens,
+            "cache_creation_input_tokens": self.cache_creation_input_tokens,
+            "cache_read_input_tokens": self.cache_read_input_tokens,
+            "output_tokens": self.output_tokens,
+            "cache_hit_ratio": self.cache_read_input_tokens / total_input if total_input else 0,
+            "latency_ms": {
+                "mean": round(self.latency_ms_total / self.calls, 1) if self.calls else None,
+                "max": round(self.latency_ms_max, 1) if self.calls else None,
+                "p50": percentile(50),
+                "p95": percentile(95)
+            }
+        }
+
+
+_lock = threading.Lock()
+_totals = UsageTotals()
+_totals_by_model: Dict[str, UsageTotals] = {}
+_totals_by_trip: Dict[str, UsageTotals] = {}
+_entries_by_trip: Dict[str, Deque[UsageEntry]] = {}
+
+
+def record(entry: UsageEntry, outcome: str) -> None:
+    """Finalize an entry with its outcome and add it to the ledger."""
+    entry.outcome = outcome
+    with _lock:
+        _totals.apply(entry)
+        _totals_by_model.setdefault(entry.model, UsageTotals()).apply(entry)
+        if entry.trip_id is not None:
+            _totals_by_trip.setdefault(entry.trip_id, UsageTotals()).apply(entry)
+            entries = _entries_by_trip.get(entry.trip_id)
+            if entries is None:
+                entries = _entries_by_trip[entry.trip_id] = deque(maxlen=config.AI_USAGE_LOG_SIZE)
+            entries.append(entry)
+
+
+def get_trip_usage(trip_id: str) -> Dict[str, Any]:
+    with _lock:
+        totals = _totals_by_trip.get(trip_id) or UsageTotals()
+        entries: List[UsageEntry] = list(_entries_by_trip.get(trip_id, ()))
+        return {
+            "trip_id": trip_id,
+            "totals": totals.to_dict(),
+            "calls": [entry.to_dict() for entry in reversed(entries)]
+        }
+
+
+def get_process_usage() -> Dict[str, Any]:
+    """Process-wide totals and per model.
+
+    No trip ids: a trip id is the only credential for a trip, and this
+    endpoint is public. Per-trip usage is at GET /trips/{trip_id}/ai-usage.
+    """
+    with _lock:
+        return {
+            "totals": _totals.to_dict(),
+            "by_model": {model: totals.to_dict() for model, totals in _totals_by_model.items()},
+            "trips": len(_totals_by_trip)
+        }
@@ -0,0 +1,37 @@
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+# ============================================================================
+# SINGLE-FLIGHT
+# ============================================================================
+# Collapses concurrent calls with the same key into one execution: the first
+# caller runs the function, anyone arriving while it is in flight waits on the
+# same future and gets the same result (or exception). Nothing is cached once
+# the call finishes.
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run fn for key, or wait for the in-flight run. Returns (result, shared)."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result(), False
+
@@ -1,23 +1,46 @@
-from typing import Dict, List, Optional, Tuple
+import re
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
 from datetime import datetime
 from uuid import uuid4
+from app import config
 from app.models import (
-    Trip, Member, Constraints, Availability, Poll, Vote, PlanVersion, Option, Feedback,
+    Trip, Constraints, Poll, PlanVersion, Option, Feedback,
     PollOption, SliderConfig, DateWindow
 )
+from app.records import MemberRecord, AvailabilityRecord, VoteRecord
+from app.aggregates import (
+    AvailabilityCounts, DateRange, DateRangeTally, SliderTally, TripFeedbackStats,
+    parse_availability, parse_day
+)
 
 # ============================================================================
 # GLOBAL STORAGE DICTS
 # ============================================================================
 
 trips: Dict[str, Trip] = {}
-members: Dict[str, Member] = {}
+members: Dict[str, MemberRecord] = {}
+# trip_id -> member_id -> display name, in join order. Doubles as the trip's
+# member index; join and rename keep it in step with members.
+member_names_by_trip: Dict[str, Dict[str, str]] = {}
 constraints_by_member: Dict[str, Constraints] = {}
-availability_by_member: Dict[str, Availability] = {}
+availability_by_member: Dict[str, AvailabilityRecord] = {}
 polls: Dict[str, Poll] = {}
-votes: Dict[Tuple[str, str, Optional[str]], Vote] = {}  # (poll_id, member_id, option_id) -> Vote
+# poll_id -> (member_id, option_id) -> VoteRecord. option_id is only part of the
+# key for multi-choice polls; every other poll type holds one vote per member
+# under (member_id, None).
+votes_by_poll: Dict[str, Dict[Tuple[str, Optional[str]], VoteRecord]] = {}
+# poll_id -> option_id -> vote count; single and multi polls only
+option_counts_by_poll: Dict[str, Dict[str, int]] = {}
+date_tallies: Dict[str, DateRangeTally] = {}  # dates polls only
+slider_tallies: Dict[str, SliderTally] = {}  # slider polls only
 plans_by_trip: Dict[str, List[PlanVersion]] = {}
-feedback_by_trip: Dict[str, List[Feedback]] = {}
+# trip_id -> (option_id, member_id) -> Feedback; one entry per member per option
+feedback_by_trip: Dict[str, Dict[Tuple[str, str], Feedback]] = {}
+feedback_stats_by_trip: Dict[str, TripFeedbackStats] = {}
+availability_counts_by_trip: Dict[str, AvailabilityCounts] = {}
+change_seq_by_trip: Dict[str, int] = {}
+changes_by_trip: Dict[str, Deque[Dict[str, Any]]] = {}
 
 # ============================================================================
 # HELPER FUNCTIONS
@@ -30,7 +53,7 @@ def get_trip_or_404(trip_id: str) -> Trip:
     return trips[trip_id]
 
 
-def get_member_or_404(member_id: str) -> Member:
+def get_member_or_404(member_id: str) -> MemberRecord:
     """Retrieve member or raise exception."""
     if member_id not in members:
         raise ValueError(f"Member {member_id} not found")
@@ -44,7 +67,7 @@ def get_poll_or_404(poll_id: str) -> Poll:
     return polls[poll_id]
 
 
-def assert_member_in_trip(member_id: str, trip_id: str) -> Member:
+def assert_member_in_trip(member_id: str, trip_id: str) -> MemberRecord:
     """Assert member exists and belongs to trip."""
     member = get_member_or_404(member_id)
     if member.trip_id != trip_id:
@@ -64,31 +87,112 @@ def get_latest_plan(trip_id: str) -> Optional[PlanVersion]:
     return plan_list[-1] if plan_list else None
 
 
-def get_trip_members(trip_id: str) -> List[Member]:
+def get_trip_members(trip_id: str) -> List[MemberRecord]:
     """Get all members in a trip."""
-    return [m for m in members.values() if m.trip_id == trip_id]
+    return [members[member_id] for member_id in member_names_by_trip.get(trip_id, ())]
+
+
+def get_member_names(trip_id: str) -> Dict[str, str]:
+    """Get member_id -> display name for a trip. Read-only; don't mutate."""
+    return member_names_by_trip.get(trip_id, {})
 
 
-def get_availability(member_id: str) -> Optional[Availability]:
+def get_availability(member_id: str) -> Optional[AvailabilityRecord]:
     """Get availability for a member."""
     return availability_by_member.get(member_id)
 
 
+def get_availability_counts(trip_id: str) -> AvailabilityCounts:
+    """Get per-day free-member counts for a trip."""
+    get_trip_or_404(trip_id)
+    return availability_counts_by_trip[trip_id]
+
+
 def get_constraints(member_id: str) -> Optional[Constraints]:
     """Get constraints for a member."""
     return constraints_by_member.get(member_id)
 
 
+def get_date_tally(poll_id: str) -> Optional[DateRangeTally]:
+    """Get per-day vote counts for a dates poll."""
+    return date_tallies.get(poll_id)
+
+
+def get_slider_tally(poll_id: str) -> Optional[SliderTally]:
+    """Get running statistics for a slider poll."""
+    return slider_tallies.get(poll_id)
+
+
 def get_all_polls_for_trip(trip_id: str) -> List[Poll]:
     """Get all polls for a trip."""
     return [p for p in polls.values() if p.trip_id == trip_id]
 
 
+# ============================================================================
+# CHANGE LOG
+# ============================================================================
+
+def record_change(trip_id: str, change_type: str, data: Dict[str, Any]) -> int:
+    """Append a change to the trip's bounded log and return its sequence number."""
+    seq = change_seq_by_trip.get(trip_id, 0) + 1
+    log = changes_by_trip.get(trip_id)
+    if log is None:
+        log = changes_by_trip[trip_id] = deque(maxlen=config.CHANGE_LOG_SIZE)
+    log.append({
+        "seq": seq,
+        "type": change_type,
+        "at": datetime.utcnow().isoformat(),
+        "data": data
+    })
+    # Publish the new revision only once its entry is in the log, so a reader
+    # that sees revision N can always find change N
+    change_seq_by_trip[trip_id] = seq
+    return seq
+
+
+def get_trip_revision(trip_id: str) -> int:
+    """Sequence number of the trip's most recent change."""
+    return change_seq_by_trip.get(trip_id, 0)
+
+
+def get_changes_since(trip_id: str, since: int) -> Tuple[List[Dict[str, Any]], bool]:
+    """Get changes after `since`.
+
+    Returns (changes, resync). resync is True when changes after `since` have
+    already been dropped from the log (or `since` is from the future), so the
+    caller has to refetch the full trip instead.
+    """
+    get_trip_or_404(trip_id)
+    current = change_seq_by_trip.get(trip_id, 0)
+    log = changes_by_trip.get(trip_id)
+    if since > current:
+        return [], True
+    if since == current or not log:
+        return [], False
+    oldest = log[0]["seq"]
+    if since < oldest - 1:
+        return [], True
+    # Sequence numbers are contiguous, so the offset into the log is direct
+    start = since - oldest + 1
+    return [log[i] for i in range(start, len(log))], False
+
+
+def _vote_change_data(vote: VoteRecord) -> Dict[str, Any]:
+    return {
+        "poll_id": vote.poll_id,
+        "member_id": vote.member_id,
+        "option_id": vote.option_id,
+        "value": vote.value,
+        "start_date": vote.start_date,
+        "end_date": vote.end_date
+    }
+
+
 # ============================================================================
 # CRUD: TRIPS
 # ============================================================================
 
-def create_trip(name: str, origin: str, brief: Optional[str], organiser_name: str) -> Tuple[Trip, Member]:
+def create_trip(name: str, origin: str, brief: Optional[str], organiser_name: str) -> Tuple[Trip, MemberRecord]:
     """Create new trip and organiser member."""
     trip_id = str(uuid4())
     organiser_id = str(uuid4())
@@ -109,17 +213,23 @@ def create_trip(name: str, origin: str, brief: Optional[str], organiser_name: st
     trips[trip_id] = trip
     
     # Create organiser member
-    organiser = Member(
+    organiser = MemberRecord(
         id=organiser_id,
         trip_id=trip_id,
         name=organiser_name,
         role="organiser"
     )
     members[organiser_id] = organiser
+    member_names_by_trip[trip_id] = {organiser_id: organiser_name}
     
     # Initialize empty collections
     plans_by_trip[trip_id] = []
-    feedback_by_trip[trip_id] = []
+    feedback_by_trip[trip_id] = {}
+    feedback_stats_by_trip[trip_id] = TripFeedbackStats()
+    availability_counts_by_trip[trip_id] = AvailabilityCounts()
+    availability_counts_by_trip[trip_id].set_required({organiser_id}, {})
+    
+    record_change(trip_id, "member_joined", {"member_id": organiser_id, "name": organiser_name, "role": "organiser"})
     
     return trip, organiser
 
@@ -129,6 +239,7 @@ def update_brief(trip_id: str, brief: str) -> Trip:
     trip = get_trip_or_404(trip_id)
     trip.brief = brief
     trips[trip_id] = trip
+    record_change(trip_id, "trip_updated", {"brief": brief})
     return trip
 
 
@@ -140,6 +251,13 @@ def set_required_attendees(trip_id: str, required_member_ids: List[str]) -> Trip
         assert_member_in_trip(mid, trip_id)
     trip.required_member_ids = required_member_ids
     trips[trip_id] = trip
+    # Organiser always has to attend, as in availability window search
+    required = {trip.organiser_member_id, *required_member_ids}
+    availability_counts_by_trip[trip_id].set_required(required, {
+        mid: availability_by_member[mid].ranges
+        for mid in required if mid in availability_by_member
+    })
+    record_change(trip_id, "trip_updated", {"required_member_ids": list(required_member_ids)})
     return trip
 
 
@@ -147,18 +265,29 @@ def set_required_attendees(trip_id: str, required_member_ids: List[str]) -> Trip
 # CRUD: MEMBERS & CONSTRAINTS
 # ============================================================================
 
-def join_trip(trip_id: str, name: str) -> Member:
+def join_trip(trip_id: str, name: str) -> MemberRecord:
     """Add new member to trip."""
     trip = get_trip_or_404(trip_id)
     
     member_id = str(uuid4())
-    member = Member(
+    member = MemberRecord(
         id=member_id,
         trip_id=trip_id,
         name=name,
         role="member"
     )
     members[member_id] = member
+    member_names_by_trip[trip_id][member_id] = name
+    record_change(trip_id, "member_joined", {"member_id": member_id, "name": name, "role": "member"})
+    return member
+
+
+def rename_member(trip_id: str, member_id: str, name: str) -> MemberRecord:
+    """Change a member's display name."""
+    member = assert_member_in_trip(member_id, trip_id)
+    member.name = name
+    member_names_by_trip[trip_id][member_id] = name
+    record_change(trip_id, "member_renamed", {"member_id": member_id, "name": name})
     return member
 
 
@@ -184,18 +313,39 @@ def upsert_constraints(member_id: str,
         requests=requests
     )
     constraints_by_member[member_id] = constraints
+    record_change(member.trip_id, "constraints_updated", {"member_id": member_id})
     return constraints
 
 
-def upsert_availability(member_id: str, available_dates: List[str]) -> Availability:
-    """Create or update member availability."""
+def upsert_availability(member_id: str,
+                        available_dates: Optional[List[str]] = None,
+                        available_ranges: Optional[List[DateWindow]] = None) -> AvailabilityRecord:
+    """Create or update member availability.
+
+    Accepts individual ISO days (invalid ones are skipped) and/or inclusive
+    ranges (invalid or oversized ones raise ValueError, see
+    parse_availability); both are stored as merged ranges.
+    """
     member = get_member_or_404(member_id)
-    
-    availability = Availability(
-        member_id=member_id,
-        available_dates=available_dates
+    return set_availability_ranges(member, parse_availability(available_dates or [], available_ranges or []))
+
+
+def set_availability_ranges(member: MemberRecord, ranges: List[DateRange]) -> AvailabilityRecord:
+    """Store already-parsed availability (from parse_availability) for a member."""
+    member_id = member.id
+    previous = availability_by_member.get(member_id)
+    availability_counts_by_trip[member.trip_id].apply(
+        member_id,
+        previous.ranges if previous else [],
+        ranges
     )
+    
+    availability = AvailabilityRecord(member_id=member_id, ranges=ranges)
     availability_by_member[member_id] = availability
+    record_change(member.trip_id, "availability_updated", {
+        "member_id": member_id,
+        "has_availability": bool(ranges)
+    })
     return availability
 
 
@@ -214,6 +364,11 @@ def create_poll(
     """Create new poll for trip."""
     trip = get_trip_or_404(trip_id)
     
+    # Built first: an oversized date window raises before anything is stored
+    date_tally = None
+    if date_window is not None:
+        date_tally = DateRangeTally(parse_day(date_window.start), parse_day(date_window.end))
+    
     poll_id = str(uuid4())
     poll_options = [PollOption(id=str(uuid4()), label=opt) for opt in options]
     
@@ -229,6 +384,14 @@ def create_poll(
         created_at=datetime.utcnow()
     )
     polls[poll_id] = poll
+    votes_by_poll[poll_id] = {}
+    if poll_options:
+        option_counts_by_poll[poll_id] = {opt.id: 0 for opt in poll_options}
+    if slider is not None:
+        slider_tallies[poll_id] = SliderTally(slider.min, slider.max, slider.step)
+    if date_tally is not None:
+        date_tallies[poll_id] = date_tally
+    record_change(trip_id, "poll_created", {"poll_id": poll_id})
     return poll
 
 
@@ -239,7 +402,7 @@ def vote(
     value: Optional[int] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None
-) -> Vote:
+) -> VoteRecord:
     """Record a vote. Rejects if poll closed or option invalid.
     For single choice: replaces previous vote
     For multi choice: adds vote (allows multiple selections)
@@ -261,8 +424,14 @@ def vote(
     elif poll.type == "dates":
         if not start_date or not end_date:
             raise ValueError("Date vote requires start_date and end_date")
-        if poll.date_window is None:
+        tally = date_tallies.get(poll_id)
+        if tally is None:
             raise ValueError("Date window not found for poll")
+        vote_start, vote_end = parse_day(start_date), parse_day(end_date)
+        if vote_start > vote_end:
+            raise ValueError("start_date must be before or equal to end_date")
+        if not tally.contains(vote_start, vote_end):
+            raise ValueError("Dates must be within poll date_window")
     else:
         if option_id is None:
             raise ValueError("Option id is required for this poll type")
@@ -273,40 +442,42 @@ def vote(
     # Get member (validate exists)
     member = get_member_or_404(member_id)
     
-    # For single choice polls: remove previous vote if it exists
-    if poll.type == "single":
-        keys_to_remove = [key for key in votes if key[0] == poll_id and key[1] == member_id]
-        for key in keys_to_remove:
-            del votes[key]
+    poll_votes = votes_by_poll.setdefault(poll_id, {})
+
+    # Multi choice keeps one vote per selected option; every other poll type
+    # keeps a single vote per member, replacing any previous one.
+    if poll.type == "multi":
+        vote_key = (member_id, option_id)
+    else:
+        vote_key = (member_id, None)
 
     if poll.type == "slider":
-        keys_to_remove = [key for key in votes if key[0] == poll_id and key[1] == member_id]
-        for key in keys_to_remove:
-            del votes[key]
-        vote_key = (poll_id, member_id, None)
-        vote = Vote(poll_id=poll_id, member_id=member_id, option_id=None, value=value)
-        votes[vote_key] = vote
-        return vote
+        vote = VoteRecord(poll_id, member_id, value=value)
+    elif poll.type == "dates":
+        vote = VoteRecord(poll_id, member_id, start_date=start_date, end_date=end_date)
+    else:
+        vote = VoteRecord(poll_id, member_id, option_id=option_id)
 
+    previous = poll_votes.get(vote_key)
     if poll.type == "dates":
-        keys_to_remove = [key for key in votes if key[0] == poll_id and key[1] == member_id]
-        for key in keys_to_remove:
-            del votes[key]
-        vote_key = (poll_id, member_id, None)
-        vote = Vote(
-            poll_id=poll_id,
-            member_id=member_id,
-            option_id=None,
-            start_date=start_date,
-            end_date=end_date
-        )
-        votes[vote_key] = vote
-        return vote
-
-    # Store vote with unique key (poll_id, member_id, option_id) for multi-choice support
-    vote_key = (poll_id, member_id, option_id)
-    vote = Vote(poll_id=poll_id, member_id=member_id, option_id=option_id)
-    votes[vote_key] = vote
+        if previous is not None:
+            tally.add(parse_day(previous.start_date), parse_day(previous.end_date), -1)
+        tally.add(vote_start, vote_end)
+    elif poll.type == "slider":
+        slider_tally = slider_tallies[poll_id]
+        if previous is not None:
+            slider_tally.add(previous.value, -1)
+        slider_tally.add(value)
+    else:
+        counts = option_counts_by_poll[poll_id]
+        if previous is not None:
+            counts[previous.option_id] -= 1
+        counts[option_id] += 1
+    if previous is not None and previous.option_id != vote.option_id:
+        # Single choice: the vote for the old option goes away
+        record_change(poll.trip_id, "vote_removed", _vote_change_data(previous))
+    poll_votes[vote_key] = vote
+    record_change(poll.trip_id, "vote_upserted", _vote_change_data(vote))
     return vote
 
 
@@ -318,25 +489,43 @@ def close_poll(poll_id: str) -> Poll:
     
     poll.is_open = False
     polls[poll_id] = poll
+    record_change(poll.trip_id, "poll_closed", {"poll_id": poll_id})
     return poll
 
 
-def get_poll_votes(poll_id: str) -> List[Vote]:
+def get_poll_votes(poll_id: str) -> List[VoteRecord]:
     """Get all votes for a poll."""
-    return [v for key, v in votes.items() if key[0] == poll_id]
+    return list(votes_by_poll.get(poll_id, {}).values())
 
 
-def get_member_votes_for_poll(poll_id: str, member_id: str) -> List[Vote]:
+def count_poll_votes(poll_id: str) -> int:
+    """Number of stored votes for a poll (one per selected option for multi-choice)."""
+    return len(votes_by_poll.get(poll_id, ()))
+
+
+def get_option_counts(poll_id: str) -> Dict[str, int]:
+    """Get per-option vote counts for a single or multi choice poll."""
+    return option_counts_by_poll.get(poll_id, {})
+
+
+def get_member_votes_for_poll(poll_id: str, member_id: str) -> List[VoteRecord]:
     """Get all votes by a specific member for a poll."""
-    return [v for key, v in votes.items() if key[0] == poll_id and key[1] == member_id]
+    poll_votes = votes_by_poll.get(poll_id, {})
+    single = poll_votes.get((member_id, None))
+    if single is not None:
+        return [single]
+    return [v for key, v in poll_votes.items() if key[0] == member_id]
 
 
 # ============================================================================
 # CRUD: PLANS
 # ============================================================================
 
+_VERSION_SUFFIX = re.compile(r"-v\d+$")
+
+
 def add_plan_version(trip_id: str, options: List[Option]) -> PlanVersion:
-    """Create new plan version for trip."""
+    """Create new plan version for trip. Option ids are made unique per version."""
     trip = get_trip_or_404(trip_id)
     
     # Get next version number
@@ -344,6 +533,12 @@ def add_plan_version(trip_id: str, options: List[Option]) -> PlanVersion:
     next_version = len(plan_list) + 1
     
     plan_id = str(uuid4())
+    # Generators number options option-a, -b, -c in every run; suffix the version
+    # so feedback on one version's option-b isn't read as feedback on the next
+    options = [
+        opt.model_copy(update={"id": f"{_VERSION_SUFFIX.sub('', opt.id)}-v{next_version}"})
+        for opt in options
+    ]
     plan = PlanVersion(
         id=plan_id,
         trip_id=trip_id,
@@ -355,6 +550,7 @@ def add_plan_version(trip_id: str, options: List[Option]) -> PlanVersion:
     if trip_id not in plans_by_trip:
         plans_by_trip[trip_id] = []
     plans_by_trip[trip_id].append(plan)
+    record_change(trip_id, "plan_added", {"plan_id": plan_id, "version_num": next_version})
     
     return plan
 
@@ -364,14 +560,23 @@ def get_plans_for_trip(trip_id: str) -> List[PlanVersion]:
     return plans_by_trip.get(trip_id, [])
 
 
+def get_plan_version_or_404(trip_id: str, version_num: int) -> PlanVersion:
+    """Retrieve a specific plan version or raise exception."""
+    plan_list = plans_by_trip.get(trip_id, [])
+    # Version numbers are assigned sequentially from 1
+    if version_num < 1 or version_num > len(plan_list):
+        raise ValueError(f"Plan version {version_num} not found for trip {trip_id}")
+    return plan_list[version_num - 1]
+
+
 # ============================================================================
 # CRUD: FEEDBACK
 # ============================================================================
 
-def add_feedback(trip_id: str, option_id: str, member_id: str, rating: int,
-                 disliked_activity_ids: Optional[List[str]] = None,
-                 comment: Optional[str] = None) -> Feedback:
-    """Record feedback on an option."""
+def upsert_feedback(trip_id: str, option_id: str, member_id: str, rating: int,
+                    disliked_activity_ids: Optional[List[str]] = None,
+                    comment: Optional[str] = None) -> Feedback:
+    """Create or replace a member's feedback on an option."""
     trip = get_trip_or_404(trip_id)
     member = assert_member_in_trip(member_id, trip_id)
     
@@ -384,18 +589,29 @@ def add_feedback(trip_id: str, option_id: str, member_id: str, rating: int,
         comment=comment
     )
     
-    if trip_id not in feedback_by_trip:
-        feedback_by_trip[trip_id] = []
-    feedback_by_trip[trip_id].append(feedback)
+    trip_feedback = feedback_by_trip.setdefault(trip_id, {})
+    stats = feedback_stats_by_trip.setdefault(trip_id, TripFeedbackStats())
+    previous = trip_feedback.get((option_id, member_id))
+    if previous is not None:
+        stats.apply(previous, -1)
+    trip_feedback[(option_id, member_id)] = feedback
+    stats.apply(feedback, 1)
+    record_change(trip_id, "feedback_added", {"option_id": option_id, "member_id": member_id, "rating": rating})
     
     return feedback
 
 
 def get_feedback_for_trip(trip_id: str) -> List[Feedback]:
     """Get all feedback for trip."""
-    return feedback_by_trip.get(trip_id, [])
+    return list(feedback_by_trip.get(trip_id, {}).values())
 
 
 def get_feedback_for_option(trip_id: str, option_id: str) -> List[Feedback]:
     """Get feedback for specific option."""
-    return [f for f in feedback_by_trip.get(trip_id, []) if f.option_id == option_id]
+    return [f for key, f in feedback_by_trip.get(trip_id, {}).items() if key[0] == option_id]
+
+
+def get_feedback_stats(trip_id: str) -> TripFeedbackStats:
+    """Get running feedback totals for a trip and its options."""
+    get_trip_or_404(trip_id)
+    return feedback_stats_by_trip[trip_id]
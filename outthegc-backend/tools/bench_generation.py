@@ -0,0 +1,70 @@
+"""
+Generation benchmark: end-to-end latency and outcomes of generate-options
+through the real HTTP backend, parser and fallbacks, against the local fake.
+
+Start the fake first, with whatever timing and failures you want to model:
+    python tools/stub_llm_server.py --port 8787 --latency 0.8 --tokens-per-second 300 \\
+        --truncate-rate 0.1 --error-rate 0.05 --seed 1
+
+Then, from outthegc-backend/:
+    python tools/bench_generation.py                      # 20 runs per mode
+    python tools/bench_generation.py 50 http://127.0.0.1:8787
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+BASE_URL = sys.argv[2] if len(sys.argv) > 2 else "http://127.0.0.1:8787"
+
+# Must be set before app.config is imported
+os.environ.update({
+    "MOCK_MODE": "false",
+    "LLM_BACKEND": "http",
+    "CLAUDE_BASE_URL": BASE_URL,
+    "CLAUDE_API_KEY": os.environ.get("CLAUDE_API_KEY") or "local",
+    "PREFETCH_ENABLED": "false",
+    "AI_TRIP_RATE_PER_MINUTE": "100000",
+    "AI_TRIP_BURST": "100000"
+})
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+def percentile(values, p: int) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, -(-p * len(ordered) // 100) - 1)]
+
+
+def run(client: TestClient, mode: str) -> None:
+    trip = client.post("/trips/", json={"name": "Bench", "origin": "London", "organiser_name": "Org"}).json()
+    trip_id, organiser = trip["trip_id"], trip["organiser_member_id"]
+    client.put(f"/trips/{trip_id}/members/{organiser}/constraints",
+               json={"budget_min": 200, "budget_max": 1200, "tags": ["beach", "food"]})
+
+    latencies = []
+    for _ in range(COUNT):
+        started = time.perf_counter()
+        response = client.post(f"/trips/{trip_id}/generate-options",
+                               json={"created_by_member_id": organiser, "mode": mode})
+        latencies.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+
+    totals = client.get(f"/trips/{trip_id}/ai-usage").json()["totals"]
+    print(f"{mode:<8} p50 {percentile(latencies, 50):>7.0f} ms  p95 {percentile(latencies, 95):>7.0f} ms  "
+          f"max {max(latencies):>7.0f} ms  calls {totals['calls']:>4}  outcomes {totals['outcomes']}")
+
+
+def main() -> None:
+    client = TestClient(app)
+    print(f"{COUNT} generations per mode against {BASE_URL}")
+    for mode in ("single", "fanout"):
+        run(client, mode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Memory benchmark: bytes per stored vote, pydantic Vote vs VoteRecord.
+
+Run from outthegc-backend/:
+    python tools/bench_records.py            # 1,000,000 votes
+    python tools/bench_records.py 200000     # smaller run
+"""
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.models import Vote
+from app.records import VoteRecord
+
+
+def measure(label: str, factory, count: int, member_ids, option_ids) -> float:
+    """Build `count` votes with `factory` and report allocation per vote."""
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    started = time.perf_counter()
+
+    rows = [
+        factory(
+            poll_id="poll-1",
+            member_id=member_ids[i % len(member_ids)],
+            option_id=option_ids[i % len(option_ids)]
+        )
+        for i in range(count)
+    ]
+
+    elapsed = time.perf_counter() - started
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    per_vote = (after - before) / count
+    print(f"{label:<12} {per_vote:>8.1f} bytes/vote  {elapsed * 1e9 / count:>8.0f} ns/vote  ({count:,} votes)")
+    del rows
+    return per_vote
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    # Ids are shared across votes, as they are in storage, so only the
+    # per-vote object overhead is measured.
+    member_ids = [f"member-{i:05d}" for i in range(5000)]
+    option_ids = [f"option-{i}" for i in range(4)]
+
+    before = measure("pydantic", Vote, count, member_ids, option_ids)
+    after = measure("VoteRecord", VoteRecord, count, member_ids, option_ids)
+    print(f"saving       {before - after:>8.1f} bytes/vote  ({before / after:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
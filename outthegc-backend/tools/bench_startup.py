@@ -0,0 +1,125 @@
+"""
+Cold-start benchmark: how long a fresh worker takes to import app.main and
+answer its first request, with a budget to regress against.
+
+Each run is a new interpreter, so nothing is warm. The first request is
+sent straight to the ASGI app (no server), which covers building the
+middleware stack and routing, but not socket setup.
+
+Run from outthegc-backend/:
+    python tools/bench_startup.py                   # 10 runs, default budget
+    python tools/bench_startup.py --runs 20 --import-budget-ms 800
+    python tools/bench_startup.py --imports         # also list the slowest imports
+
+Exits 1 when a median exceeds its budget.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+# Runs in the child interpreter; prints one JSON line of timings in ms
+CHILD = r"""
+import asyncio, json, time
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+async def first_request():
+    messages = []
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    async def send(message):
+        messages.append(message)
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": PATH, "raw_path": PATH.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"localhost")], "client": ("127.0.0.1", 1),
+        "server": ("localhost", 80), "app": app
+    }
+    await app(scope, receive, send)
+    return messages[0]["status"]
+
+status = asyncio.run(first_request())
+answered = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_response_ms": (answered - imported) * 1000,
+    "status": status
+}))
+"""
+
+
+def run_once(path: str) -> dict:
+    env = dict(os.environ, MOCK_MODE=os.environ.get("MOCK_MODE", "true"), PREFETCH_ENABLED="false")
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", f"PATH = {path!r}\n" + CHILD],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    elapsed = (time.perf_counter() - started) * 1000
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    if timings["status"] != 200:
+        raise SystemExit(f"GET {path} returned {timings['status']}")
+    # Wall time from spawn to first response, including interpreter start-up
+    timings["total_ms"] = elapsed
+    return timings
+
+
+def slowest_imports(top: int) -> list:
+    """(cumulative ms, module) for the slowest imports under app.main, via -X importtime."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)", line)
+        # Top-level imports and app modules only, so nested children aren't double counted
+        if match and (len(match.group(2)) <= 3 or match.group(3).startswith("app.")):
+            rows.append((int(match.group(1)) / 1000, match.group(3)))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--path", default="/health", help="path of the first request")
+    parser.add_argument("--import-budget-ms", type=float, default=1500)
+    parser.add_argument("--first-response-budget-ms", type=float, default=150)
+    parser.add_argument("--imports", action="store_true", help="list the slowest imports")
+    args = parser.parse_args()
+
+    runs = [run_once(args.path) for _ in range(args.runs)]
+    failed = False
+    print(f"{args.runs} cold starts, first request GET {args.path}")
+    for key, budget in (("import_ms", args.import_budget_ms),
+                        ("first_response_ms", args.first_response_budget_ms),
+                        ("total_ms", None)):
+        values = [run[key] for run in runs]
+        median = statistics.median(values)
+        verdict = ""
+        if budget is not None:
+            over = median > budget
+            failed = failed or over
+            verdict = f"  budget {budget:.0f}  {'OVER' if over else 'ok'}"
+        print(f"{key:<18} median {median:>7.1f}  min {min(values):>7.1f}  max {max(values):>7.1f}{verdict}")
+
+    if args.imports:
+        print("\nslowest imports (cumulative ms)")
+        for ms, module in slowest_imports(15):
+            print(f"{ms:>8.1f}  {module}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+Local stand-in for the Anthropic Messages API, for checking request shape,
+prompt-cache accounting and the parse/fallback pipeline under realistic
+timing without network access or credits.
+
+Validates each POST /v1/messages like the real API would (400 on a malformed
+body), simulates the prompt cache for system blocks marked with cache_control,
+and replies with option JSON plus a usage block. Token counts are estimated
+at ~4 characters per token.
+
+Replies are canned, or replayed from a JSONL file recorded by the backend
+with LLM_RECORD_PATH set (single-option prompts get single-option replies).
+Timing and failures can be injected: time to first token, output token rate,
+truncation at max_tokens or at random, and 529/500 errors.
+
+Run from outthegc-backend/:
+    python tools/stub_llm_server.py --port 8787 --latency 0.8 --tokens-per-second 400 --error-rate 0.05
+    LLM_BACKEND=http CLAUDE_BASE_URL=http://127.0.0.1:8787 MOCK_MODE=false uvicorn app.main:app
+    curl http://127.0.0.1:8787/stats
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+SINGLE_OPTION_MARKER = "Generate ONE holiday option"
+
+
+class StubState:
+    def __init__(self, min_cacheable: int, latency: float = 0.0, tokens_per_second: float = 0.0,
+                 truncate_rate: float = 0.0, error_rate: float = 0.0, replay=None, seed=None):
+        self.min_cacheable = min_cacheable
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.truncate_rate = truncate_rate
+        self.error_rate = error_rate
+        # Recorded replies split by prompt kind, served round-robin
+        self.replay = {True: [], False: []}
+        for record in replay or ():
+            self.replay[SINGLE_OPTION_MARKER in record.get("prompt", "")].append(record["text"])
+        self.replay_next = {True: 0, False: 0}
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.cached_prefixes = set()
+        self.stats = {
+            "requests": 0, "rejected": 0, "cache_hits": 0, "cache_misses": 0,
+            "injected_errors": 0, "truncated": 0, "replayed": 0,
+            "input_tokens": 0, "cache_creation_input_tokens": 0,
+            "cache_read_input_tokens": 0, "output_tokens": 0
+        }
+
+    def roll(self, rate: float) -> bool:
+        with self.lock:
+            return rate > 0 and self.random.random() < rate
+
+    def replayed_reply(self, prompt: str):
+        single = SINGLE_OPTION_MARKER in prompt
+        with self.lock:
+            replies = self.replay[single]
+            if not replies:
+                return None
+            text = replies[self.replay_next[single] % len(replies)]
+            self.replay_next[single] += 1
+            self.stats["replayed"] += 1
+            return text
+
+
+def load_replay(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def validate(body) -> str:
+    """Return an error message for a malformed request, or ""."""
+    if not isinstance(body, dict):
+        return "body must be a JSON object"
+    if not isinstance(body.get("model"), str) or not body["model"]:
+        return "model: field required"
+    if not isinstance(body.get("max_tokens"), int) or body["max_tokens"] < 1:
+        return "max_tokens: must be a positive integer"
+    messages = body.get("messages")
+    if not isinstance(messages, list) or not messages:
+        return "messages: at least one message is required"
+    for i, message in enumerate(messages):
+        if not isinstance(message, dict) or message.get("role") not in ("user", "assistant"):
+            return f"messages.{i}.role: must be 'user' or 'assistant'"
+        if not isinstance(message.get("content"), (str, list)):
+            return f"messages.{i}.content: must be a string or list of blocks"
+    system = body.get("system")
+    if system is not None and not isinstance(system, str):
+        if not isinstance(system, list):
+            return "system: must be a string or list of text blocks"
+        for i, block in enumerate(system):
+            if not isinstance(block, dict) or block.get("type") != "text" or not isinstance(block.get("text"), str):
+                return f"system.{i}: must be a text block"
+            cache_control = block.get("cache_control")
+            if cache_control is not None and cache_control != {"type": "ephemeral"}:
+                return f"system.{i}.cache_control: only {{'type': 'ephemeral'}} is supported"
+    return ""
+
+
+def text_of(content) -> str:
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") for block in content if isinstance(block, dict))
+
+
+def split_system(system):
+    """(cacheable prefix text, remaining text) from the system field."""
+    if system is None:
+        return "", ""
+    if isinstance(system, str):
+        return "", system
+    last_marked = max((i for i, b in enumerate(system) if b.get("cache_control")), default=-1)
+    prefix = "".join(b["text"] for b in system[:last_marked + 1])
+    rest = "".join(b["text"] for b in system[last_marked + 1:])
+    return prefix, rest
+
+
+def canned_option(label: str, destination: str, date_window: str) -> dict:
+    return {
+        "id": f"option-{label.lower()}",
+        "title": f"Option {label}: Stub trip to {destination.split(',')[0]}",
+        "destination": destination,
+        "date_window": date_window,
+        "summary": "Canned option from the local stub server.",
+        "itinerary": [
+            {"day": 1, "blocks": [{"time": "10:00-12:00", "title": "Arrive", "notes": "Check in"}]},
+            {"day": 2, "blocks": [{"time": "09:00-12:00", "title": "Walking tour", "notes": "Old town"}]}
+        ],
+        "costs": {
+            "total_per_person": 600,
+            "breakdown": {"transport": 150, "accommodation": 250, "food": 120, "activities": 50, "buffer": 30}
+        },
+        "transport": [{"leg": "origin -> destination", "mode": "flight", "duration": "2h", "cost_per_person": 150}],
+        "packing_list": ["comfortable shoes: walking tour"],
+        "rationale": "Stub response.",
+        "assumptions": ["Generated by tools/stub_llm_server.py"]
+    }
+
+
+def canned_reply(prompt: str) -> str:
+    destination = re.search(r"- Destination: (.+?) \(", prompt)
+    window = re.search(r"- Date window: (\S+)", prompt)
+    date_window = window.group(1) if window else "TBC"
+    if SINGLE_OPTION_MARKER in prompt:
+        label = re.search(r"- Label: Option (\w)", prompt)
+        return json.dumps(canned_option(
+            label.group(1) if label else "A",
+            destination.group(1) if destination else "Barcelona, Spain",
+            date_window
+        ))
+    return json.dumps([
+        canned_option(label, city, date_window)
+        for label, city in zip("ABC", ("Barcelona, Spain", "Lisbon, Portugal", "Rome, Italy"))
+    ])
+
+
+def make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, payload) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _error(self, status: int, error_type: str, message: str) -> None:
+            with state.lock:
+                state.stats["rejected"] += 1
+            self._send(status, {"type": "error", "error": {"type": error_type, "message": message}})
+
+        def do_GET(self):
+            if self.path == "/stats":
+                with state.lock:
+                    self._send(200, dict(state.stats))
+            else:
+                self._send(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+
+        def do_POST(self):
+            if self.path.split("?")[0] != "/v1/messages":
+                return self._error(404, "not_found_error", self.path)
+            if not self.headers.get("x-api-key"):
+                return self._error(401, "authentication_error", "x-api-key header is required")
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            except ValueError:
+                return self._error(400, "invalid_request_error", "body is not valid JSON")
+            problem = validate(body)
+            if problem:
+                return self._error(400, "invalid_request_error", problem)
+
+            if state.latency:
+                time.sleep(state.latency)
+            if state.roll(state.error_rate):
+                with state.lock:
+                    state.stats["injected_errors"] += 1
+                if state.roll(0.5):
+                    return self._error(529, "overloaded_error", "Overloaded")
+                return self._error(500, "api_error", "Internal server error")
+
+            prefix, system_rest = split_system(body.get("system"))
+            prompt = "".join(text_of(m["content"]) for m in body["messages"])
+            prefix_tokens = estimate_tokens(prefix) if prefix else 0
+            uncached = estimate_tokens(system_rest + prompt)
+            usage = {"input_tokens": uncached, "cache_creation_input_tokens": 0, "cache_read_input_tokens": 0}
+            key = hashlib.sha256((body["model"] + "\0" + prefix).encode("utf-8")).hexdigest()
+            with state.lock:
+                if prefix and prefix_tokens >= state.min_cacheable:
+                    if key in state.cached_prefixes:
+                        usage["cache_read_input_tokens"] = prefix_tokens
+                        state.stats["cache_hits"] += 1
+                    else:
+                        usage["cache_creation_input_tokens"] = prefix_tokens
+                        state.cached_prefixes.add(key)
+                        state.stats["cache_misses"] += 1
+                else:
+                    usage["input_tokens"] += prefix_tokens
+
+            reply = state.replayed_reply(prompt) or canned_reply(prompt)
+            stop_reason = "end_turn"
+            limit = body["max_tokens"] * CHARS_PER_TOKEN
+            if len(reply) > limit:
+                reply, stop_reason = reply[:limit], "max_tokens"
+            elif state.roll(state.truncate_rate):
+                with state.lock:
+                    cut = state.random.randint(len(reply) // 4, len(reply) * 3 // 4)
+                reply, stop_reason = reply[:cut], "max_tokens"
+            if stop_reason == "max_tokens":
+                with state.lock:
+                    state.stats["truncated"] += 1
+            usage["output_tokens"] = estimate_tokens(reply)
+            if state.tokens_per_second:
+                time.sleep(usage["output_tokens"] / state.tokens_per_second)
+            with state.lock:
+                state.stats["requests"] += 1
+                for field, value in usage.items():
+                    state.stats[field] += value
+
+            self._send(200, {
+                "id": "msg_stub_" + key[:12],
+                "type": "message",
+                "role": "assistant",
+                "model": body["model"],
+                "content": [{"type": "text", "text": reply}],
+                "stop_reason": stop_reason,
+                "stop_sequence": None,
+                "usage": usage
+            })
+
+        def log_message(self, fmt, *args):
+            print(f"[stub] {self.address_string()} {fmt % args}")
+
+    return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--min-cacheable", type=int, default=1024,
+                        help="smallest prefix (tokens) the simulated cache stores")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0,
+                        help="output token rate; 0 sends the whole reply at once")
+    parser.add_argument("--truncate-rate", type=float, default=0.0,
+                        help="fraction of replies cut short with stop_reason max_tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="fraction of requests answered with 529 overloaded or 500")
+    parser.add_argument("--replay", help="JSONL of replies recorded with LLM_RECORD_PATH")
+    parser.add_argument("--seed", type=int, help="seed for truncation and error injection")
+    args = parser.parse_args()
+
+    state = StubState(
+        args.min_cacheable, latency=args.latency, tokens_per_second=args.tokens_per_second,
+        truncate_rate=args.truncate_rate, error_rate=args.error_rate,
+        replay=load_replay(args.replay) if args.replay else None, seed=args.seed
+    )
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    print(f"Stub LLM server on http://{args.host}:{args.port} (POST /v1/messages, GET /stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
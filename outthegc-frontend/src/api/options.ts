@@ -1,14 +1,25 @@
 import { api } from "./client";
+import type { PlanVersion } from "../types/api";
+
+export async function getPlan(trip_id: string, version_num: number) {
+  const { data } = await api.get(`/trips/${trip_id}/plans/${version_num}`);
+  return data as PlanVersion;
+}
 
 export async function generateOptions(trip_id: string, body: {
   created_by_member_id: string;
   duration_days?: number;
+  mode?: "fast" | "fanout" | "single";
 }) {
   const { data } = await api.post(`/trips/${trip_id}/generate-options`, body);
   return data;
 }
 
-export async function rerunOptions(trip_id: string, body: { created_by_member_id: string }) {
+export async function rerunOptions(trip_id: string, body: {
+  created_by_member_id: string;
+  mode?: "incremental" | "fast" | "full";
+  keep_rating?: number;
+}) {
   const { data } = await api.post(`/trips/${trip_id}/rerun-options`, body);
   return data;
 }
@@ -1,5 +1,5 @@
 import { api } from "./client";
-import type { Poll } from "../types/api";
+import type { Poll, PollResults, VoteAck } from "../types/api";
 
 export async function createPoll(trip_id: string, body: {
   created_by_member_id: string;
@@ -31,8 +31,16 @@ export async function vote(
   poll_id: string,
   body: { member_id: string; option_id?: string; value?: number; start_date?: string; end_date?: string }
 ) {
-  const { data } = await api.post(`/trips/${trip_id}/polls/${poll_id}/vote`, body);
-  return data;
+  // The trip is refreshed after voting, so only the stored vote comes back
+  const { data } = await api.post(`/trips/${trip_id}/polls/${poll_id}/vote`, body, {
+    params: { response: "ack" },
+  });
+  return data as VoteAck;
+}
+
+export async function getPoll(trip_id: string, poll_id: string, page?: { offset?: number; limit?: number }) {
+  const { data } = await api.get(`/trips/${trip_id}/polls/${poll_id}`, { params: page });
+  return data as PollResults;
 }
 
 export async function closePoll(trip_id: string, poll_id: string, body: { member_id: string }) {
@@ -1,5 +1,5 @@
 import { api } from "./client";
-import type { TripState } from "../types/api";
+import type { AvailabilityHeatmap, TripChanges, TripSection, TripState } from "../types/api";
 
 export async function createTrip(input: {
   name: string;
@@ -16,11 +16,23 @@ export async function joinTrip(trip_id: string, input: { name: string }) {
   return data as { member_id: string };
 }
 
-export async function getTrip(trip_id: string) {
-  const { data } = await api.get(`/trips/${trip_id}`);
+export async function renameMember(trip_id: string, member_id: string, name: string) {
+  const { data } = await api.put(`/trips/${trip_id}/members/${member_id}/name`, { name });
+  return data;
+}
+
+export async function getTrip(trip_id: string, include?: TripSection[]) {
+  const params = include ? { include: include.join(",") } : undefined;
+  const { data } = await api.get(`/trips/${trip_id}`, { params });
   return data as TripState;
 }
 
+export async function getChanges(trip_id: string, since?: number) {
+  const params = since === undefined ? undefined : { since };
+  const { data } = await api.get(`/trips/${trip_id}/changes`, { params });
+  return data as TripChanges;
+}
+
 export async function updateBrief(trip_id: string, brief: string) {
   const { data } = await api.put(`/trips/${trip_id}/brief`, { brief });
   return data;
@@ -36,6 +48,11 @@ export async function submitConstraints(trip_id: string, member_id: string, body
   return data;
 }
 
+export async function getAvailabilityHeatmap(trip_id: string) {
+  const { data } = await api.get(`/trips/${trip_id}/availability/heatmap`);
+  return data as AvailabilityHeatmap;
+}
+
 export async function seedDemo(trip_id: string) {
   const { data } = await api.post(`/trips/${trip_id}/seed`);
   return data;
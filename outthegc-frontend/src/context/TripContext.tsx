@@ -1,6 +1,6 @@
-import React, { createContext, useContext, useEffect, useMemo, useState } from "react";
-import type { TripState } from "../types/api";
-import { getTrip } from "../api/trips";
+import React, { createContext, useContext, useEffect, useMemo, useRef, useState } from "react";
+import type { TripChange, TripSection, TripState } from "../types/api";
+import { getChanges, getTrip } from "../api/trips";
 import { loadSession } from "../utils/storage";
 
 type TripCtx = {
@@ -8,26 +8,132 @@ type TripCtx = {
   memberId: string | null;
   trip: TripState | null;
   isOrganiser: boolean;
-  refresh: () => Promise<void>;
+  refresh: (include?: TripSection[]) => Promise<void>;
+  sync: () => Promise<void>;
   setTripId: (id: string) => void;
   setMemberId: (id: string) => void;
 };
 
 const Ctx = createContext<TripCtx | null>(null);
 
+// Sections to refetch for changes that aren't applied locally, or whose
+// server-side summaries (poll counts and results) local edits can't recompute
+const SECTIONS_BY_CHANGE: Partial<Record<TripChange["type"], TripSection[]>> = {
+  member_joined: ["constraints_completion"],
+  member_renamed: ["constraints_completion"],
+  trip_updated: ["trip"],
+  constraints_updated: ["constraints_completion"],
+  availability_updated: ["constraints_completion"],
+  poll_created: ["polls"],
+  vote_upserted: ["polls"],
+  vote_removed: ["polls"],
+  poll_closed: ["polls"],
+  plan_added: ["latest_plan"],
+  feedback_added: ["feedback_summary"],
+};
+
+// Apply member, vote and poll-close changes directly to the trip state
+function applyChange(trip: TripState, change: TripChange): TripState {
+  const data = change.data;
+  switch (change.type) {
+    case "member_joined":
+      if (trip.members.some(m => m.id === data.member_id)) return trip;
+      return {
+        ...trip,
+        members: [
+          ...trip.members,
+          { id: data.member_id, name: data.name, role: data.role, has_submitted_constraints: false },
+        ],
+      };
+    case "member_renamed":
+      return {
+        ...trip,
+        members: trip.members.map(m => (m.id === data.member_id ? { ...m, name: data.name } : m)),
+        polls: trip.polls.map(poll => ({
+          ...poll,
+          votes: poll.votes.map(v => (v.member_id === data.member_id ? { ...v, member_name: data.name } : v)),
+        })),
+      };
+    case "vote_upserted":
+    case "vote_removed":
+      return {
+        ...trip,
+        polls: trip.polls.map(poll => {
+          if (poll.id !== data.poll_id) return poll;
+          // Multi choice keeps one vote per option; other types one per member
+          const sameVote = (v: { member_id: string; option_id?: string | null }) =>
+            v.member_id === data.member_id && (poll.type !== "multi" || v.option_id === data.option_id);
+          const votes = poll.votes.filter(v => !sameVote(v));
+          if (change.type === "vote_upserted") {
+            const member = trip.members.find(m => m.id === data.member_id);
+            votes.push({
+              member_id: data.member_id,
+              member_name: member?.name ?? "Unknown",
+              option_id: data.option_id,
+              value: data.value,
+              start_date: data.start_date,
+              end_date: data.end_date,
+            });
+          }
+          return { ...poll, votes };
+        }),
+      };
+    case "poll_closed":
+      return {
+        ...trip,
+        polls: trip.polls.map(poll => (poll.id === data.poll_id ? { ...poll, is_open: false } : poll)),
+      };
+    default:
+      return trip;
+  }
+}
+
 export function TripProvider({ children }: { children: React.ReactNode }) {
   const session = loadSession();
   const [tripId, setTripId] = useState<string | null>(session?.tripId ?? null);
   const [memberId, setMemberId] = useState<string | null>(session?.memberId ?? null);
   const [trip, setTrip] = useState<TripState | null>(null);
 
-  const refresh = async () => {
+  // A partial refresh only replaces the sections it asked for
+  const refresh = async (include?: TripSection[]) => {
     if (!tripId) return;
-    const data = await getTrip(tripId);
-    setTrip(data);
+    const data = await getTrip(tripId, include);
+    setTrip(prev => (include && prev ? { ...prev, ...data } : data));
+  };
+
+  // Last change sequence number reflected in `trip`
+  const seqRef = useRef<number | null>(null);
+
+  // Cheap polling: fetch only the changes since the last sync, apply what can
+  // be applied locally and refetch just the affected sections for the rest.
+  const sync = async () => {
+    if (!tripId) return;
+    if (seqRef.current === null || !trip) {
+      // Take the cursor before the full fetch so no change is missed
+      const { seq } = await getChanges(tripId);
+      await refresh();
+      seqRef.current = seq;
+      return;
+    }
+    const res = await getChanges(tripId, seqRef.current);
+    if (res.resync) {
+      await refresh();
+      seqRef.current = res.seq;
+      return;
+    }
+    if (!res.changes.length) return;
+
+    const sections = new Set<TripSection>();
+    res.changes.forEach(change => SECTIONS_BY_CHANGE[change.type]?.forEach(s => sections.add(s)));
+    setTrip(prev => (prev ? res.changes.reduce(applyChange, prev) : prev));
+    if (sections.size) await refresh([...sections]);
+    seqRef.current = res.seq;
   };
 
-  useEffect(() => { if (tripId) refresh(); }, [tripId]);
+  useEffect(() => {
+    seqRef.current = null;
+    if (tripId) sync();
+  }, [tripId]);
 
   const isOrganiser = useMemo(() => {
     if (!trip || !memberId) return false;
@@ -36,7 +142,7 @@ export function TripProvider({ children }: { children: React.ReactNode }) {
   }, [trip, memberId]);
 
   return (
-    <Ctx.Provider value={{ tripId, memberId, trip, isOrganiser, refresh, setTripId, setMemberId }}>
+    <Ctx.Provider value={{ tripId, memberId, trip, isOrganiser, refresh, sync, setTripId, setMemberId }}>
       {children}
     </Ctx.Provider>
   );
@@ -9,7 +9,7 @@ import { useTrip } from "../context/TripContext";
 
 export const Dashboard: React.FC = () => {
   const { tripId: routeId } = useParams<{ tripId: string }>();
-  const { tripId, trip, isOrganiser, refresh, setTripId } = useTrip();
+  const { tripId, trip, isOrganiser, refresh, sync, setTripId } = useTrip();
   const navigate = useNavigate();
   const [editing, setEditing] = useState(false);
   const [briefText, setBriefText] = useState("");
@@ -33,11 +33,11 @@ export const Dashboard: React.FC = () => {
     }
   }, [trip, editing]);
 
-  // 2.5 second polling refresh
+  // 2.5 second polling via the change feed
   useEffect(() => {
-    const interval = setInterval(() => refresh(), 2500);
+    const interval = setInterval(() => sync(), 2500);
     return () => clearInterval(interval);
-  }, [tripId, refresh]);
+  }, [tripId, sync]);
 
   useEffect(() => {
     if (!copied) {
@@ -35,8 +35,18 @@ export const Me: React.FC = () => {
     setSuccess(false);
 
     try {
+      // "2026-02-01..2026-02-10" entries are sent as ranges, the rest as single days
+      const dateEntries = form.available_dates
+        ? form.available_dates.split(",").map((d) => d.trim()).filter(Boolean)
+        : [];
       const constraintBody = {
-        available_dates: form.available_dates ? form.available_dates.split(",").map((d) => d.trim()) : [],
+        available_dates: dateEntries.filter((d) => !d.includes("..")),
+        available_ranges: dateEntries
+          .filter((d) => d.includes(".."))
+          .map((d) => {
+            const [start, end] = d.split("..").map((part) => part.trim());
+            return { start, end };
+          }),
         budget: {
           min: form.budget_min ? Number(form.budget_min) : null,
           max: form.budget_max ? Number(form.budget_max) : null,
@@ -50,7 +60,7 @@ export const Me: React.FC = () => {
 
       await submitConstraints(tripId, memberId, constraintBody);
       setSuccess(true);
-      refresh();
+      refresh(["members", "constraints_completion"]);
       setTimeout(() => navigate(`/trip/${tripId}/dashboard`), 1500);
     } catch (err: any) {
       setError(err.response?.data?.detail || "Failed to submit constraints");
@@ -87,10 +97,10 @@ export const Me: React.FC = () => {
           {/* Availability */}
           <Card>
             <h2 className="text-lg font-semibold mb-4">Availability</h2>
-            <p className="text-sm text-slate-400 mb-3">Enter dates you're available (comma separated)</p>
+            <p className="text-sm text-slate-400 mb-3">Enter dates or ranges you're available (comma separated)</p>
             <Input
               type="text"
-              placeholder="e.g., 2025-06-15, 2025-06-16, 2025-06-17"
+              placeholder="e.g., 2025-06-15..2025-06-20, 2025-06-24"
               value={form.available_dates}
               onChange={(e) => setForm({ ...form, available_dates: e.target.value })}
             />
@@ -1,7 +1,8 @@
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import { useParams, useNavigate } from "react-router-dom";
 import { useTrip } from "../context/TripContext";
-import { submitFeedback, rerunOptions } from "../api/options";
+import { submitFeedback, rerunOptions, getPlan } from "../api/options";
+import type { PlanVersion } from "../types/api";
 import { Card } from "../components/ui/Card";
 import { Button } from "../components/ui/Button";
 import { Badge } from "../components/ui/Badge";
@@ -27,7 +28,17 @@ export const Options: React.FC = () => {
     >
   >({});
 
-  const options = trip?.latest_plan?.options || [];
+  // The trip document only references the latest plan; its options are
+  // fetched separately and are browser-cacheable since versions never change.
+  const [plan, setPlan] = useState<PlanVersion | null>(null);
+  const latestVersion = trip?.latest_plan?.version_num;
+
+  useEffect(() => {
+    if (!tripId || !latestVersion) return;
+    getPlan(tripId, latestVersion).then(setPlan).catch(() => setPlan(null));
+  }, [tripId, latestVersion]);
+
+  const options = plan?.version_num === latestVersion ? plan?.options || [] : [];
 
   if (!trip || !options.length) {
     return (
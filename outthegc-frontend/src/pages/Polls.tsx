@@ -69,7 +69,7 @@ export const Polls: React.FC = () => {
       await submitVote(tripId, pollId, { member_id: memberId, option_id: optionId });
       setUserVotes({ ...userVotes, [pollId]: optionId });
       setSingleVoteSelection({ ...singleVoteSelection, [pollId]: "" });
-      refresh();
+      refresh(["polls"]);
     } catch (err: any) {
       setError(err.response?.data?.detail || "Failed to vote");
     } finally {
@@ -90,7 +90,7 @@ export const Polls: React.FC = () => {
 
     try {
       await submitVote(tripId, pollId, { member_id: memberId, value });
-      refresh();
+      refresh(["polls"]);
     } catch (err: any) {
       setError(err.response?.data?.detail || "Failed to vote");
     } finally {
@@ -119,7 +119,7 @@ export const Polls: React.FC = () => {
         start_date: selection.start,
         end_date: selection.end,
       });
-      refresh();
+      refresh(["polls"]);
     } catch (err: any) {
       setError(err.response?.data?.detail || "Failed to vote");
     } finally {
@@ -172,7 +172,7 @@ export const Polls: React.FC = () => {
         await submitVote(tripId, pollId, { member_id: memberId, option_id: optionId });
       }
       setMultiVotes({ ...multiVotes, [pollId]: new Set() });
-      refresh();
+      refresh(["polls"]);
     } catch (err: any) {
       setError(err.response?.data?.detail || "Failed to vote");
     } finally {
@@ -257,7 +257,7 @@ export const Polls: React.FC = () => {
       setShowCreateForm(false);
       
       // Wait for refresh to complete before proceeding
-      await refresh();
+      await refresh(["polls"]);
     } catch (err: any) {
       setError(err.response?.data?.detail || "Failed to create poll");
     } finally {
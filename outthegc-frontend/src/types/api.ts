@@ -1,3 +1,11 @@
+export type TripSection =
+  | "trip"
+  | "members"
+  | "constraints_completion"
+  | "polls"
+  | "latest_plan"
+  | "feedback_summary";
+
 export type TripState = {
   trip: {
     id: string;
@@ -14,11 +22,22 @@ export type TripState = {
     has_submitted_constraints: boolean;
   }>;
   polls: Poll[];
-  latest_plan?: {
-    plan_version_id: string;
-    version_num: number;
-    options: Option[];
-  };
+  latest_plan?: PlanRef | null;
+};
+
+export type PlanRef = {
+  id: string;
+  version_num: number;
+  created_at: string;
+  href: string;
+};
+
+export type PlanVersion = {
+  id: string;
+  trip_id: string;
+  version_num: number;
+  created_at: string;
+  options: Option[];
 };
 
 export type Poll = {
@@ -39,6 +58,24 @@ export type Poll = {
   } | null;
   is_open: boolean;
   votes: Vote[];
+  slider_summary?: SliderSummary;
+  date_summary?: DateSummary;
+};
+
+export type SliderSummary = {
+  count: number;
+  sum: number;
+  mean: number | null;
+  min: number | null;
+  max: number | null;
+  median: number | null;
+  percentiles: Record<string, number>;
+  histogram: Array<{ start: number; end: number; count: number }>;
+};
+
+export type DateSummary = {
+  heatmap: Array<{ date: string; count: number }>;
+  best_range: { start: string; end: string; days: number; count: number } | null;
 };
 
 export type Vote = {
@@ -50,6 +87,25 @@ export type Vote = {
   end_date?: string | null;
 };
 
+export type VoteAck = {
+  poll_id: string;
+  vote: Vote;
+};
+
+export type PollResults = {
+  poll_id: string;
+  trip_id: string;
+  type: Poll["type"];
+  question: string;
+  options: Array<{ id: string; label: string; vote_count: number }>;
+  is_open: boolean;
+  total_votes: number;
+  vote_details: Vote[];
+  vote_details_page?: { offset: number; limit: number; total: number; next_offset: number | null };
+  slider_summary?: SliderSummary;
+  date_summary?: DateSummary;
+};
+
 export type ItineraryBlock = {
   id: string;
   day: number;
@@ -70,3 +126,34 @@ export type Option = {
   transport: Array<{ mode: string; details: string; price_estimate?: number }>;
   rationale: string;
 };
+
+export type TripChange = {
+  seq: number;
+  type:
+    | "member_joined"
+    | "member_renamed"
+    | "trip_updated"
+    | "constraints_updated"
+    | "availability_updated"
+    | "poll_created"
+    | "vote_upserted"
+    | "vote_removed"
+    | "poll_closed"
+    | "plan_added"
+    | "feedback_added";
+  at: string;
+  data: Record<string, any>;
+};
+
+export type TripChanges = {
+  trip_id: string;
+  seq: number;
+  changes: TripChange[];
+  resync: boolean;
+};
+
+export type AvailabilityHeatmap = {
+  trip_id: string;
+  required_member_ids: string[];
+  days: Array<{ date: string; count: number; all_required_free: boolean }>;
+};